@@ -1,48 +1,192 @@
 import pyttsx3
 import threading
+import time
+from concurrent.futures import Future
+from phrase_cache import PhraseCache, can_play, play_clip
+
+# Announcement phrases, kept separate so each can be cached as one clip
+NEARBY = "{} objects nearby"
+MEDIUM = "{} objects at medium distance"
+FAR = "{} objects far away"
+
+def announcement_vocabulary(labels, max_count=10):
+    """Every phrase an announcement can be built from"""
+    counts = range(1, max_count + 1)
+    return [template.format(n) for template in (NEARBY, MEDIUM, FAR) for n in counts] + list(labels)
+
+def build_announcement(detections):
+    """Build announcement text, and the cacheable phrases it is made of"""
+    # Group by distance
+    close_objects = [d['label'] for d in detections if d['distance'] == 'close']
+    medium_objects = [d['label'] for d in detections if d['distance'] == 'medium']
+    far_objects = [d['label'] for d in detections if d['distance'] == 'far']
+    
+    announcement = []
+    phrases = []
+    
+    if close_objects:
+        labels = list(dict.fromkeys(close_objects))
+        announcement.append(f"{NEARBY.format(len(close_objects))}: {', '.join(labels)}")
+        phrases += [NEARBY.format(len(close_objects))] + labels
+    if medium_objects:
+        announcement.append(MEDIUM.format(len(medium_objects)))
+        phrases.append(announcement[-1])
+    if far_objects:
+        announcement.append(FAR.format(len(far_objects)))
+        phrases.append(announcement[-1])
+    
+    return ". ".join(announcement), phrases
 
 class AudioFeedback:
-    def __init__(self):
-        """Initialize text-to-speech engine"""
+    def __init__(self, phrase_cache_dir=None, phrase_cache_size=128, phrase_cache_disk_size=1024, metrics=None):
+        """Start the speech worker, which creates and owns the text-to-speech engine
+        
+        The engine is only ever used from the worker thread (SAPI5 engines
+        are tied to the thread that created them); errors creating it are
+        raised here. With phrase_cache_dir, announcements are assembled from
+        cached pre-rendered clips (needs the optional simpleaudio package),
+        keeping up to phrase_cache_size clips in memory and
+        phrase_cache_disk_size on disk, least recently used evicted first.
+        An optional Metrics records speech time, coalesced announcements and,
+        for announcements given a capture time, capture-to-speech latency.
+        """
+        self.metrics = metrics
+        self.engine = None
+        self.phrase_cache = None
+        
+        # Single-slot queue: a newer announcement replaces a stale pending one
+        self._cond = threading.Condition()
+        self._pending = None
+        self._warm_up = []
+        self._speaking = False
+        self._closed = False
+        self.coalesced = 0
+        
+        ready = Future()
+        self._worker = threading.Thread(target=self._speech_worker, daemon=True,
+                                        args=(ready, phrase_cache_dir, phrase_cache_size, phrase_cache_disk_size))
+        self._worker.start()
+        ready.result()
+    
+    @property
+    def is_speaking(self):
+        with self._cond:
+            return self._speaking
+    
+    def speak(self, text, phrases=None, captured_at=None):
+        """Queue text for the speech worker
+        
+        phrases optionally splits the text into cacheable fragments;
+        captured_at is the perf_counter time of the frame it describes.
+        """
+        with self._cond:
+            if self._closed:
+                return
+            if self._pending is not None:
+                self.coalesced += 1
+                if self.metrics is not None:
+                    self.metrics.increment('announcements_coalesced')
+            self._pending = (text, phrases, captured_at)
+            self._cond.notify_all()
+    
+    def warm_up(self, phrases):
+        """Render phrases into the cache on the speech worker"""
+        if self.phrase_cache is None:
+            return
+        with self._cond:
+            self._warm_up.extend(phrases)
+            self._cond.notify_all()
+    
+    def _say(self, text, phrases):
+        if phrases and self.phrase_cache is not None:
+            clip = self.phrase_cache.assemble(phrases)
+            if clip is not None:
+                play_clip(clip)
+                return
+        self.engine.say(text)
+        self.engine.runAndWait()
+    
+    def _init_engine(self, phrase_cache_dir, phrase_cache_size, phrase_cache_disk_size):
         self.engine = pyttsx3.init()
         self.engine.setProperty('rate', 150)  # Speed of speech
         self.engine.setProperty('volume', 0.9)
-        self.is_speaking = False
-        
-    def speak(self, text):
-        """Speak text in a separate thread"""
-        if not self.is_speaking:
-            self.is_speaking = True
-            thread = threading.Thread(target=self._speak_thread, args=(text,))
-            thread.daemon = True
-            thread.start()
-    
-    def _speak_thread(self, text):
-        """Internal method to speak in thread"""
+        
+        if phrase_cache_dir is not None:
+            if can_play():
+                self.phrase_cache = PhraseCache(self.engine, phrase_cache_dir, phrase_cache_size,
+                                                phrase_cache_disk_size)
+            else:
+                print("Phrase cache disabled: install simpleaudio to play cached clips")
+    
+    def _speech_worker(self, ready, *cache_options):
+        """Create the engine, then speak queued text one utterance at a time until closed"""
         try:
-            self.engine.say(text)
-            self.engine.runAndWait()
-        finally:
-            self.is_speaking = False
+            self._init_engine(*cache_options)
+        except BaseException as error:
+            ready.set_exception(error)
+            return
+        ready.set_result(None)
+        
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or self._warm_up or self._closed)
+                if self._closed:
+                    return
+                pending, self._pending = self._pending, None
+                # One warm-up phrase at a time so announcements can cut in
+                phrase = self._warm_up.pop(0) if pending is None else None
+                self._speaking = True
+            
+            try:
+                if pending is not None and self.metrics is not None:
+                    text, phrases, captured_at = pending
+                    if captured_at is not None:
+                        self.metrics.observe('capture_to_speech', time.perf_counter() - captured_at)
+                    with self.metrics.span('speech'):
+                        self._say(text, phrases)
+                elif pending is not None:
+                    self._say(*pending[:2])
+                else:
+                    self.phrase_cache.get(phrase)
+            except Exception as e:
+                print(f"Speech failed: {e}")
+            finally:
+                with self._cond:
+                    self._speaking = False
+                    self._cond.notify_all()
+    
+    def wait_until_idle(self, timeout=None):
+        """Wait until nothing is queued or being spoken"""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self._pending is None and not self._warm_up and not self._speaking, timeout)
+    
+    def close(self, timeout=2.0):
+        """Drop queued text and stop the speech worker"""
+        with self._cond:
+            self._closed = True
+            self._pending = None
+            self._cond.notify_all()
+        self._worker.join(timeout)
     
-    def announce_detections(self, detections):
+    def announce_detections(self, detections, captured_at=None):
         """Announce detected objects"""
         if not detections:
             return
         
-        # Group by distance
-        close_objects = [d['label'] for d in detections if d['distance'] == 'close']
-        medium_objects = [d['label'] for d in detections if d['distance'] == 'medium']
-        far_objects = [d['label'] for d in detections if d['distance'] == 'far']
-        
-        announcement = []
-        
-        if close_objects:
-            announcement.append(f"{len(close_objects)} objects nearby: {', '.join(set(close_objects))}")
-        if medium_objects:
-            announcement.append(f"{len(medium_objects)} objects at medium distance")
-        if far_objects:
-            announcement.append(f"{len(far_objects)} objects far away")
+        text, phrases = build_announcement(detections)
+        if text:
+            self.speak(text, phrases, captured_at)
+    
+    def announce_sources(self, detections_by_source, captured_at=None):
+        """Announce (source name, detections) pairs as one utterance"""
+        parts = []
+        phrases = []
+        for name, detections in detections_by_source:
+            text, source_phrases = build_announcement(detections)
+            if text:
+                parts.append(f"{name}: {text}")
+                phrases += [name] + source_phrases
         
-        if announcement:
-            self.speak(". ".join(announcement))
+        if parts:
+            self.speak(". ".join(parts), phrases, captured_at)
@@ -0,0 +1,412 @@
+import ast
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from importlib.metadata import version
+from pathlib import Path
+import cv2
+import numpy as np
+import yaml
+from box_utils import batched_nms
+
+BACKENDS = ('torch', 'torchscript', 'onnx', 'openvino')
+QUANTIZATION_MODES = ('dynamic', 'static')
+CACHE_DIR = Path('models')
+
+def export_model(model_name, backend, imgsz=640, cache_dir=CACHE_DIR):
+    """Export a YOLO model for a backend once and return the cached artifact
+    
+    Like TorchScript artifacts, the name carries the cache key, so other
+    weights with the same file name or new library versions export afresh.
+    """
+    cache_dir = Path(cache_dir)
+    weights = model_weights(model_name)
+    suffix = '.onnx' if backend == 'onnx' else '_openvino_model'
+    artifact = cache_dir / f"{weights.stem}_{imgsz}_{cache_key(weights, imgsz)}{suffix}"
+    if artifact.exists():
+        return artifact
+    
+    print(f"Exporting {model_name} to {backend}...")
+    # Dynamic shapes let one artifact serve batches and other input sizes
+    return _export_to_cache(weights, artifact, format=backend, imgsz=imgsz, dynamic=True)
+
+def _export_to_cache(weights, artifact, **options):
+    """Export a private copy of the weights and rename the result into place
+    
+    Ultralytics writes exports next to the weights, so processes exporting
+    the same weights at once would otherwise share one file. Others never
+    see a partial artifact.
+    """
+    from ultralytics import YOLO
+    artifact.parent.mkdir(parents=True, exist_ok=True)
+    workdir = Path(tempfile.mkdtemp(prefix=f"{artifact.name}.", suffix='.tmp', dir=artifact.parent))
+    try:
+        private = workdir / weights.name
+        shutil.copyfile(weights, private)
+        exported = Path(YOLO(str(private)).export(**options))
+        try:
+            exported.rename(artifact)
+        except OSError:
+            pass  # Another process got there first
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return artifact
+
+def model_weights(model_name):
+    """Local path of a weights file, downloading official weights if needed"""
+    path = Path(model_name)
+    if not path.exists():
+        from ultralytics import YOLO
+        path = Path(YOLO(model_name).ckpt_path)
+    return path
+
+def cache_key(weights, imgsz=None):
+    """Short hash of what a prepared model depends on: weights, input size and library versions"""
+    digest = hashlib.sha256()
+    with open(weights, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    digest.update(f"{imgsz}|torch {version('torch')}|ultralytics {version('ultralytics')}".encode())
+    return digest.hexdigest()[:16]
+
+def export_torchscript(model_name, imgsz=640, cache_dir=CACHE_DIR):
+    """Trace a fused YOLO model for one input size once and return the cached artifact
+    
+    The artifact name carries the cache key, so new weights or a torch or
+    ultralytics upgrade trace a fresh copy.
+    """
+    cache_dir = Path(cache_dir)
+    weights = model_weights(model_name)
+    artifact = cache_dir / f"{weights.stem}_{imgsz}_{cache_key(weights, imgsz)}.torchscript"
+    if artifact.exists():
+        return artifact
+    
+    print(f"Tracing {model_name} at {imgsz}px...")
+    # Layers are fused before tracing, so the artifact loads ready to run
+    return _export_to_cache(weights, artifact, format='torchscript', imgsz=imgsz)
+
+def export_weights(model_name, cache_dir=CACHE_DIR):
+    """Save the fused weights of a YOLO model as a store of .npy files once
+    
+    The store is a directory with one .npy file per tensor and an
+    index.json holding the architecture, class names and tensor files.
+    Like TorchScript artifacts, its name carries the cache key.
+    """
+    cache_dir = Path(cache_dir)
+    weights = model_weights(model_name)
+    store = cache_dir / f"{weights.stem}_{cache_key(weights)}_weights"
+    if store.exists():
+        return store
+    
+    from ultralytics import YOLO
+    print(f"Writing memory-mappable weights for {model_name}...")
+    model = YOLO(str(weights)).model.float().fuse(verbose=False)
+    # Written aside and renamed into place, so other processes never see half a store
+    partial = cache_dir / f"{store.name}.{os.getpid()}.tmp"
+    partial.mkdir(parents=True)
+    tensors = {}
+    for i, (name, tensor) in enumerate(model.state_dict().items()):
+        tensors[name] = f"{i:04d}.npy"
+        np.save(partial / tensors[name], tensor.cpu().numpy())
+    with open(partial / 'index.json', 'w') as f:
+        json.dump({'yaml': model.yaml, 'names': model.names, 'tensors': tensors}, f)
+    
+    try:
+        partial.rename(store)
+    except OSError:
+        shutil.rmtree(partial)  # Another process got there first
+    return store
+
+def _float_head_nodes(onnx_path):
+    """Box-decoding nodes of the detection head, which stay in float"""
+    import onnx
+    graph = onnx.load(str(onnx_path)).graph
+    head = graph.node[-1].name.rsplit('/', 1)[0] + '/'
+    return [
+        node.name for node in graph.node
+        if node.name.startswith(head) and (node.op_type != 'Conv' or '/dfl/' in node.name)
+    ]
+
+def calibration_key(frames):
+    """Short hash of a set of calibration frames"""
+    digest = hashlib.sha256()
+    for frame in frames:
+        digest.update(str(frame.shape).encode())
+        digest.update(np.ascontiguousarray(frame).data)
+    return digest.hexdigest()[:16]
+
+def quantized_path(onnx_path, mode, calibration_frames=None):
+    """Where the INT8 copy of an ONNX model goes; static copies are keyed by their calibration frames"""
+    onnx_path = Path(onnx_path)
+    name = f"{onnx_path.stem}_int8_{mode}"
+    if mode == 'static' and calibration_frames:
+        name += f"_{calibration_key(calibration_frames)}"
+    return onnx_path.with_name(f"{name}.onnx")
+
+def quantize_model(onnx_path, mode, calibration_frames=None, imgsz=640):
+    """Write an INT8 copy of an exported ONNX model next to it and return its path
+    
+    'dynamic' quantizes weights only. 'static' also quantizes activations,
+    using ranges measured on calibration_frames (recorded BGR frames).
+    """
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                          quantize_dynamic, quantize_static)
+    onnx_path = Path(onnx_path)
+    output_path = quantized_path(onnx_path, mode, calibration_frames)
+    # Written aside and renamed into place, like exports
+    partial = output_path.with_name(f"{output_path.stem}.{os.getpid()}.tmp.onnx")
+    
+    if mode == 'dynamic':
+        quantize_dynamic(str(onnx_path), str(partial), weight_type=QuantType.QInt8)
+    elif mode == 'static':
+        if not calibration_frames:
+            raise ValueError("Static quantization needs calibration frames")
+        
+        class FrameReader(CalibrationDataReader):
+            def __init__(self):
+                self.batches = (preprocess([frame], imgsz)[0] for frame in calibration_frames)
+            
+            def get_next(self):
+                batch = next(self.batches, None)
+                return None if batch is None else {'images': batch}
+        
+        quantize_static(str(onnx_path), str(partial), FrameReader(),
+                        quant_format=QuantFormat.QDQ, per_channel=True,
+                        nodes_to_exclude=_float_head_nodes(onnx_path))
+    else:
+        raise ValueError(f"Unknown quantization mode '{mode}', expected one of {QUANTIZATION_MODES}")
+    
+    partial.replace(output_path)
+    return output_path
+
+def letterbox(frame, imgsz):
+    """Resize keeping aspect ratio and pad to a square imgsz canvas"""
+    height, width = frame.shape[:2]
+    scale = min(imgsz / height, imgsz / width)
+    new_w, new_h = round(width * scale), round(height * scale)
+    pad_x, pad_y = (imgsz - new_w) // 2, (imgsz - new_h) // 2
+    
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(
+        frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    return canvas, scale, (pad_x, pad_y)
+
+def preprocess(frames, imgsz):
+    """Letterbox BGR frames into an RGB NCHW float32 batch in [0, 1]"""
+    letterboxed = [letterbox(frame, imgsz) for frame in frames]
+    batch = np.stack([canvas for canvas, _, _ in letterboxed])[..., ::-1]
+    batch = np.ascontiguousarray(batch.transpose(0, 3, 1, 2), dtype=np.float32) / 255.0
+    return batch, [(scale, pad) for _, scale, pad in letterboxed]
+
+def postprocess(output, scale, pad, orig_shape, conf=0.25, iou=0.7, max_det=300, classes=None):
+    """Decode one (4 + classes, anchors) output into an (N, 6) xyxy/conf/cls array
+    
+    classes, when given, keeps only anchors whose best class is listed.
+    """
+    predictions = output.T
+    class_scores = predictions[:, 4:]
+    class_ids = class_scores.argmax(axis=1)
+    scores = class_scores[np.arange(len(class_scores)), class_ids]
+    
+    keep = scores > conf
+    if classes is not None:
+        keep &= np.isin(class_ids, classes)
+    predictions, scores, class_ids = predictions[keep], scores[keep], class_ids[keep]
+    
+    # cx, cy, w, h -> x1, y1, x2, y2
+    boxes = np.empty((len(predictions), 4), dtype=np.float32)
+    boxes[:, :2] = predictions[:, :2] - predictions[:, 2:4] / 2
+    boxes[:, 2:] = predictions[:, :2] + predictions[:, 2:4] / 2
+    
+    keep = batched_nms(boxes, scores, class_ids, iou)[:max_det]
+    boxes, scores, class_ids = boxes[keep], scores[keep], class_ids[keep]
+    
+    # Undo the letterbox so boxes land in frame pixels
+    boxes -= np.array([pad[0], pad[1], pad[0], pad[1]], dtype=np.float32)
+    boxes /= scale
+    height, width = orig_shape[:2]
+    np.clip(boxes, 0, [width, height, width, height], out=boxes)
+    
+    return np.column_stack([boxes, scores, class_ids]).astype(np.float32)
+
+class NumpyBoxes:
+    """NumPy stand-in for ultralytics Boxes (data, xyxy, conf, cls)"""
+    
+    def __init__(self, data):
+        self.data = data  # (N, 6) x1, y1, x2, y2, conf, cls
+    
+    def __len__(self):
+        return len(self.data)
+    
+    def __iter__(self):
+        return (NumpyBoxes(self.data[i:i + 1]) for i in range(len(self.data)))
+    
+    @property
+    def xyxy(self):
+        return self.data[:, :4]
+    
+    @property
+    def conf(self):
+        return self.data[:, 4]
+    
+    @property
+    def cls(self):
+        return self.data[:, 5]
+
+class NumpyResults:
+    """Per-frame results with the same boxes contract as ultralytics Results"""
+    
+    def __init__(self, boxes, orig_shape, names):
+        self.boxes = boxes
+        self.orig_shape = orig_shape
+        self.names = names
+
+class ExportedModel:
+    """Callable like YOLO(...) but running an exported graph with NumPy pre/post-processing"""
+    
+    def __init__(self, names, imgsz=640):
+        self.names = names
+        self.imgsz = imgsz
+    
+    def _run(self, batch):
+        raise NotImplementedError
+    
+    def __call__(self, source, verbose=False, imgsz=None, conf=0.25, iou=0.7, max_det=300, classes=None):
+        frames = source if isinstance(source, list) else [source]
+        imgsz = imgsz or self.imgsz
+        
+        batch, transforms = preprocess(frames, imgsz)
+        outputs = self._run(batch)
+        return [
+            NumpyResults(NumpyBoxes(postprocess(output, scale, pad, frame.shape, conf, iou, max_det, classes)),
+                         frame.shape[:2], self.names)
+            for output, frame, (scale, pad) in zip(outputs, frames, transforms)
+        ]
+
+class OnnxModel(ExportedModel):
+    def __init__(self, path, imgsz=640):
+        import onnxruntime as ort
+        self.session = ort.InferenceSession(str(path), providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        super().__init__(ast.literal_eval(metadata['names']), imgsz)
+    
+    def _run(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+class OpenVinoModel(ExportedModel):
+    def __init__(self, path, imgsz=640):
+        import openvino as ov
+        path = Path(path)
+        model = ov.Core().read_model(str(next(path.glob('*.xml'))))
+        self.compiled = ov.compile_model(model, 'CPU')
+        with open(path / 'metadata.yaml') as f:
+            metadata = yaml.safe_load(f)
+        super().__init__(metadata['names'], imgsz)
+    
+    def _run(self, batch):
+        return self.compiled(batch)[0]
+
+class TorchScriptModel(ExportedModel):
+    """Traced YOLO graphs, one per input size, loaded from the cache without ultralytics
+    
+    Tracing fixes the input size, so each size requested (adaptive
+    resolution steps through several) gets its own cached artifact,
+    traced on first use.
+    """
+    
+    def __init__(self, model_name, imgsz=640, cache_dir=CACHE_DIR):
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self._modules = {}
+        metadata = self._load(imgsz)
+        super().__init__({int(k): v for k, v in metadata['names'].items()}, imgsz)
+    
+    def _load(self, imgsz):
+        import torch
+        extra_files = {'config.txt': ''}
+        path = export_torchscript(self.model_name, imgsz, self.cache_dir)
+        self._modules[imgsz] = torch.jit.load(str(path), map_location='cpu', _extra_files=extra_files).eval()
+        return json.loads(extra_files['config.txt'])
+    
+    def _run(self, batch):
+        import torch
+        imgsz = batch.shape[-1]
+        if imgsz not in self._modules:
+            self._load(imgsz)
+        with torch.inference_mode():
+            return self._modules[imgsz](torch.from_numpy(batch)).numpy()
+
+class MappedTorchModel(ExportedModel):
+    """PyTorch YOLO model whose weights are memory-mapped from a .npy store
+    
+    The architecture is rebuilt and fused from the stored config, then its
+    parameters are pointed at read-only mappings of the store files
+    instead of being unpickled into private memory. Processes loading the
+    same store share its pages through the OS page cache, and a restart
+    reads nothing that is still cached.
+    """
+    
+    def __init__(self, model_name, imgsz=640, cache_dir=CACHE_DIR):
+        import torch
+        from ultralytics.nn.tasks import DetectionModel
+        store = export_weights(model_name, cache_dir)
+        with open(store / 'index.json') as f:
+            index = json.load(f)
+        
+        model = DetectionModel(index['yaml'], verbose=False).fuse(verbose=False).eval()
+        # Copy-on-write mappings: shared with other processes until written, which inference never does
+        tensors = {name: torch.from_numpy(np.load(store / file, mmap_mode='c'))
+                   for name, file in index['tensors'].items()}
+        model.load_state_dict(tensors, assign=True)
+        self.model = model.requires_grad_(False)
+        super().__init__({int(k): v for k, v in index['names'].items()}, imgsz)
+    
+    def _run(self, batch):
+        import torch
+        with torch.inference_mode():
+            return self.model(torch.from_numpy(batch))[0].numpy()
+
+def prepare_backend(model_name, backend='torch', imgsz=640, cache_dir=CACHE_DIR,
+                    quantization=None, calibration_frames=None, mmap_weights=False):
+    """Write what loading a model needs to the cache, once, and return its path
+    
+    Call it before starting processes that load the same model, so they
+    do not all export it at once. Returns None for the plain torch backend.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+    if quantization is not None and backend != 'onnx':
+        raise ValueError("INT8 quantization is only supported with the onnx backend")
+    if mmap_weights:
+        if backend != 'torch':
+            raise ValueError("Memory-mapped weights are only supported with the torch backend")
+        return export_weights(model_name, cache_dir)
+    if backend == 'torch':
+        return None
+    if backend == 'torchscript':
+        return export_torchscript(model_name, imgsz, cache_dir)
+    
+    path = Path(model_name)
+    if path.suffix != '.onnx' and not path.name.endswith('_openvino_model'):
+        path = export_model(model_name, backend, imgsz, cache_dir)
+    
+    if quantization is not None:
+        quantized = quantized_path(path, quantization, calibration_frames)
+        path = quantized if quantized.exists() else quantize_model(
+            path, quantization, calibration_frames, imgsz)
+    return path
+
+def load_backend(model_name, backend, imgsz=640, cache_dir=CACHE_DIR,
+                 quantization=None, calibration_frames=None):
+    """Load an exported model for a non-torch backend, exporting it on first use"""
+    if backend not in ('torchscript', 'onnx', 'openvino'):
+        raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+    if backend == 'torchscript':
+        return TorchScriptModel(model_name, imgsz, cache_dir)
+    
+    path = prepare_backend(model_name, backend, imgsz, cache_dir, quantization, calibration_frames)
+    model_class = OnnxModel if backend == 'onnx' else OpenVinoModel
+    return model_class(path, imgsz)
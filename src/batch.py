@@ -0,0 +1,170 @@
+import argparse
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from pathlib import Path
+import cv2
+from backends import BACKENDS, prepare_backend
+from detection_output import detection_record
+
+# Loaded once per worker process by _init_worker
+_detector = None
+
+def plan_shards(videos, chunk_size=500):
+    """Split videos into (video, start, end) frame ranges
+    
+    end is None when the frame count is unknown, meaning read to the end.
+    """
+    shards = []
+    for video in videos:
+        cap = cv2.VideoCapture(str(video))
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        if frame_count <= 0:
+            shards.append((str(video), 0, None))
+            continue
+        for start in range(0, frame_count, chunk_size):
+            shards.append((str(video), start, min(start + chunk_size, frame_count)))
+    return shards
+
+def shard_path(output_dir, shard):
+    video, start, _ = shard
+    return Path(output_dir) / Path(video).stem / f"{start:08d}.ndjson"
+
+def _init_worker(model_name, backend, threads, mmap_weights=False):
+    """Load the model once per worker and keep workers from oversubscribing cores"""
+    global _detector
+    import torch
+    from detector import ObjectDetector
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(1)
+    _detector = ObjectDetector(model_name, backend=backend, mmap_weights=mmap_weights)
+
+def write_atomic(path, text):
+    tmp_path = path.with_name(path.name + '.tmp')
+    tmp_path.write_text(text)
+    os.replace(tmp_path, path)
+
+def process_shard(shard, output_dir, batch_size=8, detector=None):
+    """Detect on one frame range, batch_size frames per forward pass
+    
+    Records are written in frame order to the shard's file, which only
+    appears once the whole range is done.
+    """
+    detector = detector or _detector
+    video, start, end = shard
+    path = shard_path(output_dir, shard)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    
+    cap = cv2.VideoCapture(video)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0
+    if start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    
+    lines = []
+    frame_index = start
+    try:
+        while True:
+            frames = []
+            while len(frames) < batch_size and (end is None or frame_index + len(frames) < end):
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                frames.append(frame)
+            if not frames:
+                break
+            
+            for detections in detector.detect_batch(frames):
+                record = detection_record(frame_index, detections,
+                                          timestamp=frame_index / fps if fps else None)
+                lines.append(json.dumps(record, separators=(',', ':')))
+                frame_index += 1
+    finally:
+        cap.release()
+    
+    write_atomic(path, "".join(line + "\n" for line in lines))
+    return shard, frame_index - start
+
+def merge_shards(output_dir, video):
+    """Concatenate a video's shard files, in frame order, into <stem>.ndjson"""
+    shard_dir = Path(output_dir) / Path(video).stem
+    merged = Path(output_dir) / f"{Path(video).stem}.ndjson"
+    text = "".join(path.read_text() for path in sorted(shard_dir.glob("*.ndjson")))
+    write_atomic(merged, text)
+    shutil.rmtree(shard_dir)
+    return merged
+
+def run_batch(videos, output_dir='detections', workers=None, batch_size=8, chunk_size=500,
+              model_name='yolov8n.pt', backend='torch', mmap_weights=False):
+    """Process videos across a pool of worker processes, resuming finished work
+    
+    Videos with a merged output file and shards with a written file are
+    skipped, so an interrupted run can simply be started again. With
+    mmap_weights, workers share one memory-mapped copy of the weights.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count()
+    
+    videos = [v for v in videos if not (output_dir / f"{Path(v).stem}.ndjson").exists()]
+    shards = [s for s in plan_shards(videos, chunk_size) if not shard_path(output_dir, s).exists()]
+    print(f"{len(videos)} videos to process, {len(shards)} shards left, {workers} workers")
+    
+    start = time.perf_counter()
+    total_frames = 0
+    initargs = (model_name, backend, max(1, (os.cpu_count() or 1) // workers), mmap_weights)
+    if shards:
+        # Once, before the workers load it: exports and weight stores are shared
+        prepare_backend(model_name, backend, mmap_weights=mmap_weights)
+    
+    def report(done, shard, frames):
+        elapsed = time.perf_counter() - start
+        print(f"[{done}/{len(shards)}] {Path(shard[0]).name} from frame {shard[1]}: "
+              f"{frames} frames ({total_frames / elapsed:.1f} FPS overall)")
+    
+    if shards and workers == 1:
+        # No pool: avoids a second copy of the model for small jobs
+        _init_worker(*initargs)
+        for done, shard in enumerate(shards, 1):
+            _, frames = process_shard(shard, output_dir, batch_size)
+            total_frames += frames
+            report(done, shard, frames)
+    elif shards:
+        # spawn: forked copies of an initialized torch runtime are unreliable
+        with ProcessPoolExecutor(workers, mp_context=get_context('spawn'),
+                                 initializer=_init_worker, initargs=initargs) as pool:
+            futures = [pool.submit(process_shard, shard, output_dir, batch_size) for shard in shards]
+            for done, future in enumerate(as_completed(futures), 1):
+                shard, frames = future.result()
+                total_frames += frames
+                report(done, shard, frames)
+    
+    merged = [merge_shards(output_dir, video) for video in videos]
+    print(f"Processed {total_frames} frames in {time.perf_counter() - start:.1f}s")
+    return merged
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Detect objects in recorded videos with a pool of workers")
+    parser.add_argument('videos', nargs='+', help="video files to process")
+    parser.add_argument('--output', default='detections', metavar='DIR',
+                        help="directory for the <video>.ndjson detection records")
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per core)")
+    parser.add_argument('--batch-size', type=int, default=8, help="frames per forward pass")
+    parser.add_argument('--chunk-size', type=int, default=500,
+                        help="frames per shard; also the unit of resumed work")
+    parser.add_argument('--model', default='yolov8n.pt', help="YOLO weights to load")
+    parser.add_argument('--backend', choices=BACKENDS, default='torch', help="inference runtime")
+    parser.add_argument('--mmap-weights', action='store_true',
+                        help="workers share one memory-mapped copy of the weights (torch backend)")
+    return parser.parse_args(argv)
+
+def main(args):
+    return run_batch(args.videos, args.output, args.workers, args.batch_size, args.chunk_size,
+                     args.model, args.backend, args.mmap_weights)
+
+if __name__ == "__main__":  # pragma: no cover
+    main(parse_args())
@@ -0,0 +1,152 @@
+import argparse
+import json
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+import numpy as np
+from audio_feedback import build_announcement
+from frame_sources import read_frames, synthetic_frames
+from main import add_detector_args, build_detector
+from metrics import latency_percentiles
+
+STAGES = ('capture', 'inference', 'draw', 'announce')
+
+def peak_rss_bytes():
+    """Peak resident set size of this process"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+class StageTimer:
+    """Collect per-stage latencies, plus per-frame allocation stats if tracing"""
+    
+    def __init__(self, trace_allocations=False):
+        self.samples = {stage: [] for stage in STAGES}
+        self.trace_allocations = trace_allocations
+        self.allocated_bytes = []
+        self.allocated_blocks = []
+    
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        yield
+        self.samples[name].append(time.perf_counter() - start)
+    
+    @contextmanager
+    def frame(self):
+        if not self.trace_allocations:
+            yield
+            return
+        tracemalloc.reset_peak()
+        start_bytes, _ = tracemalloc.get_traced_memory()
+        start_blocks = sys.getallocatedblocks()
+        yield
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        self.allocated_bytes.append(peak_bytes - start_bytes)
+        self.allocated_blocks.append(sys.getallocatedblocks() - start_blocks)
+
+def run_benchmark(detector, frames, warmup=5, trace_allocations=False, limit=None):
+    """Drive the main-loop stages over frames without a display or audio device
+    
+    The first warmup frames are run but not measured; limit caps the
+    frames measured after them.
+    """
+    frames = iter(frames)
+    timer = StageTimer(trace_allocations)
+    
+    # Warm-up frames are run but not measured
+    for _ in range(warmup):
+        frame = next(frames, None)
+        if frame is None:
+            break
+        detector.draw_detections(frame, detector.detect(frame))
+    
+    if trace_allocations:
+        tracemalloc.start()
+    
+    count = 0
+    inferred = 0
+    start = time.perf_counter()
+    while limit is None or count < limit:
+        read_start = time.perf_counter()
+        frame = next(frames, None)
+        if frame is None:
+            break
+        timer.samples['capture'].append(time.perf_counter() - read_start)
+        
+        with timer.frame():
+            # The same call as the main loop, so tracking and the motion gate apply
+            with timer.stage('inference'):
+                detections = detector.detect(frame)
+            with timer.stage('draw'):
+                detector.draw_detections(frame, detections)
+            with timer.stage('announce'):
+                build_announcement(detector.get_detections_list(detections))
+        inferred += bool(detections.inferred)
+        count += 1
+    elapsed = time.perf_counter() - start
+    
+    if trace_allocations:
+        tracemalloc.stop()
+    
+    report = {
+        'frames': count,
+        'fps': count / elapsed if elapsed else 0.0,
+        'inferred': inferred,
+        'inference_skipped': count - inferred,
+        'stages': {stage: latency_percentiles(samples) for stage, samples in timer.samples.items()},
+        'peak_rss_bytes': peak_rss_bytes(),
+    }
+    if trace_allocations and count:
+        report['allocations'] = {
+            'peak_bytes_per_frame': float(np.mean(timer.allocated_bytes)),
+            'net_blocks_per_frame': float(np.mean(timer.allocated_blocks)),
+        }
+    return report
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Benchmark detection without a camera, display or audio")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--video', help="video file to read frames from")
+    source.add_argument('--images', metavar='DIR', help="directory of images to read frames from")
+    source.add_argument('--synthetic', type=int, metavar='N', help="generate N synthetic frames")
+    parser.add_argument('--size', default='640x480', help="synthetic frame size as WIDTHxHEIGHT")
+    parser.add_argument('--limit', type=int, help="maximum frames to measure, not counting warm-up")
+    parser.add_argument('--warmup', type=int, default=5, help="frames to run before measuring")
+    parser.add_argument('--trace-allocations', action='store_true',
+                        help="report Python allocations per frame (slows the run down)")
+    parser.add_argument('--output', help="write the JSON report to this file instead of stdout")
+    add_detector_args(parser)
+    return parser.parse_args(argv)
+
+def main(args):
+    if args.synthetic is not None:
+        width, height = (int(v) for v in args.size.split('x'))
+        frames = synthetic_frames(args.synthetic + args.warmup, width, height)
+    else:
+        frames = read_frames(args.video or args.images)
+    
+    detector = build_detector(args)
+    report = run_benchmark(detector, frames, args.warmup, args.trace_allocations, args.limit)
+    report['config'] = {
+        'source': args.video or args.images or f"synthetic:{args.synthetic}@{args.size}",
+        **{k: v for k, v in vars(args).items()
+           if k not in ('video', 'images', 'synthetic', 'output')},
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+    }
+    
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+    return report
+
+if __name__ == "__main__":  # pragma: no cover
+    main(parse_args())
@@ -0,0 +1,87 @@
+import numpy as np
+
+def box_area(boxes):
+    """Area of (N, 4) x1, y1, x2, y2 boxes"""
+    boxes = np.asarray(boxes, dtype=np.float32)
+    return np.clip(boxes[:, 2] - boxes[:, 0], 0, None) * np.clip(boxes[:, 3] - boxes[:, 1], 0, None)
+
+def box_iou(boxes_a, boxes_b):
+    """Pairwise IoU between (N, 4) and (M, 4) boxes as an (N, M) array"""
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    overlap = np.clip(bottom_right - top_left, 0, None)
+    intersection = overlap[..., 0] * overlap[..., 1]
+    
+    union = box_area(a)[:, None] + box_area(b)[None, :] - intersection
+    return intersection / np.maximum(union, 1e-9)
+
+def nms(boxes, scores, iou_threshold):
+    """Greedy non-maximum suppression; returns kept indices by descending score"""
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    order = np.argsort(-np.asarray(scores), kind='stable')
+    keep = []
+    
+    while order.size:
+        best = order[0]
+        keep.append(best)
+        # Drop everything overlapping the best box in one vectorized step
+        iou = box_iou(boxes[best:best + 1], boxes[order[1:]])[0]
+        order = order[1:][iou <= iou_threshold]
+    
+    return np.array(keep, dtype=np.int64)
+
+def batched_nms(boxes, scores, class_ids, iou_threshold):
+    """Class-aware NMS: boxes only suppress boxes of the same class"""
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    if not len(boxes):
+        return np.zeros(0, dtype=np.int64)
+    # Shift each class into its own coordinate range so they never overlap
+    offsets = np.asarray(class_ids, dtype=np.float32)[:, None] * (boxes.max() + 1)
+    return nms(boxes + offsets, scores, iou_threshold)
+
+def clip_region(roi, width, height):
+    """Clip an (x1, y1, x2, y2) region of interest to the frame; None means the whole frame"""
+    if roi is None:
+        return 0, 0, width, height
+    x1, y1, x2, y2 = roi
+    x1, x2 = max(0, min(x1, width)), max(0, min(x2, width))
+    y1, y2 = max(0, min(y1, height)), max(0, min(y2, height))
+    if x2 <= x1 or y2 <= y1:
+        raise ValueError(f"Region of interest {tuple(roi)} is empty in a {width}x{height} frame")
+    return x1, y1, x2, y2
+
+def plan_tiles(width, height, tile_size=None, overlap=0.2, roi=None):
+    """Overlapping square tiles covering the frame (or roi) as an (N, 4) array
+    
+    Tiles advance by tile_size * (1 - overlap) and the last row and column
+    are shifted back to end at the region edge, so all tiles have the same
+    size. Without tile_size the region is one tile.
+    """
+    x1, y1, x2, y2 = clip_region(roi, width, height)
+    if tile_size is None:
+        return np.array([[x1, y1, x2, y2]], dtype=np.int32)
+    if tile_size <= 0:
+        raise ValueError(f"Tile size must be positive, got {tile_size}")
+    # Negative overlap leaves gaps between tiles; overlap near 1 plans thousands of them
+    if not 0 <= overlap < 1:
+        raise ValueError(f"Tile overlap must be at least 0 and below 1, got {overlap}")
+    stride = max(1, int(tile_size * (1 - overlap)))
+    
+    def starts(low, high):
+        if high - low <= tile_size:
+            return [low], high - low
+        return list(range(low, high - tile_size, stride)) + [high - tile_size], tile_size
+    
+    xs, tile_width = starts(x1, x2)
+    ys, tile_height = starts(y1, y2)
+    return np.array([[x, y, x + tile_width, y + tile_height] for y in ys for x in xs], dtype=np.int32)
+
+def merge_tile_boxes(tile_boxes, offsets, iou_threshold=0.5):
+    """Map per-tile (N, 6) boxes to frame coordinates and drop duplicates across seams"""
+    shifted = [np.asarray(boxes, dtype=np.float32).reshape(-1, 6) + [x, y, x, y, 0, 0]
+               for boxes, (x, y) in zip(tile_boxes, np.asarray(offsets).tolist())]
+    data = np.concatenate(shifted).astype(np.float32) if shifted else np.zeros((0, 6), np.float32)
+    return data[batched_nms(data[:, :4], data[:, 4], data[:, 5], iou_threshold)]
@@ -0,0 +1,159 @@
+import time
+import cv2
+import numpy as np
+
+class StampedFrame(np.ndarray):
+    """Frame carrying the perf_counter time it was captured at
+    
+    The stamp survives copies and views, so it travels with the frame
+    through queues, drawing and batching.
+    """
+    
+    def __array_finalize__(self, obj):
+        self.captured_at = getattr(obj, 'captured_at', None)
+
+def stamp(frame, captured_at):
+    frame = frame.view(StampedFrame)
+    frame.captured_at = captured_at
+    return frame
+
+def captured_at(frame):
+    """Capture time of a frame read through TimestampedCapture, else None"""
+    return getattr(frame, 'captured_at', None)
+
+def observe_latency(metrics, name, frame):
+    """Record the time since frame was captured as one observation of name"""
+    start = captured_at(frame)
+    if metrics is not None and start is not None:
+        metrics.observe(name, time.perf_counter() - start)
+
+def latency_report(metrics):
+    """Lines summarizing capture-to-detection and capture-to-speech latency"""
+    stages = metrics.snapshot()['stages']
+    lines = []
+    for name, title in (('capture_to_detection', "Capture to detection"),
+                        ('capture_to_speech', "Capture to speech")):
+        summary = stages.get(name)
+        if summary and summary['count']:
+            lines.append(f"{title}: p50 {summary['p50_ms']:.1f} ms, p95 {summary['p95_ms']:.1f} ms "
+                         f"({summary['total_count']} samples)")
+    return lines
+
+def fourcc_name(value):
+    value = int(value)
+    return "".join(chr((value >> 8 * i) & 0xFF) for i in range(4)).strip('\0')
+
+def configure_capture(cap, width=None, height=None, fps=None, fourcc='MJPG', buffer_size=1):
+    """Ask a camera for low-latency settings and return what it agreed to
+    
+    Drivers often default to uncompressed YUYV, which caps the frame rate
+    at higher resolutions, and keep several frames queued. MJPG and a
+    one-frame buffer avoid both where the driver supports them; anything
+    not supported is silently kept at the driver's choice, so read the
+    returned settings rather than assuming.
+    """
+    # FOURCC first: it decides which sizes and rates are available
+    if fourcc:
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+    if width:
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    if height:
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    if fps:
+        cap.set(cv2.CAP_PROP_FPS, fps)
+    if buffer_size:
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+    
+    return {
+        'fourcc': fourcc_name(cap.get(cv2.CAP_PROP_FOURCC)),
+        'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        'fps': cap.get(cv2.CAP_PROP_FPS),
+        'buffer_size': int(cap.get(cv2.CAP_PROP_BUFFERSIZE)),
+    }
+
+class TimestampedCapture:
+    """VideoCapture wrapper that stamps each frame with its capture time
+    
+    Frames are stamped when the capture hands them over. With drain > 0,
+    up to drain frames already waiting in the driver's
+    buffer are grabbed and discarded before each read, stopping as soon as
+    a grab has to wait for a new frame (longer than drain_wait seconds).
+    Only the kept frame is decoded. Leave drain at 0 for files, where it
+    would skip frames.
+    """
+    
+    def __init__(self, cap, drain=0, drain_wait=0.005):
+        self.cap = cap
+        self.drain = drain
+        self.drain_wait = drain_wait
+        self.drained = 0
+    
+    def read(self, image=None):
+        if not self.drain:
+            ret, frame = self.cap.read(image) if image is not None else self.cap.read()
+            return (True, stamp(frame, time.perf_counter())) if ret else (False, None)
+        
+        if not self.cap.grab():
+            return False, None
+        captured = time.perf_counter()
+        for _ in range(self.drain):
+            start = time.perf_counter()
+            if not self.cap.grab():
+                break
+            captured = time.perf_counter()
+            if captured - start > self.drain_wait:
+                break  # That one was fresh, not buffered
+            self.drained += 1
+        
+        ret, frame = self.cap.retrieve(image) if image is not None else self.cap.retrieve()
+        if not ret:
+            return False, None
+        return True, stamp(frame, captured)
+    
+    def __getattr__(self, name):
+        # isOpened, get, set, release, ... go to the wrapped capture
+        return getattr(self.cap, name)
+
+class FileCamera:
+    """Video file played back in real time, standing in for a live camera
+    
+    Frame k becomes available fps-paced after the first read. Reading waits
+    for the next frame; frames that came and went while the reader was busy
+    are skipped, like a camera with a one-frame buffer.
+    """
+    
+    def __init__(self, path, fps=None):
+        self.cap = cv2.VideoCapture(str(path))
+        self.fps = fps or self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.skipped = 0
+        self._start = None
+        self._next = 0
+    
+    def grab(self):
+        now = time.perf_counter()
+        if self._start is None:
+            self._start = now
+        newest = int((now - self._start) * self.fps)
+        while self._next < newest:
+            if not self.cap.grab():
+                return False
+            self._next += 1
+            self.skipped += 1
+        
+        due = self._start + self._next / self.fps
+        if due > now:
+            time.sleep(due - now)
+        self._next += 1
+        return self.cap.grab()
+    
+    def retrieve(self, image=None):
+        return self.cap.retrieve(image) if image is not None else self.cap.retrieve()
+    
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+    
+    def __getattr__(self, name):
+        return getattr(self.cap, name)
@@ -0,0 +1,164 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
+from box_utils import box_iou
+from detector import DISTANCE_LABELS, FrameDetections
+
+CLOSE = DISTANCE_LABELS.index('close')
+
+def merge_refined(detections, refined, iou_threshold=0.5):
+    """Merge refined detections into fresh DETECTION_DTYPE detections
+    
+    Fresh boxes that overlap a refined box keep their (newer) position but
+    take its class and confidence, whatever class they had. Refined boxes
+    matching nothing are left out: they are from an older frame, and the
+    object may since have moved away from them. Returns the merged array
+    and, per fresh row, the refined row it took (-1 when none).
+    """
+    merged = detections.copy()
+    source = np.full(len(detections), -1, dtype=np.intp)
+    if not len(detections) or not len(refined):
+        return merged, source
+    
+    iou = box_iou(detections['box'], refined['box'])
+    best = iou.argmax(axis=1)
+    matched = iou[np.arange(len(detections)), best] >= iou_threshold
+    source[matched] = best[matched]
+    merged['class_id'][matched] = refined['class_id'][best[matched]]
+    merged['confidence'][matched] = refined['confidence'][best[matched]]
+    return merged, source
+
+class RefinementCascade:
+    """Run a larger, slower detector now and then and merge its results back in
+    
+    The fast detector handles every frame. The accurate detector (an
+    ObjectDetector for e.g. yolov8s.pt) runs on its own thread, one frame
+    at a time, and only when something asks for it: a close object the
+    fast model is unsure about (confidence below uncertain_below), a new
+    track, or an explicit request(). Triggered refinements are at least
+    min_interval seconds apart, so its cost stays bounded.
+    
+    Refined results are matched to later detections by box overlap for
+    max_age seconds after they arrive. With tracking, a track keeps its
+    refined class and confidence for as long as it lives, and is not
+    refined again. Objects only the larger model found are not added to
+    later frames, but are part of the detections a request() resolves to.
+    """
+    
+    def __init__(self, detector, uncertain_below=0.6, min_interval=1.0, max_age=1.0, iou_threshold=0.5):
+        self.detector = detector
+        self.uncertain_below = uncertain_below
+        self.min_interval = min_interval
+        self.max_age = max_age
+        self.iou_threshold = iou_threshold
+        self.counts = {'low_confidence': 0, 'new_track': 0, 'requested': 0}
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='refine')
+        self._pending = None
+        self._requested = None
+        self._request_lock = threading.Lock()  # request() may come from another thread
+        self._last_submitted = None
+        self._newest_track = -1
+        self._latest = None  # (refined detections, perf_counter time they arrived)
+        self._track_refinements = {}  # track id -> (class id, confidence)
+    
+    @property
+    def busy(self):
+        return self._pending is not None and not self._pending.done()
+    
+    def request(self):
+        """Refine the next frame regardless of triggers
+        
+        Returns a Future that gets the refined FrameDetections, e.g. to
+        describe the whole scene once they arrive.
+        """
+        with self._request_lock:
+            if self._requested is None:
+                self._requested = Future()
+            return self._requested
+    
+    def warm_up(self):
+        """Warm the accurate model up on its own thread, without waiting for it"""
+        if not self.busy:
+            self._pending = self._pool.submit(self.detector.warm_up)
+    
+    def wait(self, timeout=None):
+        """Wait for the refinement in flight, if any"""
+        if self._pending is not None:
+            self._pending.result(timeout)
+    
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+    
+    def summary(self):
+        """One line with how often the larger model ran, and why"""
+        reasons = ', '.join(f"{reason.replace('_', ' ')} {count}" for reason, count in self.counts.items())
+        return f"Refined {sum(self.counts.values())} frames with the larger model ({reasons})"
+    
+    def _trigger(self, detections):
+        """Why these detections need the accurate model, or None"""
+        if self._requested is not None:
+            return 'requested'
+        if (self._last_submitted is not None
+                and time.perf_counter() - self._last_submitted < self.min_interval):
+            return None
+        if detections.inferred and (detections.track_ids > self._newest_track).any():
+            return 'new_track'
+        unsure = (detections.distances == CLOSE) & (detections.confidences < self.uncertain_below)
+        unsure &= ~np.isin(detections.track_ids, list(self._track_refinements))
+        if unsure.any():
+            return 'low_confidence'
+        return None
+    
+    def _refine(self, frame, requested):
+        try:
+            refined = self.detector.parse_detections(self.detector.detect_objects(frame))
+        except BaseException as error:
+            if requested is not None:
+                requested.set_exception(error)
+            raise
+        self._latest = (refined.detections, time.perf_counter())
+        if requested is not None:
+            requested.set_result(refined)
+        return refined
+    
+    def process(self, frame, detections):
+        """Start a refinement if triggered and merge in the latest refined results"""
+        reason = None if self.busy else self._trigger(detections)
+        if reason is not None:
+            self.counts[reason] += 1
+            self._last_submitted = time.perf_counter()
+            if len(detections):
+                self._newest_track = max(self._newest_track, int(detections.track_ids.max()))
+            with self._request_lock:
+                requested, self._requested = self._requested, None
+            # The caller draws on its frame while the accurate model reads it
+            self._pending = self._pool.submit(self._refine, np.array(frame), requested)
+        return self._merge(detections)
+    
+    def _merge(self, detections):
+        if self._latest is not None and time.perf_counter() - self._latest[1] > self.max_age:
+            self._latest = None
+        if self._latest is None and not self._track_refinements:
+            return detections
+        
+        merged = detections.detections
+        track_ids = detections.track_ids.tolist()
+        if self._latest is not None:
+            refined = self._latest[0]
+            merged, source = merge_refined(merged, refined, self.iou_threshold)
+            for track_id, row in zip(track_ids, source.tolist()):
+                if track_id >= 0 and row >= 0:
+                    self._track_refinements[track_id] = (refined['class_id'][row], refined['confidence'][row])
+        else:
+            merged = merged.copy()
+        
+        # Tracks end when the tracker drops them
+        if detections.inferred:
+            self._track_refinements = {track_id: refinement for track_id, refinement
+                                       in self._track_refinements.items() if track_id in track_ids}
+        for row, track_id in enumerate(track_ids):
+            refinement = self._track_refinements.get(track_id)
+            if refinement is not None:
+                merged['class_id'][row], merged['confidence'][row] = refinement
+        return FrameDetections(merged, detections.names, detections.inferred)
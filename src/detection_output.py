@@ -0,0 +1,63 @@
+import json
+import socket
+import sys
+import time
+
+OUTPUT_FORMATS = ('ndjson', 'msgpack')
+
+def detection_record(frame_index, detections, timestamp=None):
+    """Plain-data record of one frame's detections"""
+    return {
+        'frame': frame_index,
+        'timestamp': time.time() if timestamp is None else timestamp,
+        'inferred': bool(detections.inferred),
+        'detections': [
+            {**detection, 'class_id': class_id, 'box': box, 'track_id': track_id}
+            for detection, class_id, box, track_id in zip(detections.to_list(),
+                                                          detections.class_ids.tolist(),
+                                                          detections.boxes.tolist(),
+                                                          detections.track_ids.tolist())
+        ],
+    }
+
+class DetectionWriter:
+    """Write records to a binary stream as JSON lines or consecutive msgpack maps"""
+    
+    def __init__(self, stream, output_format='ndjson', sock=None):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format '{output_format}', expected one of {OUTPUT_FORMATS}")
+        if output_format == 'msgpack':
+            import msgpack
+            self._packer = msgpack.Packer()
+        self.stream = stream
+        self.output_format = output_format
+        self._sock = sock
+    
+    def write(self, record):
+        if self.output_format == 'ndjson':
+            data = (json.dumps(record, separators=(',', ':')) + '\n').encode()
+        else:
+            data = self._packer.pack(record)
+        self.stream.write(data)
+        # Consumers read records as they happen, not when a buffer fills
+        self.stream.flush()
+    
+    def close(self):
+        if self._sock is None:
+            self.stream.flush()
+            return
+        self.stream.close()
+        self._sock.close()
+
+def open_writer(output_format='ndjson', socket_path=None):
+    """Writer to a listening Unix socket at socket_path, or to stdout"""
+    if socket_path is None:
+        return DetectionWriter(sys.stdout.buffer, output_format)
+    
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(socket_path))
+        return DetectionWriter(sock.makefile('wb'), output_format, sock)
+    except Exception:
+        sock.close()
+        raise
@@ -0,0 +1,316 @@
+import argparse
+import json
+import os
+import socket
+import stat
+import struct
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from queue import Empty, Queue
+import numpy as np
+from backends import BACKENDS, QUANTIZATION_MODES, NumpyBoxes, NumpyResults
+from detector import ObjectDetector, boxes_to_array
+
+# Messages are a length-prefixed JSON header followed by raw array payloads:
+#   server hello:  {"names": {...}}
+#   request:       {"shapes": [[h, w, c], ...], "imgsz": n|null, "options": {...}} + uint8 frames
+#                  (options: conf, iou, max_det, classes, as passed to the model)
+#   reply:         {"counts": [n, ...]} + float32 (sum(counts), 6) boxes
+#                  or {"error": "..."}
+HEADER_SIZE = struct.Struct('!I')
+BOX_COLUMNS = 6
+# Clients share the model, so they may only set what affects their own boxes
+MODEL_OPTIONS = ('conf', 'iou', 'max_det', 'classes')
+
+def _recv_exactly(sock, size):
+    buf = bytearray(size)
+    view = memoryview(buf)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if not n:
+            raise ConnectionError("Detection server connection closed")
+        received += n
+    return buf
+
+def send_message(sock, header, payloads=()):
+    """Send a JSON header and the arrays it describes"""
+    data = json.dumps(header, separators=(',', ':')).encode()
+    sock.sendall(HEADER_SIZE.pack(len(data)) + data)
+    for payload in payloads:
+        payload = np.ascontiguousarray(payload).reshape(-1)
+        if payload.size:
+            sock.sendall(memoryview(payload).cast('B'))
+
+def recv_header(sock):
+    size, = HEADER_SIZE.unpack(_recv_exactly(sock, HEADER_SIZE.size))
+    return json.loads(_recv_exactly(sock, size))
+
+class DetectionServer:
+    """Serve one model to many local clients, batching concurrent requests
+    
+    Frames that arrive within max_wait seconds of the first waiting frame
+    share a forward pass of up to max_batch frames, as long as they asked
+    for the same input size and model options. Replies carry the model
+    boxes; per-class thresholds, tracking and parsing stay with each client.
+    """
+    
+    def __init__(self, model, socket_path, max_batch=8, max_wait=0.005):
+        self.model = model
+        self.socket_path = str(socket_path)
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.frames = 0
+        self._requests = Queue()
+        self._stop = threading.Event()
+        self._listener = None
+        self._connections = set()
+        self._connections_lock = threading.Lock()
+        self._threads = []
+    
+    @property
+    def running(self):
+        return self._listener is not None and not self._stop.is_set()
+    
+    def start(self):
+        """Listen on the socket and start the batching thread"""
+        # A socket file left by a server that did not shut down cleanly
+        path = Path(self.socket_path)
+        if path.exists() and stat.S_ISSOCK(path.stat().st_mode):
+            path.unlink()
+        
+        self._stop.clear()
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(self.socket_path)
+        self._listener.listen()
+        self._listener.settimeout(0.1)
+        self._threads = [
+            threading.Thread(target=self._accept_loop, daemon=True),
+            threading.Thread(target=self._batch_loop, daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+    
+    def serve_forever(self):
+        self.start()
+        try:
+            while not self._stop.wait(0.5):
+                pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+    
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+        self._threads = []
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+        # Unblock client threads waiting for their next request
+        with self._connections_lock:
+            for conn in self._connections:
+                try:
+                    conn.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+    
+    def submit(self, frame, imgsz=None, options=None):
+        """Queue a frame for the next batch; the future resolves to its (N, 6) boxes
+        
+        options are keyword arguments for the model, out of MODEL_OPTIONS.
+        """
+        options = options or {}
+        if not isinstance(options, dict):
+            raise ValueError("Model options must be an object")
+        unsupported = sorted(set(options) - set(MODEL_OPTIONS))
+        if unsupported:
+            raise ValueError(f"Unsupported model options {unsupported}, expected some of {MODEL_OPTIONS}")
+        if imgsz is not None and (not isinstance(imgsz, int) or imgsz <= 0):
+            raise ValueError(f"Invalid input size {imgsz!r}")
+        future = Future()
+        self._requests.put((frame, (imgsz, json.dumps(options, sort_keys=True)), future))
+        return future
+    
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                conn, _ = self._listener.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            threading.Thread(target=self._serve_client, args=(conn,), daemon=True).start()
+    
+    def _serve_client(self, conn):
+        with self._connections_lock:
+            self._connections.add(conn)
+        try:
+            names = {str(class_id): name for class_id, name in self.model.names.items()}
+            send_message(conn, {'names': names})
+            while not self._stop.is_set():
+                header = recv_header(conn)
+                try:
+                    shapes = [[int(n) for n in shape] for shape in header['shapes']]
+                except (KeyError, TypeError, ValueError) as e:
+                    # Without shapes the frames that follow cannot be skipped
+                    send_message(conn, {'error': f"Malformed request header: {e!r}"})
+                    break
+                frames = [np.frombuffer(_recv_exactly(conn, int(np.prod(shape))), np.uint8).reshape(shape)
+                          for shape in shapes]
+                try:
+                    futures = [self.submit(frame, header.get('imgsz'), header.get('options'))
+                               for frame in frames]
+                    boxes = [future.result() for future in futures]
+                except Exception as e:
+                    send_message(conn, {'error': str(e)})
+                    continue
+                data = np.concatenate(boxes) if boxes else np.empty((0, BOX_COLUMNS), np.float32)
+                send_message(conn, {'counts': [len(b) for b in boxes]}, [data.astype(np.float32)])
+        except (ConnectionError, OSError, ValueError):
+            pass  # Client went away or sent garbage: drop the connection
+        finally:
+            with self._connections_lock:
+                self._connections.discard(conn)
+            conn.close()
+    
+    def _batch_loop(self):
+        while not self._stop.is_set():
+            try:
+                batch = [self._requests.get(timeout=0.1)]
+            except Empty:
+                continue
+            
+            # Gather whatever else arrives before the first frame's deadline
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._requests.get(timeout=remaining))
+                except Empty:
+                    break
+            self._run_batch(batch)
+    
+    def _run_batch(self, batch):
+        # One forward pass per inference size and set of options requested in the batch
+        groups = {}
+        for request in batch:
+            groups.setdefault(request[1], []).append(request)
+        
+        for (imgsz, options), requests in groups.items():
+            frames = [frame for frame, _, _ in requests]
+            options = json.loads(options)
+            if imgsz is not None:
+                options['imgsz'] = imgsz
+            try:
+                results = self.model(frames, verbose=False, **options)
+                boxes = [boxes_to_array(result.boxes) for result in results]
+            except Exception as e:
+                for _, _, future in requests:
+                    future.set_exception(e)
+                continue
+            
+            self.batches += 1
+            self.frames += len(frames)
+            for (_, _, future), frame_boxes in zip(requests, boxes):
+                future.set_result(frame_boxes)
+
+class RemoteModel:
+    """Callable like YOLO(...), but running on a DetectionServer
+    
+    Keeps one connection; calls from several threads take turns on it.
+    """
+    
+    def __init__(self, socket_path, timeout=None):
+        self.socket_path = str(socket_path)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._sock.settimeout(timeout)
+            self._sock.connect(self.socket_path)
+            hello = recv_header(self._sock)
+        except Exception:
+            self._sock.close()
+            raise
+        self.names = {int(class_id): name for class_id, name in hello['names'].items()}
+        self._lock = threading.Lock()
+    
+    def __call__(self, source, verbose=False, imgsz=None, **options):
+        frames = source if isinstance(source, list) else [source]
+        frames = [np.ascontiguousarray(frame, dtype=np.uint8) for frame in frames]
+        header = {'shapes': [frame.shape for frame in frames], 'imgsz': imgsz, 'options': options}
+        
+        with self._lock:
+            send_message(self._sock, header, frames)
+            reply = recv_header(self._sock)
+            if 'error' in reply:
+                raise RuntimeError(f"Detection server error: {reply['error']}")
+            counts = reply['counts']
+            size = sum(counts) * BOX_COLUMNS * 4
+            data = np.frombuffer(_recv_exactly(self._sock, size), np.float32).reshape(-1, BOX_COLUMNS)
+        
+        offsets = np.cumsum([0] + counts).tolist()
+        return [NumpyResults(NumpyBoxes(data[start:end]), frame.shape[:2], self.names)
+                for frame, start, end in zip(frames, offsets, offsets[1:])]
+    
+    def close(self):
+        self._sock.close()
+
+class DetectionClient(ObjectDetector):
+    """ObjectDetector whose model runs in a shared DetectionServer
+    
+    Model options (confidence, IoU, class allow-list) travel with each
+    request. Per-class thresholds, tracking, the motion gate, adaptive
+    resolution, tiling and a cascade's larger model still run in this
+    process.
+    """
+    
+    def __init__(self, socket_path, confidence_threshold=0.5, detect_interval=1, track=False,
+                 motion_gate=None, latency_target=None, tile_size=None, tile_overlap=0.2, roi=None,
+                 iou_threshold=0.7, max_detections=300, classes=None, class_confidence=None, cascade=None,
+                 timeout=None):
+        super().__init__(confidence_threshold=confidence_threshold, detect_interval=detect_interval,
+                         track=track, motion_gate=motion_gate, latency_target=latency_target,
+                         tile_size=tile_size, tile_overlap=tile_overlap, roi=roi,
+                         iou_threshold=iou_threshold, max_detections=max_detections, classes=classes,
+                         class_confidence=class_confidence, cascade=cascade,
+                         model=RemoteModel(socket_path, timeout))
+    
+    def close(self):
+        self.model.close()
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Serve one detection model to local clients")
+    parser.add_argument('--socket', default='/tmp/vision-assistant.sock', metavar='PATH',
+                        help="Unix socket to listen on")
+    parser.add_argument('--max-batch', type=int, default=8, help="most frames per forward pass")
+    parser.add_argument('--max-wait', type=float, default=5.0, metavar='MS',
+                        help="longest a frame waits for others to batch with")
+    parser.add_argument('--model', default='yolov8n.pt', help="YOLO weights to load")
+    parser.add_argument('--backend', choices=BACKENDS, default='torch', help="inference runtime")
+    parser.add_argument('--quantize', choices=QUANTIZATION_MODES,
+                        help="run an INT8 copy of the model (onnx backend)")
+    return parser.parse_args(argv)
+
+def main(args):
+    detector = ObjectDetector(args.model, backend=args.backend, quantization=args.quantize)
+    print(f"Warm-up pass: {detector.warm_up():.2f}s")
+    server = DetectionServer(detector.model, args.socket, args.max_batch, args.max_wait / 1000)
+    print(f"Serving {args.model} on {args.socket}")
+    server.serve_forever()
+    average = server.frames / server.batches if server.batches else 0
+    print(f"Served {server.frames} frames in {server.batches} batches ({average:.1f} frames per batch)")
+    return server
+
+if __name__ == "__main__":  # pragma: no cover
+    main(parse_args())
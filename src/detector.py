@@ -1,63 +1,354 @@
-import cv2
-from ultralytics import YOLO
+import time
 import numpy as np
+from backends import MappedTorchModel, NumpyBoxes, NumpyResults, load_backend
+from box_utils import clip_region, merge_tile_boxes, plan_tiles
+from overlay import OverlayRenderer
+from resolution import ResolutionController
+from tracker import IoUTracker
+
+# Distance buckets by box area in pixels: far <= 20k < medium <= 50k < close
+DISTANCE_LABELS = ('far', 'medium', 'close')
+DISTANCE_AREA_THRESHOLDS = np.array([20000, 50000])
+
+# One row per detection, compact enough to keep for every frame
+DETECTION_DTYPE = np.dtype([
+    ('box', np.int32, (4,)),    # x1, y1, x2, y2 in frame pixels
+    ('confidence', np.float32),
+    ('class_id', np.int32),
+    ('area', np.int64),
+    ('distance', np.uint8),     # index into DISTANCE_LABELS
+    ('track_id', np.int32),     # -1 when not tracked
+])
+
+def boxes_to_array(boxes):
+    """Copy boxes to an (N, 6) array of x1, y1, x2, y2, conf, cls"""
+    data = getattr(boxes, 'data', None)
+    if data is not None:
+        # Single host transfer; tracked boxes carry an extra id column
+        if hasattr(data, 'cpu'):
+            data = data.cpu().numpy()
+        data = np.asarray(data, dtype=np.float32).reshape(-1, np.shape(data)[-1])
+        return np.hstack([data[:, :4], data[:, -2:]])
+    
+    # Plain iterables of per-box objects
+    rows = [[*box.xyxy[0], box.conf[0], box.cls[0]] for box in boxes]
+    return np.asarray(rows, dtype=np.float32).reshape(-1, 6)
+
+def set_box_geometry(detections):
+    """Fill in area and distance from the boxes of a DETECTION_DTYPE array"""
+    # Calculate distance (simple approximation based on box size)
+    # Larger box = closer object
+    boxes = detections['box']
+    widths = (boxes[:, 2] - boxes[:, 0]).astype(np.int64)
+    detections['area'] = widths * (boxes[:, 3] - boxes[:, 1])
+    detections['distance'] = np.searchsorted(DISTANCE_AREA_THRESHOLDS, detections['area'])
+    return detections
+
+class FrameDetections:
+    """Detections for one frame, parsed once and shared by every consumer"""
+    
+    def __init__(self, detections, names, inferred=True):
+        self.detections = detections  # DETECTION_DTYPE array
+        self.names = names
+        self.inferred = inferred  # False when carried forward by the tracker
+        self.captured_at = None  # perf_counter capture time of the frame, when known
+    
+    def __len__(self):
+        return len(self.detections)
+    
+    @property
+    def boxes(self):
+        return self.detections['box']
+    
+    @property
+    def confidences(self):
+        return self.detections['confidence']
+    
+    @property
+    def class_ids(self):
+        return self.detections['class_id']
+    
+    @property
+    def distances(self):
+        return self.detections['distance']
+    
+    @property
+    def track_ids(self):
+        return self.detections['track_id']
+    
+    @property
+    def labels(self):
+        return [self.names[class_id] for class_id in self.class_ids.tolist()]
+    
+    def above(self, confidence_threshold):
+        """Get the detections with confidence above a stricter threshold"""
+        keep = self.detections['confidence'] > confidence_threshold
+        return FrameDetections(self.detections[keep], self.names, self.inferred)
+    
+    def to_list(self):
+        """Convert to a list of dicts"""
+        return [
+            {
+                'label': label,
+                'confidence': confidence,
+                'distance': DISTANCE_LABELS[distance]
+            }
+            for label, confidence, distance in zip(self.labels,
+                                                   self.confidences.tolist(),
+                                                   self.distances.tolist())
+        ]
 
 class ObjectDetector:
-    def __init__(self, model_name='yolov8n.pt'):
-        """Initialize YOLO model"""
-        print(f"Loading {model_name}...")
-        self.model = YOLO(model_name)
-        print("Model loaded successfully!")
+    def __init__(self, model_name='yolov8n.pt', confidence_threshold=0.5,
+                 detect_interval=1, track=False, motion_gate=None, backend='torch',
+                 quantization=None, calibration_frames=None, latency_target=None, model=None,
+                 tile_size=None, tile_overlap=0.2, roi=None, mmap_weights=False, iou_threshold=0.7,
+                 max_detections=300, classes=None, class_confidence=None, cascade=None):
+        """Initialize YOLO model
         
+        backend: 'torch' runs ultralytics; 'torchscript', 'onnx' and 'openvino'
+            export once to a keyed cache under models/
+        quantization: 'dynamic' or 'static' INT8 copy (onnx backend); static
+            calibrates on calibration_frames
+        mmap_weights: map fused weights from a .npy store shared between
+            processes (torch backend)
+        detect_interval, track: run the model every N frames and track boxes
+            in between
+        motion_gate: MotionGate that reuses the last detections while the
+            scene is static
+        latency_target: per-frame budget in seconds for adaptive input size
+        tile_size, tile_overlap, roi: detect on overlapping tiles, or only in
+            a region; boxes stay in full-frame coordinates
+        confidence_threshold, iou_threshold, max_detections, classes: passed
+            to the model's NMS; class_confidence sets per-class thresholds
+        cascade: RefinementCascade merging a larger model's results into
+            detect()
+        model: used instead of loading model_name, e.g. a RemoteModel
+        """
+        if model is not None:
+            self.model = model
+        else:
+            print(f"Loading {model_name}...")
+            if mmap_weights and backend != 'torch':
+                raise ValueError("Memory-mapped weights are only supported with the torch backend")
+            if quantization is not None and backend != 'onnx':
+                raise ValueError("INT8 quantization is only supported with the onnx backend")
+            if mmap_weights:
+                self.model = MappedTorchModel(model_name)
+            elif backend == 'torch':
+                # Imported here: ultralytics pulls in torch, which alone takes seconds
+                from ultralytics import YOLO
+                self.model = YOLO(model_name)
+            else:
+                self.model = load_backend(model_name, backend, quantization=quantization,
+                                          calibration_frames=calibration_frames)
+        self.confidence_threshold = confidence_threshold
+        self.classes = None if classes is None else [self._class_id(c) for c in classes]
+        self.class_confidence = {self._class_id(c): t for c, t in (class_confidence or {}).items()}
+        self.class_thresholds = self._class_thresholds()
+        self.inference_options = {
+            # The model keeps anything a per-class threshold could still accept
+            'conf': min([confidence_threshold, *self.class_confidence.values()]),
+            'iou': iou_threshold,
+            'max_det': max_detections,
+        }
+        if self.classes is not None:
+            self.inference_options['classes'] = self.classes
+        self.detect_interval = detect_interval
+        self.tracker = IoUTracker() if track or detect_interval > 1 else None
+        self._frames_since_inference = 0
+        self.motion_gate = motion_gate
+        self._last_detections = None
+        self.resolution = ResolutionController(latency_target) if latency_target else None
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.roi = roi
+        self.overlay = OverlayRenderer()
+        if cascade is not None and cascade.detector.model.names != self.model.names:
+            raise ValueError("Both models of a cascade must have the same classes")
+        self.cascade = cascade
+        if model is None:
+            print("Model loaded successfully!")
+    
+    def _class_id(self, name):
+        """Class id of a class name or id"""
+        if isinstance(name, (int, np.integer)) or str(name).isdigit():
+            class_id = int(name)
+            if class_id in self.model.names:
+                return class_id
+        else:
+            for class_id, class_name in self.model.names.items():
+                if class_name == name:
+                    return class_id
+        raise ValueError(f"Unknown class '{name}'")
+    
+    def _class_thresholds(self):
+        """Confidence threshold per class id, or None when every class uses the same one"""
+        if self.classes is None and not self.class_confidence:
+            return None
+        thresholds = np.full(max(self.model.names) + 1, self.confidence_threshold, dtype=np.float32)
+        for class_id, threshold in self.class_confidence.items():
+            thresholds[class_id] = threshold
+        if self.classes is not None:
+            # Classes outside the allow-list can never pass
+            allowed = np.zeros(len(thresholds), dtype=bool)
+            allowed[self.classes] = True
+            thresholds[~allowed] = np.inf
+        return thresholds
+    
+    def _run_model(self, source):
+        if self.tile_size is None and self.roi is None:
+            return self._call_model(source)
+        return self._run_tiled(source if isinstance(source, list) else [source])
+    
+    def _call_model(self, source):
+        if self.resolution is None:
+            return self.model(source, verbose=False, **self.inference_options)
+        
+        # Results are mapped back to the original frame size by the model
+        start = time.perf_counter()
+        results = self.model(source, verbose=False, imgsz=self.resolution.size, **self.inference_options)
+        self.resolution.record(time.perf_counter() - start)
+        return results
+    
+    def _run_tiled(self, frames):
+        """Detect on the tiles of every frame in one forward pass"""
+        plans, crops = [], []
+        for frame in frames:
+            height, width = frame.shape[:2]
+            tiles = plan_tiles(width, height, self.tile_size, self.tile_overlap, self.roi)
+            if len(tiles) > 1:
+                # The whole region as well, so objects larger than a tile are found whole
+                tiles = np.vstack([tiles, clip_region(self.roi, width, height)])
+            plans.append(tiles)
+            crops += [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles.tolist()]
+        
+        results = self._call_model(crops)
+        merged = []
+        start = 0
+        for frame, tiles in zip(frames, plans):
+            tile_boxes = [boxes_to_array(r.boxes) for r in results[start:start + len(tiles)]]
+            start += len(tiles)
+            data = merge_tile_boxes(tile_boxes, tiles[:, :2])
+            merged.append(NumpyResults(NumpyBoxes(data), frame.shape[:2], self.model.names))
+        return merged
+    
     def detect_objects(self, frame):
         """Run detection on a frame"""
-        results = self.model(frame, verbose=False)
-        return results[0]
+        return self._run_model(frame)[0]
     
-    def draw_detections(self, frame, results):
-        """Draw bounding boxes and labels on frame"""
-        boxes = results.boxes
-        
-        for box in boxes:
-            # Get coordinates
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
-            confidence = float(box.conf[0])
-            class_id = int(box.cls[0])
-            label = self.model.names[class_id]
-            
-            # Only show detections with confidence > 0.5
-            if confidence > 0.5:
-                # Draw box
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                
-                # Draw label
-                text = f"{label} {confidence:.2f}"
-                cv2.putText(frame, text, (x1, y1 - 10),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-        
-        return frame
-    
-    def get_detections_list(self, results, confidence_threshold=0.5):
-        """Get list of detected objects with their info"""
-        detections = []
-        boxes = results.boxes
-        
-        for box in boxes:
-            confidence = float(box.conf[0])
-            if confidence > confidence_threshold:
-                class_id = int(box.cls[0])
-                label = self.model.names[class_id]
-                
-                # Calculate distance (simple approximation based on box size)
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                box_area = (x2 - x1) * (y2 - y1)
-                # Larger box = closer object
-                distance = "close" if box_area > 50000 else "medium" if box_area > 20000 else "far"
-                
-                detections.append({
-                    'label': label,
-                    'confidence': confidence,
-                    'distance': distance
-                })
+    def warm_up(self, shape=(480, 640, 3)):
+        """Run the model once on a blank frame and return the seconds it took
+        
+        The first forward pass pays for one-off setup (allocator growth,
+        kernel selection, graph optimization), which would otherwise land on
+        the first real frame. Tracker, motion gate and resolution controller
+        state are left untouched. A cascade's model warms up on the
+        cascade's own thread and is not included in the time.
+        """
+        frame = np.zeros(shape, dtype=np.uint8)
+        # Without the controller the model runs at its default size, which
+        # is where the controller starts
+        resolution, self.resolution = self.resolution, None
+        start = time.perf_counter()
+        try:
+            self._run_model(frame)
+        finally:
+            self.resolution = resolution
+        seconds = time.perf_counter() - start
+        if self.cascade is not None:
+            self.cascade.warm_up()
+        return seconds
+    
+    def detect_batch(self, frames):
+        """Run one forward pass over several frames and parse each result
         
+        Frames may come from different sources and sizes. Tracking, the
+        motion gate and the cascade keep per-stream state, so they are not
+        applied here.
+        """
+        if not len(frames):
+            return []
+        batch = [self.parse_detections(results) for results in self._run_model(list(frames))]
+        for frame, detections in zip(frames, batch):
+            detections.captured_at = getattr(frame, 'captured_at', None)
+        return batch
+    
+    def parse_detections(self, results, confidence_threshold=None):
+        """Parse raw model results into FrameDetections"""
+        if isinstance(results, FrameDetections):
+            if confidence_threshold is None:
+                return results
+            return results.above(confidence_threshold)
+        
+        detections = self.get_detections_array(results, confidence_threshold)
+        return FrameDetections(detections, self.model.names)
+    
+    def detect(self, frame):
+        """Run detection on a frame and parse the results once"""
+        # Static scene: reuse the last detections without touching the model
+        if (self.motion_gate is not None and not self.motion_gate.changed(frame)
+                and self._last_detections is not None):
+            detections = FrameDetections(self._last_detections.detections, self.model.names, inferred=False)
+        else:
+            detections = self._last_detections = self._detect_changed(frame)
+        if self.cascade is not None:
+            detections = self.cascade.process(frame, detections)
+        detections.captured_at = getattr(frame, 'captured_at', None)
         return detections
+    
+    def _detect_changed(self, frame):
+        if self.tracker is None:
+            return self.parse_detections(self.detect_objects(frame))
+        
+        # Between model runs, carry boxes forward unless a track is fading out
+        self._frames_since_inference += 1
+        if self._frames_since_inference < self.detect_interval and self._tracks_hold():
+            tracks = self.tracker.predict(frame.shape)
+            if tracks is not None:
+                return FrameDetections(set_box_geometry(tracks), self.model.names, inferred=False)
+        
+        detections = self.parse_detections(self.detect_objects(frame))
+        self._frames_since_inference = 0
+        return FrameDetections(self.tracker.update(detections.detections), self.model.names)
+    
+    def _tracks_hold(self):
+        """Whether every track stays above its class's threshold after one more decay"""
+        tracks = self.tracker.tracks
+        if tracks is None or not len(tracks):
+            return True
+        projected = tracks['confidence'] * self.tracker.confidence_decay
+        thresholds = (self.confidence_threshold if self.class_thresholds is None
+                      else self.class_thresholds[tracks['class_id']])
+        return bool((projected > thresholds).all())
+    
+    def draw_detections(self, frame, detections):
+        """Draw bounding boxes and labels on frame"""
+        return self.overlay.render(frame, self.parse_detections(detections))
+    
+    def get_detections_array(self, results, confidence_threshold=None):
+        """Get detections above the threshold as a DETECTION_DTYPE array
+        
+        Without confidence_threshold, each box has to pass its class's
+        threshold, and classes outside the allow-list are dropped.
+        """
+        data = boxes_to_array(results.boxes)
+        if confidence_threshold is None and self.class_thresholds is not None:
+            data = data[data[:, 4] > self.class_thresholds[data[:, 5].astype(np.intp)]]
+        else:
+            if confidence_threshold is None:
+                confidence_threshold = self.confidence_threshold
+            data = data[data[:, 4] > confidence_threshold]
+        
+        detections = np.empty(len(data), dtype=DETECTION_DTYPE)
+        boxes = data[:, :4].astype(np.int32)  # Truncate like int()
+        detections['box'] = boxes
+        detections['confidence'] = data[:, 4]
+        detections['class_id'] = data[:, 5]
+        detections['track_id'] = -1
+        
+        return set_box_geometry(detections)
+    
+    def get_detections_list(self, detections, confidence_threshold=None):
+        """Get list of detected objects with their info"""
+        return self.parse_detections(detections, confidence_threshold).to_list()
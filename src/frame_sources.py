@@ -0,0 +1,49 @@
+from pathlib import Path
+import cv2
+import numpy as np
+
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.bmp'}
+
+def read_frames(source, limit=None):
+    """Yield BGR frames from a video file or a directory of images"""
+    path = Path(source)
+    count = 0
+    
+    if path.is_dir():
+        for image_path in sorted(p for p in path.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES):
+            if limit is not None and count >= limit:
+                return
+            frame = cv2.imread(str(image_path))
+            if frame is not None:
+                count += 1
+                yield frame
+        return
+    
+    cap = cv2.VideoCapture(str(source))
+    try:
+        while limit is None or count < limit:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            count += 1
+            yield frame
+    finally:
+        cap.release()
+
+def synthetic_frames(count, width=640, height=480, seed=0):
+    """Yield reproducible BGR frames with a few moving rectangles"""
+    rng = np.random.default_rng(seed)
+    background = rng.integers(0, 60, (height, width, 3), dtype=np.uint8)
+    objects = [
+        (rng.integers(0, width // 2), rng.integers(0, height // 2),
+         rng.integers(width // 8, width // 3), rng.integers(height // 8, height // 3),
+         tuple(int(c) for c in rng.integers(80, 255, 3)))
+        for _ in range(3)
+    ]
+    
+    for i in range(count):
+        frame = background.copy()
+        for x, y, w, h, color in objects:
+            x = int(x + 5 * i) % width
+            cv2.rectangle(frame, (x, int(y)), (x + int(w), int(y + h)), color, -1)
+        yield frame
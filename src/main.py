@@ -1,70 +1,597 @@
+import argparse
+import contextlib
+import sys
 import cv2
 import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
 from detector import ObjectDetector
-from audio_feedback import AudioFeedback
+from audio_feedback import AudioFeedback, announcement_vocabulary
+from backends import BACKENDS, QUANTIZATION_MODES
+from cascade import RefinementCascade
+from capture import (FileCamera, TimestampedCapture, captured_at, configure_capture, latency_report,
+                     observe_latency)
+from detection_output import OUTPUT_FORMATS, detection_record, open_writer
+from detection_server import DetectionClient
+from frame_sources import read_frames
+from metrics import Metrics
+from motion_gate import MotionGate
+from overlay import draw_text
+from pipeline import DetectionPipeline, MultiSourceCapture, SharedMemoryPipeline
 
-def main():
-    print("Vision Assistant - Real-Time Object Detection")
-    print("=" * 50)
-    print("Controls:")
-    print("  Q - Quit")
-    print("  S - Toggle sound")
-    print("=" * 50)
+def class_threshold(text):
+    """Parse a CLASS=CONFIDENCE option value"""
+    name, _, value = text.rpartition('=')
+    try:
+        if name:
+            return name, float(value)
+    except ValueError:
+        pass
+    raise argparse.ArgumentTypeError(f"expected CLASS=CONFIDENCE, got '{text}'")
+
+def add_detector_args(parser):
+    """Add the options that configure ObjectDetector"""
+    parser.add_argument('--model', default='yolov8n.pt', help="YOLO weights to load")
+    parser.add_argument('--backend', choices=BACKENDS, default='torch',
+                        help="inference runtime (torchscript/onnx/openvino are exported and cached on first use)")
+    parser.add_argument('--quantize', choices=QUANTIZATION_MODES,
+                        help="run an INT8 copy of the model (onnx backend)")
+    parser.add_argument('--mmap-weights', action='store_true',
+                        help="memory-map the weights so processes on this host share them (torch backend)")
+    parser.add_argument('--confidence', type=float, default=0.5, help="minimum confidence of a detection")
+    parser.add_argument('--class-confidence', type=class_threshold, nargs='+', metavar='CLASS=CONF',
+                        help="per-class confidence thresholds, e.g. person=0.3 car=0.6")
+    parser.add_argument('--classes', nargs='+', metavar='CLASS',
+                        help="only detect these classes (names or ids)")
+    parser.add_argument('--iou', type=float, default=0.7, help="IoU threshold of the model's NMS")
+    parser.add_argument('--max-detections', type=int, default=300, metavar='N',
+                        help="most detections per frame")
+    parser.add_argument('--calibration', metavar='SOURCE',
+                        help="video file or image directory for static quantization")
+    parser.add_argument('--latency-target', type=float, metavar='MS',
+                        help="adapt the inference resolution to stay within this per-frame latency")
+    parser.add_argument('--detect-every', type=int, default=1, metavar='N',
+                        help="run the model every N frames and track objects in between")
+    parser.add_argument('--motion-gate', action='store_true',
+                        help="reuse the last detections while the scene is static")
+    parser.add_argument('--max-reuse-age', type=float, default=2.0, metavar='SECONDS',
+                        help="rerun the model at least this often with --motion-gate")
+    parser.add_argument('--motion-threshold', type=float, default=0.01, metavar='FRACTION',
+                        help="fraction of pixels that must change to rerun the model with --motion-gate")
+    parser.add_argument('--motion-pixel-delta', type=int, default=25, metavar='LEVELS',
+                        help="grey levels a pixel must change by to count as changed with --motion-gate")
+    parser.add_argument('--tile-size', type=int, metavar='PX',
+                        help="detect on overlapping PX-sized tiles for small objects in large frames")
+    parser.add_argument('--tile-overlap', type=float, default=0.2, metavar='FRACTION',
+                        help="fraction of each tile shared with its neighbours")
+    parser.add_argument('--roi', type=int, nargs=4, metavar=('X1', 'Y1', 'X2', 'Y2'),
+                        help="only detect inside this region of the frame")
+    parser.add_argument('--server', metavar='PATH',
+                        help="run the model in a detection server listening on this Unix socket")
+
+def detector_options(args):
+    """ObjectDetector keyword arguments that can be sent to another process"""
+    return {
+        'model_name': args.model,
+        'backend': args.backend,
+        'quantization': args.quantize,
+        'mmap_weights': args.mmap_weights,
+        'confidence_threshold': args.confidence,
+        'iou_threshold': args.iou,
+        'max_detections': args.max_detections,
+        'classes': args.classes,
+        'class_confidence': dict(args.class_confidence) if args.class_confidence else None,
+        'latency_target': args.latency_target / 1000 if args.latency_target else None,
+        'tile_size': args.tile_size,
+        'tile_overlap': args.tile_overlap,
+        'roi': args.roi,
+    }
+
+def build_cascade(args):
+    """Create the RefinementCascade for --refine-model, or None without one"""
+    if not args.refine_model:
+        return None
+    # Full precision and size: the larger model is there for its accuracy
+    options = {**detector_options(args), 'model_name': args.refine_model, 'quantization': None,
+               'latency_target': None}
+    return RefinementCascade(ObjectDetector(**options), uncertain_below=args.refine_below,
+                             min_interval=args.refine_interval)
+
+def build_detector(args, cascade=None):
+    """Create an ObjectDetector from parsed options"""
+    motion_gate = None
+    if args.motion_gate:
+        motion_gate = MotionGate(min_changed_fraction=args.motion_threshold, pixel_delta=args.motion_pixel_delta,
+                                 max_reuse_age=args.max_reuse_age)
+    if args.server:
+        # The server owns the model, so the options for loading it are its own
+        options = detector_options(args)
+        for name in ('model_name', 'backend', 'quantization', 'mmap_weights'):
+            del options[name]
+        return DetectionClient(args.server, detect_interval=args.detect_every,
+                               motion_gate=motion_gate, cascade=cascade, **options)
+    calibration_frames = list(read_frames(args.calibration, 200)) if args.calibration else None
+    return ObjectDetector(detect_interval=args.detect_every, motion_gate=motion_gate,
+                          calibration_frames=calibration_frames, cascade=cascade, **detector_options(args))
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Vision Assistant - Real-Time Object Detection")
+    parser.add_argument('--source', default='0',
+                        help="camera index, video file or stream URL to read frames from")
+    parser.add_argument('--sources', nargs='+', metavar='SOURCE',
+                        help="several sources, detected on together in one batch per frame")
+    add_detector_args(parser)
+    parser.add_argument('--phrase-cache', metavar='DIR',
+                        help="assemble announcements from cached pre-rendered clips (needs simpleaudio)")
+    parser.add_argument('--phrase-cache-size', type=int, default=128, metavar='N',
+                        help="phrase clips kept in memory")
+    parser.add_argument('--phrase-cache-disk-size', type=int, default=1024, metavar='N',
+                        help="phrase clips kept on disk, least recently used removed first")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="run capture, inference and display as separate stages")
+    parser.add_argument('--inference-processes', type=int, metavar='N',
+                        help="pipeline mode with N inference processes fed through shared memory")
+    parser.add_argument('--metrics', metavar='PATH',
+                        help="periodically write stage timings and counters (.json, else Prometheus text)")
+    parser.add_argument('--metrics-interval', type=float, default=5.0, metavar='SECONDS',
+                        help="how often to rewrite the --metrics file")
+    parser.add_argument('--hud', action='store_true',
+                        help="draw stage timings and counters under the sound status")
+    parser.add_argument('--no-warm-up', action='store_true',
+                        help="skip the model pass on a blank frame at startup")
     
-    # Initialize components
-    detector = ObjectDetector('yolov8n.pt')
-    audio = AudioFeedback()
+    cascade = parser.add_argument_group('cascade')
+    cascade.add_argument('--refine-model', metavar='WEIGHTS',
+                         help="larger model (e.g. yolov8s.pt) run in the background on unsure close objects, "
+                              "new tracks and D presses")
+    cascade.add_argument('--refine-below', type=float, default=0.6, metavar='CONF',
+                         help="refine close objects detected with less confidence than this")
+    cascade.add_argument('--refine-interval', type=float, default=1.0, metavar='SECONDS',
+                         help="least time between triggered refinements")
     
-    # Open webcam
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened():
-        print("Error: Could not open webcam")
-        return
+    capture = parser.add_argument_group('capture')
+    capture.add_argument('--low-latency', action='store_true',
+                         help="ask cameras for MJPG and a one-frame buffer, and drain stale frames")
+    capture.add_argument('--width', type=int, help="requested camera frame width")
+    capture.add_argument('--height', type=int, help="requested camera frame height")
+    capture.add_argument('--fps', type=float, help="requested camera frame rate")
+    capture.add_argument('--fourcc', metavar='CODE', help="requested camera pixel format, e.g. MJPG")
+    capture.add_argument('--buffer-size', type=int, metavar='N', help="frames the camera driver may queue")
+    capture.add_argument('--drain', type=int, metavar='N',
+                         help="discard up to N already-buffered frames before each read")
+    capture.add_argument('--realtime', action='store_true',
+                         help="play video files at their frame rate, like a live camera")
+    
+    headless = parser.add_argument_group('headless mode')
+    headless.add_argument('--headless', action='store_true',
+                          help="no window or audio; write one detection record per frame")
+    headless.add_argument('--format', choices=OUTPUT_FORMATS, default='ndjson',
+                          help="record encoding (msgpack needs the msgpack package)")
+    headless.add_argument('--socket', metavar='PATH',
+                          help="send records to a listening Unix socket instead of stdout")
+    headless.add_argument('--max-frames', type=int, metavar='N', help="stop after N frames")
+    args = parser.parse_args(argv)
+    # Those modes detect in other processes or in batches, where the cascade never runs
+    if args.refine_model and (args.inference_processes or (args.sources and len(args.sources) > 1)):
+        parser.error("--refine-model cannot be combined with --inference-processes or several --sources")
+    if args.tile_size is not None and args.tile_size <= 0:
+        parser.error("--tile-size must be positive")
+    if not 0 <= args.tile_overlap < 1:
+        parser.error("--tile-overlap must be at least 0 and below 1")
+    return args
+
+def open_source(source):
+    """Open a camera by index, or a video file or stream URL"""
+    source = str(source)
+    return cv2.VideoCapture(int(source) if source.isdigit() else source)
+
+def open_capture(source, args):
+    """Open a source with the capture options; every frame is stamped with its capture time"""
+    source = str(source)
+    cap = FileCamera(source) if args.realtime and not source.isdigit() else open_source(source)
+    
+    fourcc, buffer_size, drain = args.fourcc, args.buffer_size, args.drain
+    if args.low_latency:
+        fourcc = fourcc or 'MJPG'
+        buffer_size = buffer_size or 1
+        # Only live sources fall behind; draining an unpaced file just skips its frames
+        if drain is None and (source.isdigit() or isinstance(cap, FileCamera)):
+            drain = 2
+    if source.isdigit() and cap.isOpened() and (fourcc or buffer_size or args.width or args.height or args.fps):
+        # Report what the driver agreed to, which may differ from the request
+        settings = configure_capture(cap, args.width, args.height, args.fps, fourcc, buffer_size)
+        print(f"Camera {source}: {settings['width']}x{settings['height']} @ {settings['fps']:g} fps, "
+              f"{settings['fourcc'] or 'default format'}, buffer {settings['buffer_size']}")
+    return TimestampedCapture(cap, drain=drain or 0)
+
+def timed(phases, name, function, *args, **kwargs):
+    """Call function and record how long it took under phases[name]"""
+    start = time.perf_counter()
+    try:
+        return function(*args, **kwargs)
+    finally:
+        phases[name] = time.perf_counter() - start
+
+def load_detector(args, phases):
+    """Build the detector and run its warm-up pass, timing both"""
+    cascade = timed(phases, 'refine model', build_cascade, args) if args.refine_model else None
+    detector = timed(phases, 'model', build_detector, args, cascade)
+    if not args.no_warm_up:
+        timed(phases, 'warm-up', detector.warm_up)
+    return detector
+
+def startup_report(phases, total):
+    """One line with the time spent in each startup phase"""
+    parts = [f"{name} {seconds:.2f}s" for name, seconds in phases.items()]
+    return f"Startup: {total:.2f}s ({', '.join(parts)})"
+
+def draw_status(frame, sound_enabled):
+    """Draw the sound status line on the frame"""
+    status = "Sound: ON" if sound_enabled else "Sound: OFF"
+    draw_text(frame, status, (10, 30), 1, (0, 255, 0), 2)
+
+def draw_hud(frame, metrics):
+    """Draw rolling p50 / p95 stage timings and counters under the status line"""
+    for i, line in enumerate(metrics.hud_lines()):
+        cv2.putText(frame, line, (10, 55 + 20 * i),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+
+def announce_description(description, detector, audio):
+    """Announce a requested scene description once the larger model has it
     
+    Returns the description while it is still pending, otherwise None.
+    """
+    if description is None or not description.done():
+        return description
+    if description.exception() is None:
+        audio.announce_detections(detector.get_detections_list(description.result()))
+    return None
+
+def close_cascade(detector):
+    """Stop the detector's cascade, if it has one, and report what it refined"""
+    if detector.cascade is None:
+        return
+    detector.cascade.close()
+    print(detector.cascade.summary())
+
+def run_loop(cap, detector, audio, announcement_interval=3, metrics=None, hud=False):
+    """Sequential capture, detect, draw and display loop"""
+    if metrics is None:
+        metrics = Metrics()
     sound_enabled = True
+    description = None
     last_announcement = time.time()
-    announcement_interval = 3  # Announce every 3 seconds
-    
-    print("\nStarting detection... Press 'Q' to quit")
     
     while True:
-        ret, frame = cap.read()
+        frame_start = time.perf_counter()
+        with metrics.span('capture'):
+            ret, frame = cap.read()
         if not ret:
             break
         
-        # Run detection
-        results = detector.detect_objects(frame)
+        # Run detection, parsing the results once for drawing and audio
+        with metrics.span('inference'):
+            detections = detector.detect(frame)
+        if not detections.inferred:
+            metrics.increment('inference_skipped')
+        observe_latency(metrics, 'capture_to_detection', frame)
         
         # Draw detections
-        frame = detector.draw_detections(frame, results)
+        with metrics.span('draw'):
+            frame = detector.draw_detections(frame, detections)
         
         # Audio feedback (every 3 seconds)
         current_time = time.time()
         if sound_enabled and (current_time - last_announcement) > announcement_interval:
-            detections = detector.get_detections_list(results)
-            if detections:
-                audio.announce_detections(detections)
+            with metrics.span('announce'):
+                announced = detector.get_detections_list(detections)
+                if announced:
+                    audio.announce_detections(announced, captured_at=captured_at(frame))
             last_announcement = current_time
+        if sound_enabled:
+            description = announce_description(description, detector, audio)
         
         # Add status text
-        status = "Sound: ON" if sound_enabled else "Sound: OFF"
-        cv2.putText(frame, status, (10, 30),
-                   cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        draw_status(frame, sound_enabled)
+        if hud:
+            draw_hud(frame, metrics)
         
         # Show frame
-        cv2.imshow('Vision Assistant', frame)
+        with metrics.span('display'):
+            cv2.imshow('Vision Assistant', frame)
         
         # Handle key presses
-        key = cv2.waitKey(1) & 0xFF
+        with metrics.span('waitkey'):
+            key = cv2.waitKey(1) & 0xFF
+        metrics.observe('frame', time.perf_counter() - frame_start)
+        metrics.maybe_export()
         if key == ord('q'):
             break
         elif key == ord('s'):
             sound_enabled = not sound_enabled
             print(f"Sound {'enabled' if sound_enabled else 'disabled'}")
+        elif key == ord('d') and detector.cascade is not None:
+            description = detector.cascade.request()
+
+def run_pipeline(cap, detector, audio, announcement_interval=3, metrics=None, hud=False,
+                 pipeline=None):
+    """Display loop for pipeline mode, fed by capture and inference threads
+    
+    pipeline defaults to a threaded DetectionPipeline; a SharedMemoryPipeline
+    runs inference in other processes instead.
+    """
+    if metrics is None:
+        metrics = Metrics()
+    if pipeline is None:
+        pipeline = DetectionPipeline(cap, detector, metrics)
+    
+    sound_enabled = True
+    detections = None
+    description = None
+    last_announcement = time.monotonic()
+    
+    try:
+        pipeline.start()
+        while True:
+            frame = pipeline.display.get(timeout=0.5)
+            if frame is None:
+                if pipeline.running:
+                    continue
+                break
+            
+            # Inference runs on its own thread and shares the captured frame
+            frame_start = time.perf_counter()
+            frame = frame.copy()
+            fresh = pipeline.results.get(timeout=0)
+            if fresh is not None:
+                detections = fresh
+            
+            if detections is not None:
+                with metrics.span('draw'):
+                    frame = detector.draw_detections(frame, detections)
+            
+            # Only announce newly inferred results
+            current_time = time.monotonic()
+            if (fresh is not None and sound_enabled
+                    and (current_time - last_announcement) > announcement_interval):
+                with metrics.span('announce'):
+                    announced = detector.get_detections_list(fresh)
+                    if announced:
+                        audio.announce_detections(announced, captured_at=fresh.captured_at)
+                last_announcement = current_time
+            if sound_enabled:
+                description = announce_description(description, detector, audio)
+            
+            draw_status(frame, sound_enabled)
+            if hud:
+                draw_hud(frame, metrics)
+            with metrics.span('display'):
+                cv2.imshow('Vision Assistant', frame)
+            
+            with metrics.span('waitkey'):
+                key = cv2.waitKey(1) & 0xFF
+            metrics.observe('frame', time.perf_counter() - frame_start)
+            metrics.maybe_export()
+            if key == ord('q'):
+                break
+            elif key == ord('s'):
+                sound_enabled = not sound_enabled
+                print(f"Sound {'enabled' if sound_enabled else 'disabled'}")
+            elif key == ord('d') and detector.cascade is not None:
+                description = detector.cascade.request()
+    finally:
+        pipeline.stop()
+    
+    print(f"Dropped {pipeline.dropped} stale frames before inference")
+
+def source_names(count):
+    return [f"Camera {i + 1}" for i in range(count)]
+
+def run_multi_source(caps, detector, audio, announcement_interval=3, metrics=None, hud=False):
+    """Display loop for several sources sharing one batched forward pass"""
+    if metrics is None:
+        metrics = Metrics()
+    names = source_names(len(caps))
+    capture = MultiSourceCapture(caps)
+    capture.start()
+    
+    sound_enabled = True
+    latest = [None] * len(caps)
+    latest_captured = [None] * len(caps)
+    last_announcement = time.monotonic()
+    
+    try:
+        while True:
+            fresh = capture.get_latest(timeout=0.5)
+            if not fresh:
+                if capture.running:
+                    continue
+                break
+            
+            # Newest frame of every source that has one, in a single batch
+            frame_start = time.perf_counter()
+            with metrics.span('inference'):
+                batch = detector.detect_batch([frame for _, frame in fresh])
+            
+            for (index, frame), detections in zip(fresh, batch):
+                observe_latency(metrics, 'capture_to_detection', frame)
+                latest[index] = detections
+                latest_captured[index] = captured_at(frame)
+                with metrics.span('draw'):
+                    frame = detector.draw_detections(frame, detections)
+                draw_status(frame, sound_enabled)
+                if hud:
+                    draw_hud(frame, metrics)
+                with metrics.span('display'):
+                    cv2.imshow(f"Vision Assistant - {names[index]}", frame)
+            
+            # One utterance covering every source, prefixed by its name
+            current_time = time.monotonic()
+            if sound_enabled and (current_time - last_announcement) > announcement_interval:
+                # Latency is counted from the oldest frame the utterance covers
+                stamps = [stamp for stamp in latest_captured if stamp is not None]
+                with metrics.span('announce'):
+                    audio.announce_sources([(name, detector.get_detections_list(detections))
+                                            for name, detections in zip(names, latest)
+                                            if detections is not None],
+                                           captured_at=min(stamps) if stamps else None)
+                last_announcement = current_time
+            
+            with metrics.span('waitkey'):
+                key = cv2.waitKey(1) & 0xFF
+            metrics.observe('frame', time.perf_counter() - frame_start)
+            metrics.set_counter('frames_dropped', capture.dropped)
+            metrics.maybe_export()
+            if key == ord('q'):
+                break
+            elif key == ord('s'):
+                sound_enabled = not sound_enabled
+                print(f"Sound {'enabled' if sound_enabled else 'disabled'}")
+    finally:
+        capture.stop()
+
+def stream_detections(cap, detector, writer, metrics=None, max_frames=None):
+    """Headless loop: detect on every frame and write its record, nothing drawn"""
+    if metrics is None:
+        metrics = Metrics()
+    frame_index = 0
+    
+    while max_frames is None or frame_index < max_frames:
+        with metrics.span('capture'):
+            ret, frame = cap.read()
+        if not ret:
+            break
+        
+        with metrics.span('inference'):
+            detections = detector.detect(frame)
+        if not detections.inferred:
+            metrics.increment('inference_skipped')
+        observe_latency(metrics, 'capture_to_detection', frame)
+        
+        with metrics.span('output'):
+            writer.write(detection_record(frame_index, detections))
+        frame_index += 1
+        metrics.maybe_export()
+    
+    return frame_index
+
+def run_headless(args):
+    """Run without a display or audio, streaming records to stdout or a socket"""
+    writer = open_writer(args.format, args.socket)
+    
+    # stdout carries the records, so progress messages go to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        metrics = Metrics(export_path=args.metrics, export_interval=args.metrics_interval)
+        phases = {}
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            detector_future = pool.submit(load_detector, args, phases)
+            cap = timed(phases, 'camera', open_capture, args.source, args)
+            detector = detector_future.result()
+        print(startup_report(phases, time.perf_counter() - start))
+        
+        if not cap.isOpened():
+            print(f"Error: Could not open video source {args.source}")
+            writer.close()
+            return
+        
+        frames = 0
+        try:
+            frames = stream_detections(cap, detector, writer, metrics, args.max_frames)
+            writer.close()
+        except (BrokenPipeError, KeyboardInterrupt):
+            pass  # Reader went away or interrupted: stop quietly
+        finally:
+            cap.release()
+            close_cascade(detector)
+        
+        if args.metrics:
+            metrics.write(args.metrics)
+        print(f"Processed {frames} frames")
+        for line in latency_report(metrics):
+            print(line)
+
+def main(args=None):
+    if args is None:
+        args = parse_args([])
+    if args.headless:
+        return run_headless(args)
+    
+    print("Vision Assistant - Real-Time Object Detection")
+    print("=" * 50)
+    print("Controls:")
+    print("  Q - Quit")
+    print("  S - Toggle sound")
+    if args.refine_model:
+        print("  D - Describe the scene with the larger model")
+    print("=" * 50)
+    
+    # Initialize components: the model and speech engine load in the
+    # background while the webcam (or the given video sources) opens
+    metrics = Metrics(export_path=args.metrics, export_interval=args.metrics_interval)
+    sources = args.sources or [args.source]
+    # With inference processes, only the workers load the model
+    shared_memory = bool(args.inference_processes) and len(sources) == 1
+    phases = {}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        detector_future = None if shared_memory else pool.submit(load_detector, args, phases)
+        audio_future = pool.submit(timed, phases, 'speech', AudioFeedback,
+                                   phrase_cache_dir=args.phrase_cache,
+                                   phrase_cache_size=args.phrase_cache_size,
+                                   phrase_cache_disk_size=args.phrase_cache_disk_size, metrics=metrics)
+        caps = timed(phases, 'camera', lambda: [open_capture(source, args) for source in sources])
+        audio = audio_future.result()
+        detector = detector_future.result() if detector_future is not None else None
+    
+    for source, cap in zip(sources, caps):
+        if not cap.isOpened():
+            print(f"Error: Could not open video source {source}")
+            audio.close()
+            for opened in caps:
+                opened.release()
+            return
+    
+    if shared_memory:
+        pipeline = SharedMemoryPipeline(caps[0], detector_options(args), args.inference_processes,
+                                        metrics=metrics)
+        try:
+            timed(phases, 'model', pipeline.start)
+        except BaseException:
+            audio.close()
+            caps[0].release()
+            raise
+        # Detections arrive parsed, so this process only needs the class names
+        detector = ObjectDetector(model=SimpleNamespace(names=pipeline.names))
+    print(startup_report(phases, time.perf_counter() - start))
+    if args.phrase_cache:
+        labels = list(detector.model.names.values())
+        if len(sources) > 1:
+            labels += source_names(len(sources))
+        audio.warm_up(announcement_vocabulary(labels))
+    
+    print("\nStarting detection... Press 'Q' to quit")
+    
+    if len(caps) > 1:
+        run_multi_source(caps, detector, audio, metrics=metrics, hud=args.hud)
+    elif shared_memory:
+        run_pipeline(caps[0], detector, audio, metrics=metrics, hud=args.hud, pipeline=pipeline)
+    elif args.pipeline:
+        run_pipeline(caps[0], detector, audio, metrics=metrics, hud=args.hud)
+    else:
+        run_loop(caps[0], detector, audio, metrics=metrics, hud=args.hud)
     
-    cap.release()
+    audio.close()
+    close_cascade(detector)
+    if args.metrics:
+        metrics.write(args.metrics)
+    for cap in caps:
+        cap.release()
     cv2.destroyAllWindows()
+    for line in latency_report(metrics):
+        print(line)
     print("\nVision Assistant stopped.")
 
 if __name__ == "__main__":  # pragma: no cover
-    main()
+    main(parse_args())
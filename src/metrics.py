@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+import numpy as np
+
+PROMETHEUS_QUANTILES = (0.5, 0.95, 0.99)
+
+def latency_percentiles(samples):
+    """Summarize latencies in seconds as milliseconds"""
+    samples = np.asarray(samples) * 1000
+    if not len(samples):
+        return {'count': 0}
+    return {
+        'count': int(len(samples)),
+        'mean_ms': float(samples.mean()),
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p95_ms': float(np.percentile(samples, 95)),
+        'p99_ms': float(np.percentile(samples, 99)),
+    }
+
+class RollingHistogram:
+    """Latencies of the most recent observations, plus lifetime totals"""
+    
+    def __init__(self, window=300):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+    
+    def observe(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+class Metrics:
+    """Stage timings and counters shared by the capture, inference and speech threads
+    
+    Spans feed a rolling histogram per stage; counters only go up. With
+    export_path, maybe_export() rewrites a JSON snapshot (for a .json path)
+    or a Prometheus text file (otherwise) at most every export_interval
+    seconds.
+    """
+    
+    def __init__(self, window=300, export_path=None, export_interval=5.0):
+        self.window = window
+        self.export_path = export_path
+        self.export_interval = export_interval
+        self.histograms = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._last_export = time.perf_counter()
+    
+    @contextmanager
+    def span(self, name):
+        """Time the body of a with block as one observation of a stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+    
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = RollingHistogram(self.window)
+            histogram.observe(seconds)
+    
+    def increment(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+    
+    def set_counter(self, name, value):
+        """Mirror a counter that is kept by another component"""
+        with self._lock:
+            self.counters[name] = value
+    
+    def _copy(self):
+        with self._lock:
+            histograms = {name: (list(h.samples), h.count, h.total) for name, h in self.histograms.items()}
+            return histograms, dict(self.counters)
+    
+    def snapshot(self):
+        """Rolling percentiles per stage and current counters"""
+        histograms, counters = self._copy()
+        stages = {}
+        for name, (samples, count, total) in histograms.items():
+            stages[name] = latency_percentiles(samples)
+            stages[name]['total_count'] = count
+            stages[name]['total_seconds'] = total
+        return {'stages': stages, 'counters': counters}
+    
+    def to_prometheus(self, prefix='vision_assistant'):
+        """Render as Prometheus text exposition format"""
+        histograms, counters = self._copy()
+        lines = [
+            f"# HELP {prefix}_stage_seconds Rolling per-stage latency",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for name, (samples, count, total) in sorted(histograms.items()):
+            if samples:
+                for q, value in zip(PROMETHEUS_QUANTILES,
+                                    np.percentile(samples, [q * 100 for q in PROMETHEUS_QUANTILES])):
+                    lines.append(f'{prefix}_stage_seconds{{stage="{name}",quantile="{q}"}} {value:.6g}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {total:.6g}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {count}')
+        for name, value in sorted(counters.items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+    
+    def write(self, path):
+        """Write a snapshot, replacing the file atomically for scrapers"""
+        path = Path(path)
+        if path.suffix == '.json':
+            text = json.dumps(self.snapshot(), indent=2)
+        else:
+            text = self.to_prometheus()
+        tmp_path = path.with_name(path.name + '.tmp')
+        tmp_path.write_text(text)
+        os.replace(tmp_path, path)
+    
+    def maybe_export(self):
+        """Write to export_path if the export interval has passed"""
+        if self.export_path is None:
+            return
+        now = time.perf_counter()
+        if now - self._last_export >= self.export_interval:
+            self.write(self.export_path)
+            self._last_export = now
+    
+    def hud_lines(self, stages=('inference', 'draw', 'display', 'frame')):
+        """Short text lines for an on-screen overlay"""
+        snapshot = self.snapshot()
+        lines = []
+        for name in stages:
+            summary = snapshot['stages'].get(name)
+            if summary and summary['count']:
+                lines.append(f"{name}: {summary['p50_ms']:.1f} / {summary['p95_ms']:.1f} ms")
+        counters = snapshot['counters']
+        if counters:
+            lines.append(" ".join(f"{name}={value}" for name, value in sorted(counters.items())))
+        return lines
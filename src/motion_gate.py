@@ -0,0 +1,52 @@
+import time
+import cv2
+import numpy as np
+
+class MotionGate:
+    """Skip inference while the scene is static.
+    
+    Frames are shrunk to a small grayscale thumbnail and compared with the
+    thumbnail of the last processed frame. The scene counts as changed
+    when more than min_changed_fraction of the pixels differ by more than
+    pixel_delta grey levels, or when the last result is older than
+    max_reuse_age seconds.
+    """
+    
+    def __init__(self, min_changed_fraction=0.01, pixel_delta=25, max_reuse_age=2.0, size=(64, 48)):
+        self.min_changed_fraction = min_changed_fraction
+        self.pixel_delta = pixel_delta
+        self.max_reuse_age = max_reuse_age
+        self.size = size
+        self.skipped = 0
+        self._reference = None
+        self._reference_time = 0.0
+    
+    def _thumbnail(self, frame):
+        if frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        # INTER_AREA averages pixels, which also smooths out sensor noise
+        return cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+    
+    def changed(self, frame):
+        """Check whether the frame needs fresh inference"""
+        thumbnail = self._thumbnail(frame)
+        now = time.monotonic()
+        
+        if (self._reference is None
+                or now - self._reference_time > self.max_reuse_age
+                or self.changed_fraction(thumbnail) > self.min_changed_fraction):
+            self._reference = thumbnail
+            self._reference_time = now
+            return True
+        
+        self.skipped += 1
+        return False
+    
+    def changed_fraction(self, thumbnail):
+        """Fraction of thumbnail pixels that moved past pixel_delta"""
+        difference = cv2.absdiff(thumbnail, self._reference)
+        return float(np.count_nonzero(difference > self.pixel_delta)) / difference.size
+    
+    def reset(self):
+        """Force the next frame through to the model"""
+        self._reference = None
@@ -0,0 +1,129 @@
+from collections import OrderedDict
+import cv2
+import numpy as np
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+class Sprite:
+    """Text rasterized once: a solid color patch, the mask of its glyph pixels,
+    their offset from the text origin and the width the text advances by"""
+    
+    def __init__(self, patch, mask, dx, dy, advance):
+        self.patch = patch
+        self.mask = mask
+        self.dx = dx
+        self.dy = dy
+        self.advance = advance
+
+class SpriteCache:
+    """Text sprites by (text, scale, color, thickness), least recently used out first"""
+    
+    def __init__(self, max_size=512):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._sprites = OrderedDict()
+    
+    def __len__(self):
+        return len(self._sprites)
+    
+    def get(self, text, font_scale=0.5, color=(0, 255, 0), thickness=2):
+        key = (text, font_scale, tuple(color), thickness)
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            self._sprites.move_to_end(key)
+            self.hits += 1
+            return sprite
+        
+        self.misses += 1
+        sprite = self._sprites[key] = rasterize(text, font_scale, color, thickness)
+        if len(self._sprites) > self.max_size:
+            self._sprites.popitem(last=False)
+        return sprite
+
+def rasterize(text, font_scale=0.5, color=(0, 255, 0), thickness=2):
+    """Render text once with cv2.putText and crop it to its pixels"""
+    (width, height), baseline = cv2.getTextSize(text, FONT, font_scale, thickness)
+    # Strokes reach past the reported size by up to the line thickness
+    pad = 2 * thickness + 2
+    canvas = np.zeros((height + baseline + 2 * pad, width + 2 * pad), dtype=np.uint8)
+    cv2.putText(canvas, text, (pad, pad + height), FONT, font_scale, 255, thickness)
+    
+    # Newer OpenCV anti-aliases text; keep the pixels that are mostly covered
+    ys, xs = np.nonzero(canvas >= 128)
+    if not len(ys):
+        empty = np.zeros((0, 0), dtype=np.uint8)
+        return Sprite(np.zeros((0, 0, 3), dtype=np.uint8), empty, 0, 0, width)
+    y1, y2, x1, x2 = ys.min(), ys.max() + 1, xs.min(), xs.max() + 1
+    mask = (canvas[y1:y2, x1:x2] >= 128).astype(np.uint8)
+    patch = np.empty(mask.shape + (3,), dtype=np.uint8)
+    patch[:] = color
+    return Sprite(patch, mask, int(x1) - pad, int(y1) - (pad + height), width)
+
+def blit(frame, sprite, x, y):
+    """Copy a sprite's glyph pixels onto frame with its text origin at (x, y)"""
+    x, y = x + sprite.dx, y + sprite.dy
+    height, width = sprite.mask.shape
+    x1, y1 = max(x, 0), max(y, 0)
+    x2, y2 = min(x + width, frame.shape[1]), min(y + height, frame.shape[0])
+    if x2 <= x1 or y2 <= y1:
+        return
+    sub = (slice(y1 - y, y2 - y), slice(x1 - x, x2 - x))
+    # copyTo writes through the frame view in place
+    cv2.copyTo(sprite.patch[sub], sprite.mask[sub], frame[y1:y2, x1:x2])
+
+# Shared by every caller that does not bring its own cache
+default_sprites = SpriteCache()
+
+def draw_text(frame, text, org, font_scale=0.5, color=(0, 255, 0), thickness=2, sprites=None):
+    """cv2.putText from a cached sprite"""
+    blit(frame, (default_sprites if sprites is None else sprites).get(text, font_scale, color, thickness), *org)
+    return frame
+
+class OverlayRenderer:
+    """Boxes and labels for a FrameDetections, planned once and redrawn cheaply
+    
+    Labels are a class-name sprite next to a sprite of the rounded
+    confidence, so the cache stays small, and all boxes go to OpenCV in one
+    polylines call. While render() is given the same detections (pipeline
+    mode between inference results, or the motion gate reusing the last
+    ones), the previous plan is reused without formatting or lookups.
+    """
+    
+    def __init__(self, color=(0, 255, 0), font_scale=0.5, thickness=2, sprites=None):
+        self.color = color
+        self.font_scale = font_scale
+        self.thickness = thickness
+        self.sprites = default_sprites if sprites is None else sprites
+        self.rebuilds = 0
+        self._source = None
+        self._polygons = []
+        self._labels = []
+    
+    def render(self, frame, detections):
+        """Draw detections on frame in place"""
+        if detections.detections is not self._source:
+            self._plan(detections)
+        if self._polygons:
+            cv2.polylines(frame, self._polygons, True, self.color, self.thickness)
+        for sprite, x, y in self._labels:
+            blit(frame, sprite, x, y)
+        return frame
+    
+    def _plan(self, detections):
+        boxes = detections.boxes
+        self._polygons = list(boxes[:, [0, 1, 2, 1, 2, 3, 0, 3]].reshape(-1, 4, 2))
+        space = self.sprites.get(" ", self.font_scale, self.color, self.thickness).advance
+        
+        # "label 0.87" above each box
+        self._labels = []
+        for (x, y), confidence, label in zip(boxes[:, :2].tolist(), detections.confidences.tolist(),
+                                             detections.labels):
+            y -= 10
+            for text in (label, f"{confidence:.2f}"):
+                sprite = self.sprites.get(text, self.font_scale, self.color, self.thickness)
+                self._labels.append((sprite, x, y))
+                x += sprite.advance + space
+        
+        self._source = detections.detections
+        self.rebuilds += 1
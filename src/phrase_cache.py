@@ -0,0 +1,106 @@
+import hashlib
+import os
+import wave
+from collections import OrderedDict
+from pathlib import Path
+
+try:
+    import simpleaudio
+except ImportError:  # Optional: without it announcements use live synthesis
+    simpleaudio = None
+
+class PhraseCache:
+    """Synthesized audio clips for announcement phrases.
+    
+    Clips are rendered once through the engine's save-to-file path and
+    kept as WAV files on disk (at most max_disk_clips, least recently used
+    evicted first) and as raw frames in an in-memory LRU of max_memory_clips.
+    The engine must only be used from one thread, so call this from the
+    thread that owns it.
+    """
+    
+    def __init__(self, engine, cache_dir='models/phrases', max_memory_clips=128, max_disk_clips=1024):
+        self.engine = engine
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_memory_clips = max_memory_clips
+        self.max_disk_clips = max_disk_clips
+        self._clips = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def _path(self, phrase):
+        # Voice settings are part of the key so changing them re-renders clips
+        settings = [self.engine.getProperty(name) for name in ('voice', 'rate', 'volume')]
+        key = hashlib.sha1(repr((phrase, settings)).encode()).hexdigest()[:20]
+        return self.cache_dir / f"{key}.wav"
+    
+    def _load(self, path):
+        try:
+            with wave.open(str(path), 'rb') as f:
+                return f.getparams(), f.readframes(f.getnframes())
+        except (wave.Error, EOFError, OSError):
+            path.unlink(missing_ok=True)
+            return None
+    
+    def _evict_disk(self):
+        clips = sorted(self.cache_dir.glob('*.wav'), key=lambda p: p.stat().st_mtime)
+        for path in clips[:max(0, len(clips) - self.max_disk_clips)]:
+            path.unlink(missing_ok=True)
+    
+    def get(self, phrase):
+        """Get (wave params, frames) for a phrase, synthesizing it on a miss"""
+        if phrase in self._clips:
+            self._clips.move_to_end(phrase)
+            self.hits += 1
+            return self._clips[phrase]
+        
+        path = self._path(phrase)
+        if path.exists():
+            os.utime(path)  # Keep disk eviction least-recently-used
+            self.hits += 1
+        else:
+            self.engine.save_to_file(phrase, str(path))
+            self.engine.runAndWait()
+            self.misses += 1
+            self._evict_disk()
+        
+        clip = self._load(path)
+        if clip is None:
+            return None
+        
+        self._clips[phrase] = clip
+        if len(self._clips) > self.max_memory_clips:
+            self._clips.popitem(last=False)
+        return clip
+    
+    def warm_up(self, phrases):
+        """Make sure every phrase is cached"""
+        for phrase in phrases:
+            self.get(phrase)
+    
+    def assemble(self, phrases, gap=0.15):
+        """Concatenate cached clips with a short pause between them
+        
+        Returns None if a clip is unavailable or the clips don't share one
+        audio format, so the caller can fall back to live synthesis.
+        """
+        clips = [self.get(phrase) for phrase in phrases]
+        if not clips or any(clip is None for clip in clips):
+            return None
+        
+        params = clips[0][0]
+        if any(p[:3] != params[:3] for p, _ in clips):
+            return None
+        
+        silence = b'\x00' * (int(params.framerate * gap) * params.sampwidth * params.nchannels)
+        return params, silence.join(frames for _, frames in clips)
+
+def can_play():
+    """Check whether cached clips can be played back"""
+    return simpleaudio is not None
+
+def play_clip(clip):
+    """Play (wave params, frames) and wait until it finishes"""
+    params, frames = clip
+    simpleaudio.play_buffer(frames, params.nchannels, params.sampwidth, params.framerate).wait_done()
@@ -0,0 +1,372 @@
+import threading
+import time
+from collections import deque
+from queue import Empty
+from multiprocessing import get_context
+import numpy as np
+from capture import captured_at, observe_latency
+from backends import prepare_backend
+from shm_ring import FrameRing
+
+class LatestFrameQueue:
+    """Bounded queue where new items push out the oldest unread ones"""
+    
+    def __init__(self, maxsize=1):
+        self._items = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+    
+    def put(self, item):
+        """Add an item, dropping the oldest one if the queue is full"""
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify_all()
+    
+    def get(self, timeout=None):
+        """Wait for an item; returns None on timeout or once closed and empty"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._items or self._closed, timeout)
+            if self._items:
+                return self._items.popleft()
+            return None
+    
+    def close(self):
+        """Wake up any waiting consumers"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+class DetectionPipeline:
+    """Run capture and inference on their own threads.
+    
+    Capture feeds two latest-wins queues: one for inference and one for
+    display. The inference thread always works on the newest frame, so
+    frames that arrive while the model is busy are dropped instead of
+    piling up. Display stays on the caller's thread (OpenCV windows must
+    be driven from the main thread) and overlays the latest results.
+    """
+    
+    def __init__(self, cap, detector, metrics=None):
+        self.cap = cap
+        self.detector = detector
+        self.metrics = metrics
+        self.frames = LatestFrameQueue()
+        self.display = LatestFrameQueue()
+        self.results = LatestFrameQueue()
+        self._stop = threading.Event()
+        self._threads = []
+    
+    @property
+    def running(self):
+        return not self._stop.is_set()
+    
+    @property
+    def dropped(self):
+        return self.frames.dropped
+    
+    def start(self):
+        """Start the capture and inference threads"""
+        for target in (self._capture_loop, self._inference_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def stop(self, timeout=1.0):
+        """Signal the worker threads to stop and wait for them"""
+        self._stop.set()
+        for queue in (self.frames, self.display, self.results):
+            queue.close()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+    
+    def _capture_loop(self):
+        while not self._stop.is_set():
+            start = time.perf_counter()
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            if self.metrics is not None:
+                self.metrics.observe('capture', time.perf_counter() - start)
+            self.frames.put(frame)
+            self.display.put(frame)
+            if self.metrics is not None:
+                self.metrics.set_counter('frames_dropped', self.frames.dropped)
+        self._stop.set()
+        self.display.close()
+    
+    def _inference_loop(self):
+        while not self._stop.is_set():
+            frame = self.frames.get(timeout=0.1)
+            if frame is None:
+                continue
+            if self.metrics is None:
+                self.results.put(self.detector.detect(frame))
+                continue
+            with self.metrics.span('inference'):
+                detections = self.detector.detect(frame)
+            if not detections.inferred:
+                self.metrics.increment('inference_skipped')
+            observe_latency(self.metrics, 'capture_to_detection', frame)
+            self.results.put(detections)
+
+class MultiSourceCapture:
+    """Read several captures on their own threads, keeping each one's newest frame
+    
+    get_latest() hands back every source that has produced a frame since
+    the last call, so one forward pass can cover all of them. Frames that
+    are replaced before being collected count as dropped.
+    """
+    
+    def __init__(self, caps):
+        self.caps = caps
+        self._latest = [None] * len(caps)
+        self._cond = threading.Condition()
+        self._active = 0
+        self._stop = threading.Event()
+        self._threads = []
+        self.dropped = 0
+    
+    @property
+    def running(self):
+        with self._cond:
+            return self._active > 0 and not self._stop.is_set()
+    
+    def start(self):
+        """Start one capture thread per source"""
+        self._active = len(self.caps)
+        for index in range(len(self.caps)):
+            thread = threading.Thread(target=self._capture_loop, args=(index,), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def stop(self, timeout=1.0):
+        """Signal the capture threads to stop and wait for them"""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+    
+    def get_latest(self, timeout=None):
+        """Wait for new frames; returns (source index, frame) pairs"""
+        with self._cond:
+            self._cond.wait_for(lambda: (any(frame is not None for frame in self._latest)
+                                         or not self._active or self._stop.is_set()), timeout)
+            fresh = [(index, frame) for index, frame in enumerate(self._latest) if frame is not None]
+            self._latest = [None] * len(self.caps)
+            return fresh
+    
+    def _capture_loop(self, index):
+        cap = self.caps[index]
+        while not self._stop.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                break
+            with self._cond:
+                if self._latest[index] is not None:
+                    self.dropped += 1
+                self._latest[index] = frame
+                self._cond.notify_all()
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+def _ring_inference_process(ring_name, lock, stop, results, detector_options):
+    """Worker process: detect on frames claimed from the ring until stopped"""
+    from detector import ObjectDetector
+    ring = FrameRing.attach(ring_name)
+    try:
+        detector = ObjectDetector(**detector_options)
+    except Exception as error:
+        results.put(error)  # Fail start() now rather than at its timeout
+        ring.close()
+        return
+    results.put(detector.model.names)  # Model loaded
+    frame = None
+    try:
+        while not stop.is_set():
+            seq = ring.claim_latest(lock, timeout=0.1)
+            if seq is None:
+                continue
+            frame = ring.view(seq)
+            if frame is None:
+                continue
+            start = time.perf_counter()
+            detections = detector.detect(frame)
+            # A frame overwritten mid-inference may have been torn
+            if ring.is_current(seq):
+                results.put((seq, detections, time.perf_counter() - start))
+    finally:
+        frame = None  # Release the view so the ring can be unmapped
+        ring.close()
+
+class SharedMemoryPipeline:
+    """Capture into a shared-memory ring read by several inference processes
+    
+    Frames are captured straight into ring slots and never pickled; only
+    the (small) detections travel back through a queue. Each process loads
+    its own ObjectDetector(**detector_options), so per-stream state such as
+    tracking and the motion gate should not be enabled. Has the same
+    display and results queues as DetectionPipeline, and the model's class
+    names once started.
+    """
+    
+    def __init__(self, cap, detector_options, processes=2, slots=None, metrics=None):
+        self.cap = cap
+        self.detector_options = detector_options
+        self.processes = processes
+        # Enough slots that a busy worker's frame is rarely overwritten
+        self.slots = slots or 2 * processes + 2
+        self.metrics = metrics
+        self.display = LatestFrameQueue()
+        self.results = LatestFrameQueue()
+        self.ring = None
+        self.names = {}
+        # The ring is freed once both stop() and the capture thread are done with it
+        self._ring_lock = threading.Lock()
+        self._ring_users = 0
+        self._last_dropped = 0
+        self._stopped = False
+        # Capture time of the frame in each slot, by sequence number
+        self._slot_seqs = np.zeros(self.slots, dtype=np.int64)
+        self._slot_times = np.zeros(self.slots)
+        self._stop = threading.Event()
+        self._threads = []
+        self._workers = []
+    
+    @property
+    def running(self):
+        return not self._stop.is_set()
+    
+    @property
+    def dropped(self):
+        ring = self.ring
+        return ring.dropped if ring is not None else self._last_dropped
+    
+    def start(self, timeout=120):
+        """Create the ring from the first frame and start the inference processes
+        
+        Does nothing once started. If a worker fails to load the model, the
+        workers and the ring are cleaned up and the error is raised.
+        """
+        if self.ring is not None or self._stop.is_set():
+            return
+        ret, frame = self.cap.read()
+        if not ret:
+            self._stop.set()
+            self.display.close()
+            return
+        self.ring = FrameRing.create(frame.shape, self.slots)
+        self._ring_users = 1
+        try:
+            self._start_workers(frame, timeout)
+        except BaseException:
+            self.stop()
+            raise
+        
+        self._ring_users += 1  # Released by the capture thread
+        for target in (self._capture_loop, self._results_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def _start_workers(self, frame, timeout):
+        # Exported here once: workers exporting at the same time would share its files
+        options = self.detector_options
+        prepare_backend(options.get('model_name', 'yolov8n.pt'), options.get('backend', 'torch'),
+                        quantization=options.get('quantization'), mmap_weights=options.get('mmap_weights', False))
+        self.ring.write(frame)
+        self.display.put(frame)
+        
+        context = get_context('spawn')
+        self._lock = context.Lock()
+        self._worker_stop = context.Event()
+        self._worker_results = context.Queue()
+        for _ in range(self.processes):
+            worker = context.Process(target=_ring_inference_process, daemon=True,
+                                     args=(self.ring.name, self._lock, self._worker_stop,
+                                           self._worker_results, self.detector_options))
+            worker.start()
+            self._workers.append(worker)
+        for _ in range(self.processes):
+            loaded = self._worker_results.get(timeout=timeout)
+            if isinstance(loaded, Exception):
+                raise loaded
+            self.names = loaded
+    
+    def stop(self, timeout=1.0):
+        """Stop capture and the workers, then free the ring"""
+        self._stop.set()
+        for queue in (self.display, self.results):
+            queue.close()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        if self._workers:
+            self._worker_stop.set()
+            for worker in self._workers:
+                worker.join(timeout)
+                if worker.is_alive():
+                    worker.terminate()
+            self._workers = []
+        if not self._stopped:
+            self._stopped = True
+            # Capture may still be blocked reading into a slot; then it frees the ring
+            self._release_ring()
+    
+    def _release_ring(self):
+        with self._ring_lock:
+            self._ring_users -= 1
+            if self._ring_users > 0 or self.ring is None:
+                return
+            self._last_dropped = self.ring.dropped
+            self.ring.close()
+            self.ring = None
+    
+    def _capture_loop(self):
+        view = frame = None
+        try:
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                seq, view = self.ring.next_slot()
+                ret, frame = self.cap.read(view)
+                if not ret:
+                    break
+                if not np.shares_memory(frame, view):
+                    view[...] = frame  # Capture could not decode into the slot
+                if captured_at(frame) is not None:
+                    self._slot_seqs[seq % self.slots] = seq
+                    self._slot_times[seq % self.slots] = captured_at(frame)
+                self.ring.commit(seq)
+                # Display keeps its own copy since the slot will be reused
+                self.display.put(view.copy())
+                if self.metrics is not None:
+                    self.metrics.observe('capture', time.perf_counter() - start)
+                    self.metrics.set_counter('frames_dropped', self.ring.dropped)
+        finally:
+            self._stop.set()
+            self.display.close()
+            view = frame = None  # Release the views so the ring can be unmapped
+            self._release_ring()
+    
+    def _results_loop(self):
+        newest = 0
+        while not self._stop.is_set():
+            try:
+                seq, detections, seconds = self._worker_results.get(timeout=0.1)
+            except Empty:
+                continue
+            if self.metrics is not None:
+                self.metrics.observe('inference', seconds)
+            # Workers finish out of order; never go back to an older frame
+            if seq > newest:
+                newest = seq
+                if self._slot_seqs[seq % self.slots] == seq:
+                    detections.captured_at = float(self._slot_times[seq % self.slots])
+                    observe_latency(self.metrics, 'capture_to_detection', detections)
+                self.results.put(detections)
@@ -0,0 +1,118 @@
+import argparse
+import json
+import time
+import numpy as np
+from backends import QUANTIZATION_MODES, load_backend
+from box_utils import box_iou
+from detector import boxes_to_array
+from frame_sources import read_frames
+
+def match_detections(reference, candidate, iou_threshold=0.5):
+    """Count candidate boxes matching a reference box of the same class
+    
+    Both arguments are (N, 6) x1, y1, x2, y2, conf, cls arrays. Candidates
+    are matched greedily in order of confidence, each reference box at
+    most once.
+    """
+    iou = box_iou(candidate[:, :4], reference[:, :4])
+    iou[candidate[:, 5][:, None] != reference[:, 5][None, :]] = 0
+    
+    matched = np.zeros(len(reference), dtype=bool)
+    true_positives = 0
+    for i in np.argsort(-candidate[:, 4], kind='stable'):
+        overlaps = np.where(matched, 0, iou[i])
+        if len(overlaps) and overlaps.max() >= iou_threshold:
+            matched[overlaps.argmax()] = True
+            true_positives += 1
+    return true_positives
+
+def latency_summary(latencies):
+    """Summarize per-frame latencies in seconds"""
+    latencies = np.asarray(latencies)
+    return {
+        'mean_ms': float(latencies.mean() * 1000),
+        'p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'p95_ms': float(np.percentile(latencies, 95) * 1000),
+        'fps': float(len(latencies) / latencies.sum()),
+    }
+
+def run_model(model, frames, conf):
+    """Run a model over frames, returning latencies and (N, 6) detections per frame"""
+    model(frames[0], verbose=False, conf=conf)  # Warm-up
+    latencies, detections = [], []
+    for frame in frames:
+        start = time.perf_counter()
+        results = model(frame, verbose=False, conf=conf)[0]
+        latencies.append(time.perf_counter() - start)
+        detections.append(boxes_to_array(results.boxes))
+    return latencies, detections
+
+def compare_models(reference_model, candidate_model, frames, conf=0.25, iou_threshold=0.5):
+    """Report latency and detection agreement of a candidate against a reference model"""
+    reference_latencies, reference_detections = run_model(reference_model, frames, conf)
+    candidate_latencies, candidate_detections = run_model(candidate_model, frames, conf)
+    
+    true_positives = sum(match_detections(r, c, iou_threshold)
+                         for r, c in zip(reference_detections, candidate_detections))
+    reference_count = sum(len(r) for r in reference_detections)
+    candidate_count = sum(len(c) for c in candidate_detections)
+    
+    reference = latency_summary(reference_latencies)
+    candidate = latency_summary(candidate_latencies)
+    return {
+        'frames': len(frames),
+        'reference': reference,
+        'candidate': candidate,
+        'speedup': reference['mean_ms'] / candidate['mean_ms'],
+        'precision': true_positives / candidate_count if candidate_count else 1.0,
+        'recall': true_positives / reference_count if reference_count else 1.0,
+        'per_frame_ms': {
+            'reference': [t * 1000 for t in reference_latencies],
+            'candidate': [t * 1000 for t in candidate_latencies],
+        },
+    }
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Build an INT8 model and compare it against FP32")
+    parser.add_argument('model', nargs='?', default='yolov8n.pt')
+    parser.add_argument('--mode', choices=QUANTIZATION_MODES, default='static')
+    parser.add_argument('--calibration', metavar='SOURCE',
+                        help="video file or image directory used to calibrate static quantization")
+    parser.add_argument('--compare', metavar='SOURCE',
+                        help="video file or image directory to compare both models on")
+    parser.add_argument('--limit', type=int, default=200, help="maximum frames to read per source")
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--output', help="write the JSON report to this file")
+    return parser.parse_args(argv)
+
+def main(args):
+    calibration_frames = None
+    if args.calibration:
+        calibration_frames = list(read_frames(args.calibration, args.limit))
+    
+    reference = load_backend(args.model, 'onnx', args.imgsz)
+    candidate = load_backend(args.model, 'onnx', args.imgsz, quantization=args.mode,
+                             calibration_frames=calibration_frames)
+    print(f"INT8 {args.mode} model ready")
+    
+    if not args.compare:
+        return None
+    
+    frames = list(read_frames(args.compare, args.limit))
+    report = compare_models(reference, candidate, frames)
+    
+    print(f"Frames:    {report['frames']}")
+    for name in ('reference', 'candidate'):
+        stats = report[name]
+        print(f"{name:10} mean {stats['mean_ms']:.1f} ms  p95 {stats['p95_ms']:.1f} ms  {stats['fps']:.1f} FPS")
+    print(f"Speedup:   {report['speedup']:.2f}x")
+    print(f"Precision: {report['precision']:.3f}  Recall: {report['recall']:.3f}")
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return report
+
+if __name__ == "__main__":  # pragma: no cover
+    main(parse_args())
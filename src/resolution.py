@@ -0,0 +1,40 @@
+from collections import deque
+import numpy as np
+
+class ResolutionController:
+    """Pick the inference size that keeps per-frame latency within a budget.
+    
+    After every window of measurements, the size steps down if the median
+    latency is over target_latency. It steps up only if the next size is
+    predicted to fit under headroom * target_latency, assuming latency
+    grows with pixel count. The gap between the two rules, plus a fresh
+    window after each change, keeps the size from thrashing.
+    """
+    
+    def __init__(self, target_latency, sizes=(320, 416, 640), window=10, headroom=0.8):
+        self.target_latency = target_latency
+        self.sizes = sorted(sizes)
+        self.headroom = headroom
+        self.index = len(self.sizes) - 1
+        self._latencies = deque(maxlen=window)
+    
+    @property
+    def size(self):
+        return self.sizes[self.index]
+    
+    def record(self, latency):
+        """Record one inference latency in seconds and maybe change size"""
+        self._latencies.append(latency)
+        if len(self._latencies) < self._latencies.maxlen:
+            return self.size
+        
+        median = float(np.median(self._latencies))
+        if median > self.target_latency and self.index > 0:
+            self.index -= 1
+            self._latencies.clear()
+        elif self.index < len(self.sizes) - 1:
+            growth = (self.sizes[self.index + 1] / self.size) ** 2
+            if median * growth < self.target_latency * self.headroom:
+                self.index += 1
+                self._latencies.clear()
+        return self.size
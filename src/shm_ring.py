@@ -0,0 +1,139 @@
+import time
+from multiprocessing import shared_memory
+import numpy as np
+
+# int64 header: latest committed sequence, latest claimed sequence, frames
+# skipped by readers, then the frame shape and slot count
+LATEST, CLAIMED, DROPPED, HEIGHT, WIDTH, CHANNELS, SLOTS = range(7)
+HEADER_FIELDS = 7
+
+class FrameRing:
+    """Fixed-slot ring of frames in shared memory where the newest frame wins
+    
+    One writer fills the slots in turn, in place; readers in other
+    processes attach by name and get NumPy views of the slots without any
+    pickling or copying. Every slot records the sequence number of the
+    frame it holds (-1 while it is being written), so a reader can check
+    whether the frame it is working on has since been overwritten.
+    Attach from processes started by the creating process, which share
+    its shared-memory cleanup.
+    """
+    
+    def __init__(self, shm, owner=False):
+        self.shm = shm
+        self.owner = owner
+        self.header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        height, width, channels, slots = self.header[HEIGHT:].tolist()
+        self.shape = (height, width, channels)
+        self.slots = slots
+        self.sequences = np.ndarray((slots,), dtype=np.int64, buffer=shm.buf, offset=HEADER_FIELDS * 8)
+        self.frames = np.ndarray((slots, height, width, channels), dtype=np.uint8, buffer=shm.buf,
+                                 offset=(HEADER_FIELDS + slots) * 8)
+    
+    @classmethod
+    def create(cls, shape, slots=4, name=None):
+        """Allocate a ring for frames of shape (height, width, channels)"""
+        height, width, channels = shape
+        size = (HEADER_FIELDS + slots) * 8 + slots * height * width * channels
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        header[:] = [0, 0, 0, height, width, channels, slots]
+        np.ndarray((slots,), dtype=np.int64, buffer=shm.buf, offset=HEADER_FIELDS * 8)[:] = 0
+        return cls(shm, owner=True)
+    
+    @classmethod
+    def attach(cls, name):
+        """Map an existing ring created by another process"""
+        return cls(shared_memory.SharedMemory(name=name))
+    
+    @property
+    def name(self):
+        return self.shm.name
+    
+    @property
+    def latest(self):
+        """Sequence number of the newest committed frame (0 before the first)"""
+        return int(self.header[LATEST])
+    
+    @property
+    def dropped(self):
+        """Frames that were overwritten before any reader claimed them"""
+        return int(self.header[DROPPED])
+    
+    def next_slot(self):
+        """Start writing the next frame: returns (seq, view) to fill in place"""
+        seq = self.latest + 1
+        slot = seq % self.slots
+        self.sequences[slot] = -1
+        return seq, self.frames[slot]
+    
+    def commit(self, seq):
+        """Publish a frame filled in through next_slot"""
+        self.sequences[seq % self.slots] = seq
+        self.header[LATEST] = seq
+    
+    def write(self, frame):
+        """Copy a frame into the next slot and publish it"""
+        seq, view = self.next_slot()
+        view[...] = frame
+        self.commit(seq)
+        return seq
+    
+    def is_current(self, seq):
+        """Whether frame seq is still in its slot"""
+        return seq > 0 and int(self.sequences[seq % self.slots]) == seq
+    
+    def view(self, seq):
+        """Zero-copy view of frame seq, or None if it has been overwritten"""
+        if not self.is_current(seq):
+            return None
+        return self.frames[seq % self.slots]
+    
+    def read_latest(self, copy=True):
+        """Newest frame as (seq, frame), or None before the first frame
+        
+        With copy=False the frame is a view; check is_current(seq) after
+        using it to know it was not overwritten meanwhile.
+        """
+        while True:
+            seq = self.latest
+            if seq == 0:
+                return None
+            frame = self.view(seq)
+            if frame is not None and copy:
+                frame = frame.copy()
+            if frame is not None and self.is_current(seq):
+                return seq, frame
+    
+    def claim_latest(self, lock, timeout=None, poll_interval=0.001):
+        """Claim the newest frame no other reader has claimed, waiting for one
+        
+        Readers sharing lock each get different frames; frames that are
+        superseded before anyone claims them count as dropped. Returns the
+        sequence number, or None on timeout.
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            with lock:
+                latest, claimed = self.latest, int(self.header[CLAIMED])
+                if latest > claimed:
+                    self.header[DROPPED] += latest - claimed - 1
+                    self.header[CLAIMED] = latest
+                    return latest
+            if deadline is not None and time.perf_counter() >= deadline:
+                return None
+            time.sleep(poll_interval)
+    
+    def close(self):
+        """Unmap the ring; the creating process also frees it"""
+        # Views into the buffer must be released before it can be closed
+        if self.owner:
+            self.shm.unlink()
+        self.header = self.sequences = self.frames = None
+        self.shm.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
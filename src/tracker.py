@@ -0,0 +1,90 @@
+import numpy as np
+from box_utils import box_iou
+
+class IoUTracker:
+    """Carry detections forward between model runs with stable track ids.
+    
+    Each track keeps a constant-velocity estimate of its box. On frames
+    with fresh detections, tracks are matched to detections of the same
+    class by IoU; on frames without, boxes move by their velocity and
+    their confidence decays, so stale tracks fade out.
+    """
+    
+    def __init__(self, iou_threshold=0.3, confidence_decay=0.95, smoothing=0.5):
+        self.iou_threshold = iou_threshold
+        self.confidence_decay = confidence_decay
+        self.smoothing = smoothing
+        self.tracks = None  # DETECTION_DTYPE array of current tracks
+        self._observed = np.zeros((0, 4), dtype=np.float32)
+        self._boxes = np.zeros((0, 4), dtype=np.float32)
+        self._velocity = np.zeros((0, 4), dtype=np.float32)
+        self._steps = 0
+        self._next_id = 0
+    
+    def __len__(self):
+        return 0 if self.tracks is None else len(self.tracks)
+    
+    @property
+    def min_confidence(self):
+        """Lowest confidence among current tracks (1.0 when there are none)"""
+        if not len(self):
+            return 1.0
+        return float(self.tracks['confidence'].min())
+    
+    def _match(self, detections):
+        """Greedily pair tracks and detections of the same class by IoU"""
+        iou = box_iou(self._boxes, detections['box'])
+        iou[self.tracks['class_id'][:, None] != detections['class_id'][None, :]] = 0
+        
+        track_idx, det_idx = np.nonzero(iou >= self.iou_threshold)
+        order = np.argsort(-iou[track_idx, det_idx], kind='stable')
+        
+        matches = {}
+        used = set()
+        for t, d in zip(track_idx[order].tolist(), det_idx[order].tolist()):
+            if t not in matches and d not in used:
+                matches[t] = d
+                used.add(d)
+        return matches
+    
+    def update(self, detections):
+        """Match fresh detections to tracks and return them with track ids"""
+        boxes = detections['box'].astype(np.float32)
+        velocity = np.zeros_like(boxes)
+        track_ids = np.empty(len(detections), dtype=np.int32)
+        
+        matches = self._match(detections) if len(self) else {}
+        matched = np.zeros(len(detections), dtype=bool)
+        for t, d in matches.items():
+            step = (boxes[d] - self._observed[t]) / (self._steps + 1)
+            velocity[d] = self.smoothing * self._velocity[t] + (1 - self.smoothing) * step
+            track_ids[d] = self.tracks['track_id'][t]
+            matched[d] = True
+        
+        # Unmatched detections start new tracks
+        new_count = int((~matched).sum())
+        track_ids[~matched] = np.arange(self._next_id, self._next_id + new_count)
+        self._next_id += new_count
+        
+        self.tracks = detections.copy()
+        self.tracks['track_id'] = track_ids
+        self._observed = boxes
+        self._boxes = boxes.copy()
+        self._velocity = velocity
+        self._steps = 0
+        return self.tracks.copy()
+    
+    def predict(self, frame_shape=None):
+        """Advance tracks by one frame without running the model"""
+        if not len(self):
+            return self.tracks.copy() if self.tracks is not None else None
+        
+        self._boxes = self._boxes + self._velocity
+        if frame_shape is not None:
+            height, width = frame_shape[:2]
+            np.clip(self._boxes, 0, [width, height, width, height], out=self._boxes)
+        self._steps += 1
+        
+        self.tracks['box'] = self._boxes
+        self.tracks['confidence'] *= self.confidence_decay
+        return self.tracks.copy()
@@ -0,0 +1,116 @@
+import argparse
+import json
+import time
+from multiprocessing import get_context
+import numpy as np
+from backends import CACHE_DIR, export_weights
+
+LOAD_MODES = ('pickle', 'mmap')
+
+def memory_usage():
+    """Resident, proportional and private memory of this process in bytes
+    
+    Pss splits each shared page between the processes mapping it, so
+    summed over processes it counts shared weights once. Linux only; other
+    platforms get an empty dict.
+    """
+    fields = {'Rss': 'rss_bytes', 'Pss': 'pss_bytes',
+              'Private_Clean': 'private_bytes', 'Private_Dirty': 'private_bytes'}
+    usage = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if name in fields:
+                    key = fields[name]
+                    usage[key] = usage.get(key, 0) + int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    return usage
+
+def _load_process(mode, model_name, cache_dir, barrier, results):
+    """Worker process: load the model one way and report time and memory"""
+    # Libraries (and torch with them) first, so only the model itself is measured
+    from ultralytics import YOLO
+    from backends import MappedTorchModel
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    before = memory_usage()
+    
+    start = time.perf_counter()
+    if mode == 'mmap':
+        model = MappedTorchModel(model_name, cache_dir=cache_dir)
+    else:
+        model = YOLO(model_name)
+    loaded = time.perf_counter()
+    model(frame, verbose=False)
+    first_inference = time.perf_counter()
+    
+    # Measure while every process is alive, so shared pages are split between them
+    barrier.wait()
+    after = memory_usage()
+    results.put({
+        'load_seconds': loaded - start,
+        'first_inference_seconds': first_inference - loaded,
+        **after,
+        'model_rss_bytes': after.get('rss_bytes', 0) - before.get('rss_bytes', 0),
+    })
+    barrier.wait()
+
+def measure_loading(model_name='yolov8n.pt', mode='mmap', processes=4, cache_dir=CACHE_DIR, timeout=300):
+    """Load the model in several processes at once and return each one's measurements"""
+    if mode not in LOAD_MODES:
+        raise ValueError(f"Unknown load mode '{mode}', expected one of {LOAD_MODES}")
+    if mode == 'mmap':
+        export_weights(model_name, cache_dir)  # Build the store once, outside the timings
+    
+    context = get_context('spawn')
+    barrier = context.Barrier(processes)
+    results = context.Queue()
+    workers = [context.Process(target=_load_process, args=(mode, model_name, cache_dir, barrier, results))
+               for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    try:
+        return [results.get(timeout=timeout) for _ in workers]
+    finally:
+        for worker in workers:
+            worker.join(timeout)
+
+def summarize(measurements):
+    """Means over processes, plus the Pss total of all of them"""
+    summary = {key: float(np.mean([m[key] for m in measurements]))
+               for key in measurements[0]}
+    if 'pss_bytes' in summary:
+        summary['total_pss_bytes'] = float(sum(m['pss_bytes'] for m in measurements))
+    summary['processes'] = len(measurements)
+    return summary
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(
+        description="Compare per-process memory and load time with and without memory-mapped weights")
+    parser.add_argument('--model', default='yolov8n.pt', help="YOLO weights to load")
+    parser.add_argument('--processes', type=int, default=4, help="processes loading the model at once")
+    parser.add_argument('--modes', nargs='+', choices=LOAD_MODES, default=list(LOAD_MODES))
+    parser.add_argument('--output', help="write the JSON report to this file")
+    return parser.parse_args(argv)
+
+def main(args):
+    report = {mode: summarize(measure_loading(args.model, mode, args.processes)) for mode in args.modes}
+    
+    mb = 1024 * 1024
+    print(f"{args.processes} processes loading {args.model}")
+    for mode, stats in report.items():
+        print(f"{mode:7} load {stats['load_seconds'] * 1000:.0f} ms  "
+              f"first inference {stats['first_inference_seconds'] * 1000:.0f} ms  "
+              f"RSS {stats.get('rss_bytes', 0) / mb:.0f} MB  "
+              f"PSS {stats.get('pss_bytes', 0) / mb:.0f} MB  "
+              f"private {stats.get('private_bytes', 0) / mb:.0f} MB per process")
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return report
+
+if __name__ == "__main__":  # pragma: no cover
+    main(parse_args())
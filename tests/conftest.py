@@ -1,7 +1,9 @@
 import pytest
 import numpy as np
 import cv2
+import wave
 from pathlib import Path
+from unittest.mock import Mock
 
 @pytest.fixture
 def sample_frame():
@@ -21,6 +23,23 @@ def sample_image_path(tmp_path):
     cv2.imwrite(str(img_path), img)
     return str(img_path)
 
+@pytest.fixture
+def make_detections():
+    """Factory for DETECTION_DTYPE arrays from (x1, y1, x2, y2, conf, cls[, track_id]) rows"""
+    from detector import DETECTION_DTYPE
+    
+    def make(rows):
+        detections = np.zeros(len(rows), dtype=DETECTION_DTYPE)
+        detections['track_id'] = -1
+        for detection, row in zip(detections, rows):
+            detection['box'] = row[:4]
+            detection['confidence'], detection['class_id'] = row[4:6]
+            if len(row) > 6:
+                detection['track_id'] = row[6]
+        return detections
+    
+    return make
+
 @pytest.fixture
 def mock_detections():
     """Mock YOLO detection results"""
@@ -46,3 +65,23 @@ def mock_detections():
             self.boxes = MockBoxes()
     
     return MockResults()
+
+@pytest.fixture
+def make_tts_engine():
+    """Factory for mock TTS engines whose save_to_file writes a real WAV file"""
+    def make(framerate=16000, voice='default'):
+        engine = Mock()
+        engine.getProperty.side_effect = lambda name: {'voice': voice, 'rate': 150, 'volume': 0.9}[name]
+        
+        def save_to_file(text, path):
+            # One frame per character of the phrase
+            with wave.open(path, 'wb') as f:
+                f.setnchannels(1)
+                f.setsampwidth(2)
+                f.setframerate(framerate)
+                f.writeframes(b'\x01\x00' * len(text))
+        
+        engine.save_to_file.side_effect = save_to_file
+        return engine
+    
+    return make
@@ -2,12 +2,14 @@ import pytest
 import sys
 from pathlib import Path
 from unittest.mock import Mock, patch, MagicMock
+import threading
 import time
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
 from audio_feedback import AudioFeedback
+from metrics import Metrics
 
 class TestAudioFeedback:
     
@@ -160,8 +162,11 @@ class TestAudioFeedback:
     
     @patch('audio_feedback.pyttsx3.init')
     def test_is_speaking_flag(self, mock_init):
-        """Test that is_speaking flag prevents overlapping speech"""
+        """Test that is_speaking is set while the worker is speaking"""
+        started = threading.Event()
+        release = threading.Event()
         mock_engine = Mock()
+        mock_engine.runAndWait.side_effect = lambda: (started.set(), release.wait(1))
         mock_init.return_value = mock_engine
         
         audio = AudioFeedback()
@@ -169,11 +174,260 @@ class TestAudioFeedback:
         # Initially not speaking
         assert not audio.is_speaking
         
-        # Simulate speaking
-        audio.is_speaking = True
-        
-        # Try to speak while already speaking - should be blocked
         audio.speak("test")
-        
-        # Flag should still be true
+        assert started.wait(1)
         assert audio.is_speaking
+        
+        release.set()
+        assert audio.wait_until_idle(timeout=1)
+        assert not audio.is_speaking
+        audio.close()
+
+class TestAnnounceSources:
+    
+    @patch('audio_feedback.pyttsx3.init')
+    def test_sources_announced_together(self, mock_init):
+        """Test that several sources become one utterance prefixed by name"""
+        mock_engine = Mock()
+        mock_init.return_value = mock_engine
+        
+        audio = AudioFeedback()
+        audio.announce_sources([
+            ("Camera 1", [{'label': 'person', 'confidence': 0.9, 'distance': 'close'}]),
+            ("Camera 2", []),
+            ("Camera 3", [{'label': 'car', 'confidence': 0.8, 'distance': 'far'}]),
+        ])
+        audio.wait_until_idle(timeout=1)
+        audio.close()
+        
+        mock_engine.say.assert_called_once_with(
+            "Camera 1: 1 objects nearby: person. Camera 3: 1 objects far away")
+    
+    @patch('audio_feedback.pyttsx3.init')
+    def test_nothing_to_announce(self, mock_init):
+        """Test that sources without detections stay silent"""
+        mock_engine = Mock()
+        mock_init.return_value = mock_engine
+        
+        audio = AudioFeedback()
+        audio.announce_sources([("Camera 1", []), ("Camera 2", [])])
+        audio.wait_until_idle(timeout=1)
+        audio.close()
+        
+        mock_engine.say.assert_not_called()
+
+class TestSpeechWorker:
+    
+    @patch('audio_feedback.pyttsx3.init')
+    def test_worker_speaks_queued_text(self, mock_init):
+        """Test that the speech worker speaks queued text"""
+        mock_engine = Mock()
+        mock_init.return_value = mock_engine
+        
+        audio = AudioFeedback()
+        audio.speak("hello")
+        
+        assert audio.wait_until_idle(timeout=1)
+        mock_engine.say.assert_called_once_with("hello")
+        audio.close()
+    
+    @patch('audio_feedback.pyttsx3.init')
+    def test_newer_text_replaces_stale_queued_text(self, mock_init):
+        """Test that text queued while speaking is coalesced to the newest"""
+        started = threading.Event()
+        release = threading.Event()
+        mock_engine = Mock()
+        mock_engine.runAndWait.side_effect = lambda: (started.set(), release.wait(1))
+        mock_init.return_value = mock_engine
+        
+        audio = AudioFeedback()
+        audio.speak("first")
+        assert started.wait(1)
+        
+        # Busy: these queue up behind "first" and only the newest survives
+        audio.speak("stale")
+        audio.speak("newest")
+        release.set()
+        
+        assert audio.wait_until_idle(timeout=1)
+        spoken = [c.args[0] for c in mock_engine.say.call_args_list]
+        assert spoken == ["first", "newest"]
+        assert audio.coalesced == 1
+        audio.close()
+    
+    @patch('audio_feedback.pyttsx3.init')
+    def test_single_long_lived_worker(self, mock_init):
+        """Test that speaking does not start a thread per utterance"""
+        mock_init.return_value = Mock()
+        
+        audio = AudioFeedback()
+        threads_before = threading.active_count()
+        for i in range(5):
+            audio.speak(f"message {i}")
+            audio.wait_until_idle(timeout=1)
+        
+        assert threading.active_count() == threads_before
+        audio.close()
+    
+    @patch('audio_feedback.pyttsx3.init')
+    def test_worker_survives_engine_errors(self, mock_init):
+        """Test that a failed utterance does not kill the worker"""
+        mock_engine = Mock()
+        mock_engine.runAndWait.side_effect = [RuntimeError("device busy"), None]
+        mock_init.return_value = mock_engine
+        
+        audio = AudioFeedback()
+        audio.speak("first")
+        audio.wait_until_idle(timeout=1)
+        audio.speak("second")
+        
+        assert audio.wait_until_idle(timeout=1)
+        assert mock_engine.say.call_count == 2
+        audio.close()
+    
+    @patch('audio_feedback.pyttsx3.init')
+    def test_worker_owns_the_engine(self, mock_init):
+        """Test that the engine is created and used only on the speech worker thread"""
+        threads = set()
+        mock_engine = Mock()
+        mock_engine.say.side_effect = lambda text: threads.add(threading.current_thread())
+        mock_init.side_effect = lambda: threads.add(threading.current_thread()) or mock_engine
+        
+        audio = AudioFeedback()
+        audio.speak("hello")
+        assert audio.wait_until_idle(timeout=1)
+        
+        assert threads == {audio._worker}
+        audio.close()
+    
+    @patch('audio_feedback.pyttsx3.init', side_effect=RuntimeError("no speech driver"))
+    def test_engine_errors_reach_the_caller(self, mock_init):
+        """Test that failing to create the engine on the worker fails the constructor"""
+        with pytest.raises(RuntimeError, match="no speech driver"):
+            AudioFeedback()
+    
+    @patch('audio_feedback.pyttsx3.init')
+    def test_close_stops_worker(self, mock_init):
+        """Test clean shutdown and that speech is ignored after close"""
+        mock_engine = Mock()
+        mock_init.return_value = mock_engine
+        
+        audio = AudioFeedback()
+        audio.close()
+        
+        assert not audio._worker.is_alive()
+        audio.speak("too late")
+        mock_engine.say.assert_not_called()
+    
+    @patch('audio_feedback.pyttsx3.init')
+    def test_worker_records_metrics(self, mock_init):
+        """Test that speech is timed and coalesced announcements counted"""
+        started = threading.Event()
+        release = threading.Event()
+        mock_engine = Mock()
+        mock_engine.runAndWait.side_effect = lambda: (started.set(), release.wait(1))
+        mock_init.return_value = mock_engine
+        metrics = Metrics()
+        
+        audio = AudioFeedback(metrics=metrics)
+        audio.speak("first")
+        assert started.wait(1)
+        audio.speak("stale")
+        audio.speak("newest")
+        release.set()
+        assert audio.wait_until_idle(timeout=1)
+        audio.close()
+        
+        snapshot = metrics.snapshot()
+        assert snapshot['stages']['speech']['count'] == 2
+        assert snapshot['counters']['announcements_coalesced'] == 1
+    
+    @patch('audio_feedback.pyttsx3.init')
+    def test_worker_records_capture_to_speech(self, mock_init):
+        """Test that speech of a stamped announcement is timed from frame capture"""
+        mock_init.return_value = Mock()
+        metrics = Metrics()
+        
+        audio = AudioFeedback(metrics=metrics)
+        audio.announce_detections([{'label': 'person', 'confidence': 0.9, 'distance': 'close'}],
+                                  captured_at=time.perf_counter() - 0.1)
+        assert audio.wait_until_idle(timeout=1)
+        audio.speak("unstamped")
+        assert audio.wait_until_idle(timeout=1)
+        audio.close()
+        
+        stage = metrics.snapshot()['stages']['capture_to_speech']
+        assert stage['count'] == 1
+        assert stage['p50_ms'] >= 100
+
+class TestCachedAnnouncements:
+    
+    @patch('audio_feedback.can_play', return_value=True)
+    @patch('audio_feedback.play_clip')
+    @patch('audio_feedback.pyttsx3.init')
+    def test_announcement_plays_cached_clips(self, mock_init, mock_play, mock_can_play, tmp_path, make_tts_engine):
+        """Test that announcements are assembled from cached phrase clips"""
+        mock_init.return_value = make_tts_engine()
+        
+        audio = AudioFeedback(phrase_cache_dir=tmp_path)
+        audio.announce_detections([
+            {'label': 'person', 'confidence': 0.9, 'distance': 'close'},
+            {'label': 'car', 'confidence': 0.8, 'distance': 'far'},
+        ])
+        
+        assert audio.wait_until_idle(timeout=1)
+        mock_play.assert_called_once()
+        audio.engine.say.assert_not_called()
+        rendered = [c.args[0] for c in audio.engine.save_to_file.call_args_list]
+        assert rendered == ["1 objects nearby", "person", "1 objects far away"]
+        audio.close()
+    
+    @patch('audio_feedback.can_play', return_value=True)
+    @patch('audio_feedback.play_clip')
+    @patch('audio_feedback.pyttsx3.init')
+    def test_warm_up_renders_vocabulary(self, mock_init, mock_play, mock_can_play, tmp_path, make_tts_engine):
+        """Test that warm-up fills the cache so announcements need no synthesis"""
+        from audio_feedback import announcement_vocabulary
+        mock_init.return_value = make_tts_engine()
+        
+        audio = AudioFeedback(phrase_cache_dir=tmp_path)
+        vocabulary = announcement_vocabulary(['person', 'dog'], max_count=3)
+        audio.warm_up(vocabulary)
+        assert audio.wait_until_idle(timeout=2)
+        assert audio.engine.save_to_file.call_count == len(vocabulary) == 11
+        
+        audio.announce_detections([{'label': 'dog', 'confidence': 0.9, 'distance': 'close'}])
+        assert audio.wait_until_idle(timeout=1)
+        assert audio.engine.save_to_file.call_count == 11
+        mock_play.assert_called_once()
+        audio.close()
+    
+    @patch('audio_feedback.can_play', return_value=True)
+    @patch('audio_feedback.pyttsx3.init')
+    def test_cache_sizes(self, mock_init, mock_can_play, tmp_path, make_tts_engine):
+        """Test that the memory and disk bounds of the phrase cache can be set"""
+        mock_init.return_value = make_tts_engine()
+        
+        audio = AudioFeedback(phrase_cache_dir=tmp_path, phrase_cache_size=2, phrase_cache_disk_size=3)
+        audio.warm_up(["one", "two", "three", "four", "five"])
+        assert audio.wait_until_idle(timeout=2)
+        
+        assert (audio.phrase_cache.max_memory_clips, audio.phrase_cache.max_disk_clips) == (2, 3)
+        assert len(list(tmp_path.glob('*.wav'))) == 3
+        audio.close()
+    
+    @patch('audio_feedback.can_play', return_value=False)
+    @patch('audio_feedback.pyttsx3.init')
+    def test_without_player_falls_back_to_speech(self, mock_init, mock_can_play, tmp_path):
+        """Test that announcements still work without the optional player"""
+        mock_engine = Mock()
+        mock_init.return_value = mock_engine
+        
+        audio = AudioFeedback(phrase_cache_dir=tmp_path)
+        audio.warm_up(["person"])
+        audio.speak("1 objects nearby: person", ["1 objects nearby", "person"])
+        
+        assert audio.phrase_cache is None
+        assert audio.wait_until_idle(timeout=1)
+        mock_engine.say.assert_called_once_with("1 objects nearby: person")
+        audio.close()
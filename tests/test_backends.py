@@ -0,0 +1,300 @@
+import pytest
+import sys
+from pathlib import Path
+from unittest.mock import Mock, patch
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from backends import (letterbox, postprocess, NumpyResults, ExportedModel, MappedTorchModel,
+                      cache_key, export_model, export_weights, load_backend, prepare_backend)
+from detector import boxes_to_array
+
+class FakeModel(ExportedModel):
+    """Exported model whose graph returns a fixed raw output"""
+    
+    def __init__(self, output, names):
+        super().__init__(names, imgsz=640)
+        self.output = output
+        self.batches = []
+    
+    def _run(self, batch):
+        self.batches.append(batch)
+        return np.repeat(self.output[None], len(batch), axis=0)
+
+def raw_output(rows, num_classes=3, anchors=8):
+    """Build a (4 + classes, anchors) output from (cx, cy, w, h, class, score) rows"""
+    output = np.zeros((4 + num_classes, anchors), dtype=np.float32)
+    for i, (cx, cy, w, h, cls, score) in enumerate(rows):
+        output[:4, i] = (cx, cy, w, h)
+        output[4 + cls, i] = score
+    return output
+
+def load_names(*args, **kwargs):
+    """Class names of a loaded backend, which unlike the model pickle back from a worker"""
+    return load_backend(*args, **kwargs).names
+
+class TestPreprocessing:
+    
+    def test_letterbox_keeps_aspect_ratio(self, sample_frame):
+        """Test that a 640x480 frame is scaled and padded to a square"""
+        canvas, scale, pad = letterbox(sample_frame, 320)
+        
+        assert canvas.shape == (320, 320, 3)
+        assert scale == pytest.approx(0.5)
+        assert pad == (0, 40)
+        assert canvas[0, 0].tolist() == [114, 114, 114]
+
+class TestPostprocessing:
+    
+    def test_decode_filters_and_suppresses(self):
+        """Test score filtering, class-aware NMS and box conversion"""
+        output = raw_output([
+            (100, 100, 40, 40, 0, 0.9),
+            (102, 100, 40, 40, 0, 0.8),   # duplicate of the first box
+            (102, 100, 40, 40, 1, 0.7),   # same place, different class
+            (300, 300, 20, 20, 2, 0.1),   # below conf
+        ])
+        
+        data = postprocess(output, 1.0, (0, 0), (640, 640))
+        
+        assert data[:, 5].tolist() == [0, 1]
+        np.testing.assert_allclose(data[0], [80, 80, 120, 120, 0.9, 0], rtol=1e-6)
+    
+    def test_decode_class_allow_list(self):
+        """Test that only listed classes survive, before NMS and max_det"""
+        output = raw_output([
+            (100, 100, 40, 40, 0, 0.9),
+            (300, 300, 40, 40, 1, 0.8),
+            (500, 500, 40, 40, 2, 0.7),
+        ])
+        
+        data = postprocess(output, 1.0, (0, 0), (640, 640), max_det=1, classes=[1, 2])
+        
+        assert data[:, 5].tolist() == [1]
+    
+    def test_decode_undoes_letterbox(self):
+        """Test that boxes are mapped back to frame pixels and clipped"""
+        output = raw_output([(160, 160, 40, 40, 0, 0.9), (5, 45, 20, 20, 1, 0.8)])
+        
+        data = postprocess(output, 0.5, (0, 40), (480, 640))
+        
+        np.testing.assert_allclose(data[0, :4], [280, 200, 360, 280])
+        np.testing.assert_allclose(data[1, :4], [0, 0, 30, 30])
+
+class TestExportedModel:
+    
+    def test_results_match_boxes_contract(self, sample_frame):
+        """Test that results expose xyxy, conf and cls like ultralytics Boxes"""
+        model = FakeModel(raw_output([(320, 320, 100, 100, 1, 0.9)]), {0: 'a', 1: 'b', 2: 'c'})
+        
+        results = model(sample_frame, verbose=False)
+        boxes = results[0].boxes
+        
+        assert len(results) == 1
+        assert isinstance(results[0], NumpyResults)
+        assert len(boxes) == 1
+        assert boxes.conf[0] == pytest.approx(0.9)
+        assert int(boxes.cls[0]) == 1
+        box = next(iter(boxes))
+        assert list(map(int, box.xyxy[0])) == [270, 190, 370, 290]
+        np.testing.assert_array_equal(boxes_to_array(boxes), boxes.data)
+    
+    def test_batch_input(self, sample_frame):
+        """Test that a list of frames runs as a single RGB NCHW batch"""
+        model = FakeModel(raw_output([]), {0: 'a', 1: 'b', 2: 'c'})
+        
+        results = model([sample_frame, sample_frame], imgsz=320)
+        
+        assert len(results) == 2
+        assert model.batches[0].shape == (2, 3, 320, 320)
+        assert model.batches[0].dtype == np.float32
+        assert model.batches[0].max() <= 1.0
+    
+    def test_detector_reads_backend_results(self, sample_frame):
+        """Test that ObjectDetector parses backend results unchanged"""
+        from detector import ObjectDetector
+        
+        model = FakeModel(raw_output([(320, 320, 400, 400, 2, 0.9)]), {0: 'a', 1: 'b', 2: 'c'})
+        with patch('detector.load_backend', return_value=model):
+            detector = ObjectDetector('yolov8n.onnx', backend='onnx')
+        
+        detections = detector.get_detections_list(detector.detect_objects(sample_frame))
+        assert detections == [{'label': 'c', 'confidence': pytest.approx(0.9), 'distance': 'close'}]
+
+class TestLoadBackend:
+    
+    def test_unknown_backend(self):
+        """Test that unsupported backends are rejected"""
+        with pytest.raises(ValueError):
+            load_backend('yolov8n.pt', 'tensorrt')
+    
+    def test_prepare_backend(self, tmp_path):
+        """Test that preparing writes the artifact each backend loads from, and nothing for torch"""
+        with patch('backends.export_model') as mock_export:
+            assert prepare_backend('yolov8n.pt', 'onnx', cache_dir=tmp_path) is mock_export.return_value
+        mock_export.assert_called_once_with('yolov8n.pt', 'onnx', 640, tmp_path)
+        with patch('backends.export_weights') as mock_weights:
+            prepare_backend('yolov8n.pt', mmap_weights=True, cache_dir=tmp_path)
+        mock_weights.assert_called_once_with('yolov8n.pt', tmp_path)
+        assert prepare_backend('yolov8n.pt', 'torch') is None
+        
+        with pytest.raises(ValueError, match="onnx backend"):
+            prepare_backend('yolov8n.pt', 'openvino', quantization='dynamic')
+        with pytest.raises(ValueError, match="torch backend"):
+            prepare_backend('yolov8n.pt', 'onnx', mmap_weights=True)
+    
+    def test_onnx_matches_torch(self, tmp_path):
+        """Test that the ONNX backend reproduces the torch results"""
+        pytest.importorskip('onnxruntime')
+        from ultralytics import YOLO
+        
+        frame = np.random.default_rng(0).integers(0, 255, (640, 640, 3), dtype=np.uint8)
+        onnx_model = load_backend('yolov8n.pt', 'onnx', cache_dir=tmp_path)
+        torch_results = YOLO('yolov8n.pt')(frame, verbose=False, conf=0.0001, max_det=10)[0]
+        onnx_results = onnx_model(frame, conf=0.0001, max_det=10)[0]
+        
+        np.testing.assert_allclose(boxes_to_array(onnx_results.boxes),
+                                   boxes_to_array(torch_results.boxes), atol=1e-2)
+        # Second load reuses the cached export
+        assert list(tmp_path.iterdir()) == [tmp_path / f"yolov8n_640_{cache_key('yolov8n.pt', 640)}.onnx"]
+    
+    def test_exports_are_keyed_by_weights(self, tmp_path):
+        """Test that different weights with the same file name get their own export"""
+        def yolo(weights):
+            # Like ultralytics, export next to the weights
+            def export(format, imgsz, dynamic):
+                exported = Path(weights).with_suffix('.onnx')
+                exported.write_bytes(Path(weights).read_bytes())
+                return str(exported)
+            return Mock(export=export)
+        
+        cache_dir = tmp_path / "models"
+        artifacts = []
+        with patch('ultralytics.YOLO', side_effect=yolo) as mock_yolo:
+            for run in ('a', 'b'):
+                weights = tmp_path / run / "best.pt"
+                weights.parent.mkdir()
+                weights.write_bytes(run.encode())
+                artifacts.append(export_model(str(weights), 'onnx', cache_dir=cache_dir))
+            assert export_model(str(weights), 'onnx', cache_dir=cache_dir) == artifacts[1]
+        
+        assert artifacts[1].name == f"best_640_{cache_key(tmp_path / 'b' / 'best.pt', 640)}.onnx"
+        assert [artifact.read_bytes() for artifact in artifacts] == [b'a', b'b']
+        assert sorted(cache_dir.iterdir()) == sorted(artifacts)
+        # Exported from private copies, never next to the shared weights
+        assert mock_yolo.call_count == 2
+        assert not list(tmp_path.glob('*/best.onnx'))
+    
+    def test_concurrent_exports(self, tmp_path):
+        """Test that processes exporting the same weights at once all load a whole artifact"""
+        pytest.importorskip('onnxruntime')
+        from concurrent.futures import ProcessPoolExecutor
+        import multiprocessing
+        
+        weights = tmp_path / "yolov8n.pt"
+        weights.write_bytes(Path('yolov8n.pt').read_bytes())
+        with ProcessPoolExecutor(3, mp_context=multiprocessing.get_context('spawn')) as pool:
+            loads = [pool.submit(load_names, str(weights), 'onnx', cache_dir=tmp_path / "models")
+                     for _ in range(3)]
+            assert all(load.result(timeout=300) for load in loads)
+        
+        assert [p.name for p in (tmp_path / "models").iterdir()] == [
+            f"yolov8n_640_{cache_key(weights, 640)}.onnx"]
+
+class TestTorchScriptCache:
+    
+    def test_cache_key_covers_weights_size_and_versions(self, tmp_path):
+        """Test that the key changes with the weights, the input size and the library versions"""
+        weights = tmp_path / "model.pt"
+        weights.write_bytes(b"weights")
+        key = cache_key(weights, 640)
+        
+        assert cache_key(weights, 640) == key
+        assert cache_key(weights, 320) != key
+        with patch('backends.version', return_value='0.0'):
+            assert cache_key(weights, 640) != key
+        weights.write_bytes(b"retrained")
+        assert cache_key(weights, 640) != key
+    
+    def test_torchscript_matches_torch(self, tmp_path):
+        """Test that the traced model reproduces the torch results and is loaded from the cache"""
+        from ultralytics import YOLO
+        
+        frame = np.random.default_rng(0).integers(0, 255, (640, 640, 3), dtype=np.uint8)
+        model = load_backend('yolov8n.pt', 'torchscript', cache_dir=tmp_path)
+        torch_results = YOLO('yolov8n.pt')(frame, verbose=False, conf=0.0001, max_det=10)[0]
+        traced_results = model(frame, conf=0.0001, max_det=10)[0]
+        
+        np.testing.assert_allclose(boxes_to_array(traced_results.boxes),
+                                   boxes_to_array(torch_results.boxes), atol=1e-2)
+        assert model.names == YOLO('yolov8n.pt').names
+        
+        artifact, = tmp_path.iterdir()
+        assert artifact.name == f"yolov8n_640_{cache_key('yolov8n.pt', 640)}.torchscript"
+        with patch('ultralytics.YOLO') as mock_yolo:
+            load_backend('yolov8n.pt', 'torchscript', cache_dir=tmp_path)
+        mock_yolo.assert_not_called()
+    
+    def test_each_input_size_is_traced_and_invalidated(self, tmp_path, sample_frame):
+        """Test that other input sizes get their own artifact and library upgrades trace afresh"""
+        model = load_backend('yolov8n.pt', 'torchscript', imgsz=320, cache_dir=tmp_path)
+        assert len(model([sample_frame, sample_frame], imgsz=256)) == 2
+        assert sorted(p.name.split('_')[1] for p in tmp_path.iterdir()) == ['256', '320']
+        
+        with patch('backends.version', return_value='0.0'):
+            load_backend('yolov8n.pt', 'torchscript', imgsz=320, cache_dir=tmp_path)
+        artifacts = sorted(p.name for p in tmp_path.iterdir())
+        assert len(artifacts) == 3
+        assert f"yolov8n_320_{cache_key('yolov8n.pt', 320)}.torchscript" in artifacts
+
+class TestMappedWeights:
+    
+    def test_mapped_model_matches_torch(self, tmp_path):
+        """Test that weights mapped from the .npy store reproduce the torch results"""
+        from ultralytics import YOLO
+        
+        frame = np.random.default_rng(0).integers(0, 255, (640, 640, 3), dtype=np.uint8)
+        model = MappedTorchModel('yolov8n.pt', cache_dir=tmp_path)
+        torch_results = YOLO('yolov8n.pt')(frame, verbose=False, conf=0.0001, max_det=10)[0]
+        mapped_results = model([frame, frame], conf=0.0001, max_det=10)[0]
+        
+        np.testing.assert_allclose(boxes_to_array(mapped_results.boxes),
+                                   boxes_to_array(torch_results.boxes), atol=1e-2)
+        assert model.names == YOLO('yolov8n.pt').names
+    
+    def test_weights_are_mapped_from_the_store(self, tmp_path):
+        """Test that parameters live in file mappings of the store, which is written once"""
+        store = export_weights('yolov8n.pt', cache_dir=tmp_path)
+        assert store.name == f"yolov8n_{cache_key('yolov8n.pt')}_weights"
+        
+        with patch('ultralytics.YOLO') as mock_yolo:
+            model = MappedTorchModel('yolov8n.pt', cache_dir=tmp_path)
+        mock_yolo.assert_not_called()
+        
+        maps = Path('/proc/self/maps')
+        if maps.exists():
+            mapped = {line.split()[-1] for line in maps.read_text().splitlines() if str(store) in line}
+            assert len(mapped) == len(list(store.glob('*.npy')))
+        assert not any(p.requires_grad for p in model.model.parameters())
+    
+    def test_other_stores_are_left_alone(self, tmp_path):
+        """Test that writing a store never removes another one, which a process may be reading"""
+        others = ["yolov8n_0123456789abcdef_weights", "yolov8n_finetuned_0123456789abcdef_weights"]
+        for name in others:
+            (tmp_path / name).mkdir()
+        
+        store = export_weights('yolov8n.pt', cache_dir=tmp_path)
+        
+        assert sorted(p.name for p in tmp_path.iterdir()) == sorted([store.name, *others])
+    
+    def test_detector_option(self, tmp_path):
+        """Test that mmap_weights loads a MappedTorchModel and needs the torch backend"""
+        from detector import ObjectDetector
+        
+        with patch('detector.MappedTorchModel') as mock_model:
+            detector = ObjectDetector('yolov8n.pt', mmap_weights=True)
+        assert detector.model is mock_model.return_value
+        with pytest.raises(ValueError, match="torch backend"):
+            ObjectDetector('yolov8n.pt', backend='onnx', mmap_weights=True)
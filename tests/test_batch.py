@@ -0,0 +1,96 @@
+import pytest
+import json
+import sys
+from pathlib import Path
+from unittest.mock import Mock, patch
+import cv2
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from batch import plan_shards, process_shard, run_batch, shard_path, parse_args, main
+from detector import FrameDetections, DETECTION_DTYPE
+
+def write_video(path, count):
+    """MJPG video whose frame i has every pixel set to i"""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), 10, (64, 48))
+    for i in range(count):
+        writer.write(np.full((48, 64, 3), i * 10, dtype=np.uint8))
+    writer.release()
+    return path
+
+@pytest.fixture
+def mock_detector():
+    """Detector that returns empty detections for every frame of a batch"""
+    detector = Mock()
+    empty = FrameDetections(np.zeros(0, dtype=DETECTION_DTYPE), {})
+    detector.detect_batch.side_effect = lambda frames: [empty for _ in frames]
+    return detector
+
+class TestBatch:
+    
+    def test_plan_shards(self, tmp_path):
+        """Test that videos are split into frame ranges"""
+        video = write_video(tmp_path / "clip.avi", 25)
+        
+        assert plan_shards([video], chunk_size=10) == [
+            (str(video), 0, 10), (str(video), 10, 20), (str(video), 20, 25)]
+    
+    def test_process_shard_batches_frames(self, tmp_path, mock_detector):
+        """Test batched forward passes and ordered records for one range"""
+        video = write_video(tmp_path / "clip.avi", 25)
+        shard = (str(video), 10, 20)
+        
+        _, frames = process_shard(shard, tmp_path / "out", batch_size=4, detector=mock_detector)
+        
+        assert frames == 10
+        assert [len(c.args[0]) for c in mock_detector.detect_batch.call_args_list] == [4, 4, 2]
+        first_frame = mock_detector.detect_batch.call_args_list[0].args[0][0]
+        assert abs(int(first_frame[0, 0, 0]) - 100) <= 2  # Seeked to frame 10
+        records = [json.loads(line) for line in shard_path(tmp_path / "out", shard).read_text().splitlines()]
+        assert [r['frame'] for r in records] == list(range(10, 20))
+        assert records[0]['timestamp'] == pytest.approx(1.0)
+    
+    def test_resumes_finished_work(self, tmp_path, mock_detector):
+        """Test that finished videos and shards are not processed again"""
+        done = write_video(tmp_path / "done.avi", 5)
+        partial = write_video(tmp_path / "partial.avi", 20)
+        output = tmp_path / "out"
+        output.mkdir()
+        (output / "done.ndjson").write_text("finished earlier\n")
+        first_shard = shard_path(output, (str(partial), 0, 10))
+        first_shard.parent.mkdir()
+        first_shard.write_text("first shard\n")
+        
+        with patch('detector.ObjectDetector', return_value=mock_detector):
+            merged = run_batch([done, partial], output, workers=1, batch_size=8, chunk_size=10)
+        
+        assert merged == [output / "partial.ndjson"]
+        lines = merged[0].read_text().splitlines()
+        assert lines[0] == "first shard"
+        assert [json.loads(line)['frame'] for line in lines[1:]] == list(range(10, 20))
+        assert (output / "done.ndjson").read_text() == "finished earlier\n"
+        assert not (output / "partial").exists()
+    
+    def test_worker_pool(self, tmp_path):
+        """Test an end-to-end run across worker processes with the real model"""
+        videos = [write_video(tmp_path / f"clip{i}.avi", 6) for i in range(2)]
+        
+        merged = main(parse_args([str(v) for v in videos] + [
+            '--output', str(tmp_path / "out"), '--workers', '2', '--chunk-size', '4', '--batch-size', '3']))
+        
+        for path in merged:
+            frames = [json.loads(line)['frame'] for line in path.read_text().splitlines()]
+            assert frames == list(range(6))
+    
+    def test_backend_is_prepared_before_the_pool(self, tmp_path):
+        """Test that the model is exported once in the parent rather than by every worker"""
+        video = write_video(tmp_path / "clip.avi", 2)
+        
+        with patch('batch.prepare_backend') as mock_prepare, \
+                patch('batch.ProcessPoolExecutor', side_effect=RuntimeError("no pool")):
+            with pytest.raises(RuntimeError):
+                run_batch([str(video)], tmp_path / "out", workers=2, backend='onnx')
+        
+        mock_prepare.assert_called_once_with('yolov8n.pt', 'onnx', mmap_weights=False)
@@ -0,0 +1,113 @@
+import pytest
+import json
+import sys
+from pathlib import Path
+from unittest.mock import Mock, patch
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from benchmark import peak_rss_bytes, run_benchmark, parse_args, main, STAGES
+from detector import FrameDetections, DETECTION_DTYPE
+from frame_sources import synthetic_frames
+
+@pytest.fixture
+def mock_detector():
+    """Detector that returns one close person for every frame"""
+    detections = np.zeros(1, dtype=DETECTION_DTYPE)
+    detections['distance'] = 2
+    detector = Mock()
+    detector.detect.return_value = FrameDetections(detections, {0: 'person'})
+    detector.get_detections_list.return_value = [{'label': 'person', 'confidence': 0.9, 'distance': 'close'}]
+    return detector
+
+class TestBenchmark:
+    
+    def test_peak_rss_is_positive(self):
+        """Test that peak RSS is reported in bytes"""
+        assert peak_rss_bytes() > 1024 * 1024
+    
+    def test_run_benchmark_reports_every_stage(self, mock_detector):
+        """Test that each main-loop stage is timed for every measured frame"""
+        report = run_benchmark(mock_detector, synthetic_frames(8, 160, 120), warmup=3)
+        
+        assert report['frames'] == 5
+        assert report['fps'] > 0
+        assert set(report['stages']) == set(STAGES)
+        assert all(report['stages'][stage]['count'] == 5 for stage in STAGES)
+        assert mock_detector.detect.call_count == 8
+        assert report['inferred'] == 5 and report['inference_skipped'] == 0
+        assert 'allocations' not in report
+    
+    def test_tracking_skips_inference(self, sample_frame):
+        """Test that --detect-every style tracking is benchmarked, not plain per-frame inference"""
+        from backends import NumpyBoxes, NumpyResults
+        from detector import ObjectDetector
+        names = {0: 'person'}
+        model = Mock(names=names, return_value=[NumpyResults(NumpyBoxes(np.array(
+            [[100, 100, 300, 300, 0.9, 0]], dtype=np.float32)), (480, 640), names)])
+        detector = ObjectDetector(model=model, detect_interval=3)
+        
+        report = run_benchmark(detector, [sample_frame] * 7, warmup=1)
+        
+        assert report['frames'] == 6
+        assert report['inferred'] == 2 and report['inference_skipped'] == 4
+        assert model.call_count == 3
+    
+    def test_run_benchmark_traces_allocations(self, mock_detector):
+        """Test that allocation stats are reported when tracing"""
+        report = run_benchmark(mock_detector, synthetic_frames(4, 160, 120), warmup=0,
+                               trace_allocations=True)
+        
+        assert report['allocations']['peak_bytes_per_frame'] >= 0
+        assert 'net_blocks_per_frame' in report['allocations']
+    
+    def test_source_is_required(self):
+        """Test that a frame source must be given"""
+        with pytest.raises(SystemExit):
+            parse_args([])
+    
+    def test_main_writes_json_report(self, tmp_path, mock_detector):
+        """Test the command line entry point with synthetic frames"""
+        output = tmp_path / 'report.json'
+        args = parse_args(['--synthetic', '4', '--size', '160x120', '--warmup', '1',
+                           '--detect-every', '2', '--output', str(output)])
+        
+        with patch('benchmark.build_detector', return_value=mock_detector):
+            main(args)
+        
+        report = json.loads(output.read_text())
+        assert report['frames'] == 4
+        assert report['config']['source'] == 'synthetic:4@160x120'
+        assert report['config']['detect_every'] == 2
+    
+    @pytest.mark.parametrize('source', ['synthetic', 'images'])
+    def test_limit_counts_measured_frames(self, tmp_path, mock_detector, source):
+        """Test that --limit caps the measured frames, after warm-up, for every source"""
+        if source == 'synthetic':
+            options = ['--synthetic', '20', '--size', '160x120']
+        else:
+            import cv2
+            for i, frame in enumerate(synthetic_frames(20, 160, 120)):
+                cv2.imwrite(str(tmp_path / f"{i:02d}.png"), frame)
+            options = ['--images', str(tmp_path)]
+        
+        with patch('benchmark.build_detector', return_value=mock_detector):
+            report = main(parse_args(options + ['--limit', '10', '--warmup', '5',
+                                                '--output', str(tmp_path / 'report.json')]))
+        
+        assert report['frames'] == 10
+        assert mock_detector.detect.call_count == 15
+    
+    def test_main_with_image_directory(self, tmp_path, capsys):
+        """Test an end-to-end run with the real model over recorded images"""
+        import cv2
+        for i, frame in enumerate(synthetic_frames(3, 320, 240)):
+            cv2.imwrite(str(tmp_path / f"{i}.png"), frame)
+        
+        main(parse_args(['--images', str(tmp_path), '--warmup', '1']))
+        
+        report = json.loads(capsys.readouterr().out.split('Model loaded successfully!\n')[-1])
+        assert report['frames'] == 2
+        assert report['stages']['inference']['p95_ms'] > 0
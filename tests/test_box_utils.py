@@ -0,0 +1,89 @@
+import pytest
+import sys
+from pathlib import Path
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from box_utils import box_iou, nms, batched_nms, clip_region, plan_tiles, merge_tile_boxes
+
+class TestBoxIoU:
+    
+    def test_identical_and_disjoint_boxes(self):
+        """Test IoU of identical boxes is 1 and of disjoint boxes is 0"""
+        iou = box_iou([[0, 0, 10, 10]], [[0, 0, 10, 10], [20, 20, 30, 30]])
+        np.testing.assert_allclose(iou, [[1.0, 0.0]])
+    
+    def test_partial_overlap(self):
+        """Test IoU of half-overlapping boxes"""
+        iou = box_iou([[0, 0, 10, 10]], [[5, 0, 15, 10]])
+        np.testing.assert_allclose(iou, [[50 / 150]])
+    
+    def test_empty_inputs(self):
+        """Test that empty inputs produce an empty matrix"""
+        assert box_iou(np.zeros((0, 4)), [[0, 0, 1, 1]]).shape == (0, 1)
+
+class TestNMS:
+    
+    def test_overlapping_boxes_are_suppressed(self):
+        """Test that the lower scoring of two overlapping boxes is dropped"""
+        boxes = [[0, 0, 10, 10], [1, 1, 11, 11], [50, 50, 60, 60]]
+        keep = nms(boxes, np.array([0.8, 0.9, 0.7]), iou_threshold=0.5)
+        
+        assert keep.tolist() == [1, 2]
+    
+    def test_low_overlap_boxes_are_kept(self):
+        """Test that boxes under the IoU threshold survive"""
+        boxes = [[0, 0, 10, 10], [5, 0, 15, 10]]
+        keep = nms(boxes, np.array([0.9, 0.8]), iou_threshold=0.5)
+        
+        assert keep.tolist() == [0, 1]
+    
+    def test_batched_nms_keeps_other_classes(self):
+        """Test that boxes of different classes never suppress each other"""
+        boxes = [[0, 0, 10, 10], [0, 0, 10, 10], [0, 0, 10, 10]]
+        keep = batched_nms(boxes, np.array([0.9, 0.8, 0.7]), np.array([0, 1, 0]), iou_threshold=0.5)
+        
+        assert sorted(keep.tolist()) == [0, 1]
+    
+    def test_empty_input(self):
+        """Test NMS on no boxes"""
+        assert batched_nms(np.zeros((0, 4)), np.zeros(0), np.zeros(0), 0.5).tolist() == []
+
+class TestTiling:
+    
+    def test_tiles_cover_frame_with_overlap(self):
+        """Test that equal tiles overlap and the last ones end at the frame edge"""
+        tiles = plan_tiles(1920, 1080, tile_size=640, overlap=0.2)
+        
+        assert sorted(set(tiles[:, 0].tolist())) == [0, 512, 1024, 1280]
+        assert sorted(set(tiles[:, 1].tolist())) == [0, 440]
+        assert ((tiles[:, 2] - tiles[:, 0]) == 640).all() and ((tiles[:, 3] - tiles[:, 1]) == 640).all()
+    
+    def test_small_region_is_one_tile(self):
+        """Test that a region no bigger than a tile is not split"""
+        assert plan_tiles(300, 200, tile_size=640).tolist() == [[0, 0, 300, 200]]
+        assert plan_tiles(1920, 1080, roi=(100, 50, 400, 250)).tolist() == [[100, 50, 400, 250]]
+    
+    def test_tile_settings_are_validated(self):
+        """Test that tile sizes must be positive and overlaps in [0, 1)"""
+        for tile_size, overlap in ((0, 0.2), (-640, 0.2), (640, 1.0), (640, 1.5), (640, -0.5)):
+            with pytest.raises(ValueError):
+                plan_tiles(1920, 1080, tile_size=tile_size, overlap=overlap)
+        assert len(plan_tiles(1920, 1080, tile_size=640, overlap=0)) == 6
+    
+    def test_roi_is_clipped(self):
+        """Test that a region of interest is clipped to the frame, and must not be empty"""
+        assert clip_region((-10, 20, 5000, 100), 640, 480) == (0, 20, 640, 100)
+        with pytest.raises(ValueError):
+            clip_region((700, 0, 800, 100), 640, 480)
+    
+    def test_seam_duplicates_are_merged(self):
+        """Test that the same object seen by two tiles is kept once, in frame coordinates"""
+        left = np.array([[500, 10, 640, 100, 0.9, 0]])
+        right = np.array([[-12, 10, 128, 100, 0.8, 0], [10, 10, 50, 50, 0.7, 1]])
+        
+        merged = merge_tile_boxes([left, right], [[0, 0], [512, 0]])
+        
+        np.testing.assert_allclose(merged, [[500, 10, 640, 100, 0.9, 0], [522, 10, 562, 50, 0.7, 1]], rtol=1e-6)
@@ -0,0 +1,187 @@
+import pytest
+import sys
+import time
+from pathlib import Path
+from unittest.mock import Mock
+import cv2
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from backends import NumpyBoxes, NumpyResults
+from capture import (FileCamera, TimestampedCapture, captured_at, configure_capture,
+                     latency_report, observe_latency, stamp)
+from detector import ObjectDetector
+from metrics import Metrics
+
+@pytest.fixture
+def video_path(tmp_path):
+    """Short MJPG video with ten frames at 20 fps"""
+    path = tmp_path / "clip.avi"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), 20, (64, 48))
+    for i in range(10):
+        writer.write(np.full((48, 64, 3), i * 20, dtype=np.uint8))
+    writer.release()
+    return path
+
+class StubModel:
+    """Model that finds nothing after a fixed delay"""
+    
+    names = {0: 'person'}
+    
+    def __call__(self, frames, verbose=False, imgsz=None, **options):
+        time.sleep(0.02)
+        return [NumpyResults(NumpyBoxes(np.empty((0, 6), np.float32)), frame.shape[:2], self.names)
+                for frame in frames]
+
+class TestStamps:
+    
+    def test_stamp_survives_copies_and_views(self):
+        """Test that the capture time travels with copies, slices and reads into buffers"""
+        frame = stamp(np.zeros((48, 64, 3), dtype=np.uint8), 12.5)
+        
+        assert captured_at(frame.copy()) == 12.5
+        assert captured_at(frame[10:20]) == 12.5
+        assert captured_at(np.zeros(3)) is None
+    
+    def test_observe_latency(self):
+        """Test that only stamped frames are observed, and only with metrics"""
+        metrics = Metrics()
+        observe_latency(metrics, 'capture_to_detection', stamp(np.zeros(3), time.perf_counter() - 0.05))
+        observe_latency(metrics, 'capture_to_detection', np.zeros(3))
+        observe_latency(None, 'capture_to_detection', stamp(np.zeros(3), 0.0))
+        
+        stage = metrics.snapshot()['stages']['capture_to_detection']
+        assert stage['count'] == 1
+        assert stage['p50_ms'] >= 50
+        assert latency_report(metrics)[0].startswith("Capture to detection: p50")
+        assert latency_report(Metrics()) == []
+
+class TestTimestampedCapture:
+    
+    def test_frames_are_stamped_in_order(self, video_path):
+        """Test that frames from a real capture carry increasing capture times"""
+        cap = TimestampedCapture(cv2.VideoCapture(str(video_path)))
+        before = time.perf_counter()
+        
+        stamps = []
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            stamps.append(captured_at(frame))
+        cap.release()
+        
+        assert len(stamps) == 10
+        assert before <= stamps[0] and stamps == sorted(stamps)
+    
+    def test_drain_skips_buffered_frames(self):
+        """Test that frames already waiting are grabbed without decoding"""
+        cap = Mock()
+        cap.grab.return_value = True
+        cap.retrieve.return_value = (True, np.zeros((48, 64, 3), dtype=np.uint8))
+        
+        capture = TimestampedCapture(cap, drain=2)
+        ret, frame = capture.read()
+        
+        assert ret and captured_at(frame) is not None
+        assert cap.grab.call_count == 3
+        assert cap.retrieve.call_count == 1
+        assert capture.drained == 2
+    
+    def test_drain_stops_at_a_fresh_frame(self):
+        """Test that a grab that had to wait for the camera ends the drain"""
+        cap = Mock()
+        cap.retrieve.return_value = (True, np.zeros((48, 64, 3), dtype=np.uint8))
+        # The first grab returns a buffered frame, the second waits for a new one
+        waits = iter([0, 0.02])
+        cap.grab.side_effect = lambda: (time.sleep(next(waits)), True)[1]
+        
+        capture = TimestampedCapture(cap, drain=5, drain_wait=0.01)
+        assert capture.read()[0]
+        
+        assert cap.grab.call_count == 2
+        assert capture.drained == 0
+    
+    def test_failed_read(self):
+        """Test that end of stream is passed through"""
+        cap = Mock()
+        cap.read.return_value = (False, None)
+        assert TimestampedCapture(cap).read() == (False, None)
+        cap.grab.return_value = False
+        assert TimestampedCapture(cap, drain=1).read() == (False, None)
+    
+    def test_delegates_to_capture(self):
+        """Test that other VideoCapture methods reach the wrapped capture"""
+        cap = Mock()
+        cap.isOpened.return_value = True
+        capture = TimestampedCapture(cap)
+        
+        assert capture.isOpened()
+        capture.release()
+        cap.release.assert_called_once()
+
+class TestConfigureCapture:
+    
+    def test_requests_and_reports_settings(self):
+        """Test that low-latency settings are requested and the driver's answer returned"""
+        values = {}
+        cap = Mock()
+        cap.set.side_effect = lambda prop, value: values.__setitem__(prop, value) or True
+        # The driver rounds the frame rate down
+        cap.get.side_effect = lambda prop: 15.0 if prop == cv2.CAP_PROP_FPS else values.get(prop, 0)
+        
+        settings = configure_capture(cap, 1280, 720, 30)
+        
+        assert cap.set.call_args_list[0][0] == (cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+        assert settings == {'fourcc': 'MJPG', 'width': 1280, 'height': 720, 'fps': 15.0, 'buffer_size': 1}
+    
+    def test_unset_options_are_left_alone(self):
+        """Test that only the requested properties are set"""
+        cap = Mock()
+        cap.get.return_value = 0
+        configure_capture(cap, fourcc=None, buffer_size=None)
+        cap.set.assert_not_called()
+
+class TestFileCamera:
+    
+    def test_playback_is_paced(self, video_path):
+        """Test that frames are not handed out faster than the file's frame rate"""
+        camera = FileCamera(video_path)
+        start = time.perf_counter()
+        for _ in range(4):
+            assert camera.read()[0]
+        
+        # The first frame is immediate, then one every 50 ms
+        assert time.perf_counter() - start >= 0.14
+        assert camera.skipped == 0
+    
+    def test_slow_reader_skips_frames(self, video_path):
+        """Test that frames missed while the reader was busy are dropped"""
+        camera = FileCamera(video_path, fps=100)
+        ret, first = camera.read()
+        time.sleep(0.045)
+        ret, frame = camera.read()
+        
+        assert ret and camera.skipped >= 3
+        assert int(frame[0, 0, 0]) > int(first[0, 0, 0]) + 60
+
+class TestCaptureToDetection:
+    
+    def test_detections_carry_capture_time(self, video_path):
+        """Test end to end latency from a paced source through a slow detector"""
+        cap = TimestampedCapture(FileCamera(video_path))
+        detector = ObjectDetector(model=StubModel())
+        metrics = Metrics()
+        
+        for _ in range(3):
+            ret, frame = cap.read()
+            detections = detector.detect(frame)
+            observe_latency(metrics, 'capture_to_detection', frame)
+            assert detections.captured_at == captured_at(frame)
+        
+        stage = metrics.snapshot()['stages']['capture_to_detection']
+        assert stage['count'] == 3
+        assert stage['p50_ms'] >= 20
+        assert detector.detect_batch([frame])[0].captured_at == captured_at(frame)
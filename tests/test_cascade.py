@@ -0,0 +1,157 @@
+import pytest
+import sys
+from pathlib import Path
+from unittest.mock import Mock
+import cv2
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from backends import NumpyBoxes, NumpyResults
+from cascade import RefinementCascade, merge_refined
+from detector import ObjectDetector
+
+NAMES = {0: 'person', 1: 'car', 2: 'dog'}
+
+def box_model(*rows, names=NAMES):
+    """Model stand-in returning the same (x1, y1, x2, y2, conf, cls) rows for every frame"""
+    data = np.array(rows, dtype=np.float32).reshape(-1, 6)
+    return Mock(names=names, side_effect=lambda source, **options: [
+        NumpyResults(NumpyBoxes(data), source.shape[:2], names)])
+
+class TestMergeRefined:
+    
+    def test_relabels_overlapping_boxes(self, make_detections):
+        """Test that matched boxes keep their position and take the refined class and confidence"""
+        fresh = make_detections([(100, 100, 400, 400, 0.55, 0, 3), (500, 10, 520, 30, 0.8, 1, 4)])
+        refined = make_detections([(110, 105, 405, 400, 0.9, 2)])
+        
+        merged, source = merge_refined(fresh, refined)
+        
+        assert merged['class_id'].tolist() == [2, 1]
+        assert merged['confidence'][0] == pytest.approx(0.9)
+        assert merged['box'][0].tolist() == [100, 100, 400, 400]
+        assert merged['track_id'].tolist() == [3, 4]
+        assert source.tolist() == [0, -1]
+    
+    def test_moved_objects_are_not_duplicated(self, make_detections):
+        """Test that refined boxes matching nothing are not added at their old position"""
+        # The object moved on since the refined frame, overlapping its old box by IoU < 0.5
+        fresh = make_detections([(250, 100, 550, 400, 0.55, 0)])
+        refined = make_detections([(100, 100, 400, 400, 0.9, 2), (10, 10, 40, 40, 0.7, 1)])
+        
+        merged, source = merge_refined(fresh, refined)
+        assert merged['class_id'].tolist() == [0]
+        assert source.tolist() == [-1]
+        
+        merged, source = merge_refined(fresh[:0], refined)
+        assert len(merged) == 0 and len(source) == 0
+
+class TestRefinementCascade:
+    
+    @pytest.fixture
+    def accurate(self):
+        # The same close object, recognized as a dog, and a far car the fast model missed
+        return ObjectDetector(model=box_model([105, 100, 400, 400, 0.9, 2], [10, 10, 40, 40, 0.7, 1]))
+    
+    def fast_detector(self, accurate, *rows, **options):
+        cascade = RefinementCascade(accurate, **options)
+        return ObjectDetector(model=box_model(*rows), cascade=cascade)
+    
+    def test_unsure_close_object_is_refined(self, accurate, sample_frame):
+        """Test that a close object below uncertain_below is refined and merged into later frames"""
+        detector = self.fast_detector(accurate, [100, 100, 400, 400, 0.55, 0])
+        
+        assert detector.detect(sample_frame).labels == ['person']
+        detector.cascade.wait(5)
+        refined = detector.detect(sample_frame)
+        
+        assert refined.labels == ['dog']
+        assert refined.boxes[0].tolist() == [100, 100, 400, 400]
+        assert detector.cascade.counts == {'low_confidence': 1, 'new_track': 0, 'requested': 0}
+        detector.cascade.close()
+    
+    def test_sure_or_far_objects_are_not_refined(self, accurate, sample_frame):
+        """Test that confident close objects and unsure far ones leave the larger model idle"""
+        detector = self.fast_detector(accurate, [100, 100, 400, 400, 0.8, 0], [0, 0, 50, 50, 0.55, 1])
+        
+        for _ in range(3):
+            assert detector.detect(sample_frame).labels == ['person', 'car']
+        
+        assert sum(detector.cascade.counts.values()) == 0
+        accurate.model.assert_not_called()
+    
+    def test_min_interval_and_max_age(self, accurate, sample_frame):
+        """Test that triggers wait for min_interval and refined results expire after max_age"""
+        detector = self.fast_detector(accurate, [100, 100, 400, 400, 0.55, 0], min_interval=60, max_age=0)
+        
+        for _ in range(3):
+            detector.detect(sample_frame)
+            detector.cascade.wait(5)
+        
+        assert detector.cascade.counts['low_confidence'] == 1
+        assert detector.detect(sample_frame).labels == ['person']
+    
+    def test_request_describes_the_scene(self, accurate, sample_frame):
+        """Test that request() refines the next frame and resolves with the refined detections"""
+        detector = self.fast_detector(accurate, [100, 100, 400, 400, 0.9, 0])
+        description = detector.cascade.request()
+        
+        detector.detect(sample_frame)
+        
+        assert description.result(5).labels == ['dog', 'car']
+        assert detector.cascade.counts['requested'] == 1
+    
+    def test_tracks_keep_refined_labels(self, accurate, sample_frame):
+        """Test that new tracks are refined once and keep the result for as long as they live"""
+        cascade = RefinementCascade(accurate, max_age=0)
+        detector = ObjectDetector(model=box_model([100, 100, 400, 400, 0.9, 0]), track=True, cascade=cascade)
+        
+        detector.detect(sample_frame)
+        cascade.wait(5)
+        cascade.max_age = 60
+        assert detector.detect(sample_frame).labels == ['dog']
+        cascade.max_age = 0
+        
+        for _ in range(3):
+            assert detector.detect(sample_frame).labels == ['dog']
+        assert cascade.counts['new_track'] == 1
+    
+    def test_failed_request(self, sample_frame):
+        """Test that a failing larger model fails the requested description"""
+        accurate = ObjectDetector(model=Mock(names=NAMES, side_effect=RuntimeError("out of memory")))
+        detector = self.fast_detector(accurate, [100, 100, 400, 400, 0.9, 0])
+        description = detector.cascade.request()
+        
+        assert detector.detect(sample_frame).labels == ['person']
+        
+        with pytest.raises(RuntimeError):
+            description.result(5)
+    
+    def test_models_must_share_classes(self, accurate):
+        """Test that the cascade's model has to use the same class ids"""
+        with pytest.raises(ValueError):
+            ObjectDetector(model=box_model(names={0: 'cat'}), cascade=RefinementCascade(accurate))
+    
+    def test_warm_up_runs_in_the_background(self, accurate, sample_frame):
+        """Test that warming up the fast model also warms up the larger one"""
+        detector = self.fast_detector(accurate)
+        
+        detector.warm_up()
+        detector.cascade.wait(5)
+        
+        accurate.model.assert_called_once()
+    
+    def test_real_models(self, sample_image_path):
+        """Test a cascade of real models"""
+        frame = cv2.imread(sample_image_path)
+        cascade = RefinementCascade(ObjectDetector('yolov8n.pt', confidence_threshold=0.01))
+        detector = ObjectDetector('yolov8n.pt', cascade=cascade)
+        description = cascade.request()
+        
+        detector.detect(frame)
+        
+        assert len(description.result(60)) == len(cascade.detector.detect(frame))
+        assert 'requested 1' in cascade.summary()
+        cascade.close()
@@ -0,0 +1,94 @@
+import pytest
+import io
+import json
+import socket
+import sys
+import threading
+from pathlib import Path
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from detection_output import DetectionWriter, detection_record, open_writer
+from detector import FrameDetections, DETECTION_DTYPE
+
+@pytest.fixture
+def frame_detections():
+    """One tracked close person"""
+    detections = np.zeros(1, dtype=DETECTION_DTYPE)
+    detections['box'] = [10, 20, 310, 420]
+    detections['confidence'] = 0.875
+    detections['distance'] = 2
+    detections['track_id'] = 4
+    return FrameDetections(detections, {0: 'person'}, inferred=False)
+
+class TestDetectionRecord:
+    
+    def test_record_fields(self, frame_detections):
+        """Test that a record carries frame info and plain-data detections"""
+        record = detection_record(7, frame_detections, timestamp=1.5)
+        
+        assert record == {
+            'frame': 7,
+            'timestamp': 1.5,
+            'inferred': False,
+            'detections': [{'label': 'person', 'confidence': 0.875, 'distance': 'close',
+                            'class_id': 0, 'box': [10, 20, 310, 420], 'track_id': 4}],
+        }
+
+class TestDetectionWriter:
+    
+    def test_ndjson_writes_one_line_per_record(self, frame_detections):
+        """Test newline-delimited JSON output"""
+        stream = io.BytesIO()
+        writer = DetectionWriter(stream)
+        writer.write(detection_record(0, frame_detections))
+        writer.write(detection_record(1, frame_detections))
+        
+        lines = stream.getvalue().decode().splitlines()
+        assert [json.loads(line)['frame'] for line in lines] == [0, 1]
+    
+    def test_msgpack_stream(self, frame_detections):
+        """Test that msgpack records can be unpacked one after another"""
+        msgpack = pytest.importorskip('msgpack')
+        stream = io.BytesIO()
+        writer = DetectionWriter(stream, 'msgpack')
+        writer.write(detection_record(0, frame_detections))
+        writer.write(detection_record(1, frame_detections))
+        
+        records = list(msgpack.Unpacker(io.BytesIO(stream.getvalue())))
+        assert [r['frame'] for r in records] == [0, 1]
+    
+    def test_unknown_format(self):
+        """Test that an unknown format is rejected"""
+        with pytest.raises(ValueError):
+            DetectionWriter(io.BytesIO(), 'xml')
+    
+    def test_unix_socket(self, frame_detections, tmp_path):
+        """Test sending records to a listening Unix socket"""
+        path = tmp_path / 'detections.sock'
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(str(path))
+        server.listen(1)
+        received = []
+        
+        def accept():
+            conn, _ = server.accept()
+            with conn, conn.makefile('rb') as reader:
+                received.extend(json.loads(line) for line in reader)
+        
+        thread = threading.Thread(target=accept)
+        thread.start()
+        writer = open_writer('ndjson', path)
+        writer.write(detection_record(3, frame_detections))
+        writer.close()
+        thread.join(timeout=1)
+        server.close()
+        
+        assert [r['frame'] for r in received] == [3]
+    
+    def test_missing_socket(self, tmp_path):
+        """Test that a socket nobody listens on fails to open"""
+        with pytest.raises(OSError):
+            open_writer('ndjson', tmp_path / 'missing.sock')
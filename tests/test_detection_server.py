@@ -0,0 +1,227 @@
+import pytest
+import sys
+import threading
+from pathlib import Path
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from backends import NumpyBoxes, NumpyResults
+from detection_server import DetectionServer, DetectionClient, RemoteModel, parse_args
+
+BOXES = np.array([[100, 100, 400, 400, 0.9, 0],
+                  [10, 10, 20, 20, 0.3, 1]], dtype=np.float32)
+
+class StubModel:
+    """Model that records each forward pass and returns the same boxes for every frame"""
+    
+    names = {0: 'person', 1: 'car'}
+    
+    def __init__(self, error=None):
+        self.calls = []
+        self.options = []
+        self.error = error
+    
+    def __call__(self, frames, verbose=False, imgsz=None, **options):
+        self.calls.append((len(frames), imgsz))
+        self.options.append(options)
+        if self.error:
+            raise self.error
+        return [NumpyResults(NumpyBoxes(BOXES), frame.shape[:2], self.names) for frame in frames]
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return tmp_path / "detect.sock"
+
+@pytest.fixture
+def serve(socket_path):
+    servers = []
+    
+    def start(model, **kwargs):
+        server = DetectionServer(model, socket_path, **kwargs).start()
+        servers.append(server)
+        return server
+    
+    yield start
+    for server in servers:
+        server.stop()
+
+@pytest.fixture
+def frame():
+    return np.zeros((48, 64, 3), dtype=np.uint8)
+
+class TestDetectionServer:
+    
+    def test_concurrent_clients_share_a_batch(self, serve, socket_path, frame):
+        """Test that frames arriving within max_wait run in one forward pass"""
+        model = StubModel()
+        server = serve(model, max_batch=8, max_wait=0.2)
+        clients = [DetectionClient(socket_path) for _ in range(4)]
+        results = [None] * len(clients)
+        
+        def detect(i):
+            results[i] = clients[i].get_detections_list(clients[i].detect(frame))
+        
+        threads = [threading.Thread(target=detect, args=(i,)) for i in range(len(clients))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert model.calls == [(4, None)]
+        assert server.batches == 1 and server.frames == 4
+        for result in results:
+            assert [d['label'] for d in result] == ['person']
+        for client in clients:
+            client.close()
+    
+    def test_batches_are_capped(self, serve, socket_path, frame):
+        """Test that a request larger than max_batch is split across passes"""
+        model = StubModel()
+        serve(model, max_batch=2, max_wait=0.05)
+        client = DetectionClient(socket_path)
+        
+        batch = client.detect_batch([frame] * 5)
+        
+        assert len(batch) == 5
+        assert sum(size for size, _ in model.calls) == 5
+        assert max(size for size, _ in model.calls) <= 2
+        client.close()
+    
+    def test_inference_sizes_run_separately(self, serve, frame):
+        """Test that requests for different input sizes are not mixed in one pass"""
+        model = StubModel()
+        server = serve(model, max_wait=0.05)
+        futures = [server.submit(frame, 320), server.submit(frame), server.submit(frame, 320)]
+        
+        assert all(len(future.result(timeout=5)) == 2 for future in futures)
+        assert sorted(model.calls, key=str) == sorted([(2, 320), (1, None)], key=str)
+    
+    def test_model_options_split_batches(self, serve, frame):
+        """Test that frames with different model options run in separate passes"""
+        model = StubModel()
+        server = serve(model, max_wait=0.05)
+        futures = [server.submit(frame, options={'conf': 0.25}), server.submit(frame, options={'conf': 0.5}),
+                   server.submit(frame, options={'conf': 0.25})]
+        
+        assert all(len(future.result(timeout=5)) == 2 for future in futures)
+        assert sorted(size for size, _ in model.calls) == [1, 2]
+        assert sorted(options['conf'] for options in model.options) == [0.25, 0.5]
+    
+    def test_model_errors_reach_the_client(self, serve, socket_path, frame):
+        """Test that a failed forward pass raises in the client and keeps the connection"""
+        model = StubModel(error=RuntimeError("out of memory"))
+        serve(model)
+        remote = RemoteModel(socket_path)
+        
+        with pytest.raises(RuntimeError, match="out of memory"):
+            remote(frame)
+        model.error = None
+        assert len(remote(frame)[0].boxes) == 2
+        remote.close()
+    
+    def test_only_model_options_are_accepted(self, serve, socket_path, frame):
+        """Test that clients cannot make the shared model save files or change its device"""
+        model = StubModel()
+        serve(model)
+        remote = RemoteModel(socket_path)
+        
+        for options in ({'save': True, 'project': '/tmp/out'}, {'device': 'cpu', 'half': True}):
+            with pytest.raises(RuntimeError, match="Unsupported model options"):
+                remote(frame, **options)
+        with pytest.raises(RuntimeError, match="Invalid input size"):
+            remote(frame, imgsz='640')
+        
+        assert model.calls == []
+        assert len(remote(frame, conf=0.3, classes=[0])[0].boxes) == 2
+        remote.close()
+    
+    def test_malformed_header(self, serve, socket_path):
+        """Test that a request without shapes gets an error reply and the server keeps serving"""
+        import socket
+        from detection_server import recv_header, send_message
+        serve(StubModel())
+        
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(5)
+            sock.connect(str(socket_path))
+            recv_header(sock)
+            send_message(sock, {'imgsz': None})
+            assert 'shapes' in recv_header(sock)['error']
+        
+        remote = RemoteModel(socket_path)
+        assert remote.names == StubModel.names
+        remote.close()
+    
+    def test_stop_removes_socket(self, serve, socket_path):
+        """Test that the socket file is replaced on start and removed on stop"""
+        server = serve(StubModel())
+        assert socket_path.exists()
+        server.stop()
+        assert not socket_path.exists()
+        
+        # A leftover socket from an unclean shutdown does not block a restart
+        server.start()
+        server._listener.close()
+        server._listener = None
+        assert socket_path.exists()
+        serve(StubModel())
+        assert socket_path.exists()
+
+class TestDetectionClient:
+    
+    def test_drop_in_for_object_detector(self, serve, socket_path, frame):
+        """Test the ObjectDetector API on results computed by the server"""
+        serve(StubModel())
+        client = DetectionClient(socket_path, confidence_threshold=0.2)
+        
+        assert client.model.names == {0: 'person', 1: 'car'}
+        results = client.detect_objects(frame)
+        assert results.orig_shape == frame.shape[:2]
+        np.testing.assert_allclose(results.boxes.data, BOXES)
+        detections = client.get_detections_list(results)
+        assert [d['label'] for d in detections] == ['person', 'car']
+        assert [d['distance'] for d in detections] == ['close', 'far']
+        assert client.draw_detections(frame.copy(), results).shape == frame.shape
+        client.close()
+    
+    def test_thresholds_reach_the_server_model(self, serve, socket_path, frame):
+        """Test that confidence, IoU, max detections and classes are sent with each request"""
+        model = StubModel()
+        serve(model)
+        client = DetectionClient(socket_path, confidence_threshold=0.4, iou_threshold=0.5, max_detections=20,
+                                 classes=['car'], class_confidence={'car': 0.2})
+        
+        detections = client.detect(frame)
+        
+        assert model.options == [{'conf': 0.2, 'iou': 0.5, 'max_det': 20, 'classes': [1]}]
+        # The stub ignores the options; the allow-list still applies in the client
+        assert detections.labels == ['car']
+        client.close()
+    
+    def test_tracking_runs_in_the_client(self, serve, socket_path, frame):
+        """Test that detect_interval skips server round trips between model runs"""
+        model = StubModel()
+        serve(model)
+        client = DetectionClient(socket_path, detect_interval=3)
+        
+        inferred = [client.detect(frame).inferred for _ in range(3)]
+        
+        assert inferred == [True, False, False]
+        assert len(model.calls) == 1
+        client.close()
+    
+    def test_no_server(self, socket_path):
+        """Test that connecting without a running server fails loudly"""
+        with pytest.raises(OSError):
+            DetectionClient(socket_path)
+
+class TestParseArgs:
+    
+    def test_defaults(self):
+        """Test the server command line defaults"""
+        args = parse_args([])
+        assert args.max_batch == 8
+        assert args.max_wait == 5.0
+        assert args.model == 'yolov8n.pt'
@@ -8,7 +8,10 @@ from unittest.mock import Mock, patch
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from detector import ObjectDetector
+from detector import ObjectDetector, FrameDetections
+from backends import NumpyBoxes, NumpyResults
+from box_utils import plan_tiles
+from tracker import IoUTracker
 
 class TestObjectDetector:
     
@@ -159,7 +162,7 @@ class TestObjectDetector:
                 assert isinstance(detection['label'], str)
                 assert isinstance(detection['confidence'], float)
                 assert detection['distance'] in ['close', 'medium', 'far']
-
+    
     def test_draw_detections_with_high_confidence(self):
         """Test drawing detections with objects above confidence threshold"""
         detector = ObjectDetector('yolov8n.pt')
@@ -200,7 +203,7 @@ class TestObjectDetector:
         # Annotated frame should exist and have same dimensions
         assert annotated_frame.shape == original_frame.shape
         assert isinstance(annotated_frame, np.ndarray)
-
+    
     def test_draw_detections_with_real_image(self):
         """Test drawing with a real image that triggers high-confidence detections"""
         detector = ObjectDetector('yolov8n.pt')
@@ -225,7 +228,7 @@ class TestObjectDetector:
         # Even if no detections, the code path executes
         # Check that we at least iterated through boxes
         assert hasattr(results, 'boxes')
-
+        
         class MockBox:
             def __init__(self, coords, conf, cls_id):
                 self.xyxy = [coords]
@@ -261,3 +264,362 @@ class TestObjectDetector:
         # Check that some pixels changed (drawing happened)
         # Coverage already achieved, just verify function completes
         assert True
+
+@pytest.fixture(scope='module')
+def detector():
+    return ObjectDetector('yolov8n.pt')
+
+class TestVectorizedPostProcessing:
+    
+    def test_boxes_to_array_uses_bulk_data(self):
+        """Test conversion of a real Boxes object in one transfer"""
+        import torch
+        from ultralytics.engine.results import Boxes
+        from detector import boxes_to_array
+        
+        boxes = Boxes(torch.tensor([[10.7, 20.2, 110.9, 220.5, 0.9, 2.0],
+                                    [0.0, 0.0, 5.0, 5.0, 0.3, 0.0]]), (480, 640))
+        data = boxes_to_array(boxes)
+        
+        assert data.shape == (2, 6)
+        assert data.dtype == np.float32
+        np.testing.assert_allclose(data[0], [10.7, 20.2, 110.9, 220.5, 0.9, 2.0], rtol=1e-6)
+    
+    def test_boxes_to_array_drops_track_id_column(self):
+        """Test that tracked boxes (with an id column) keep conf and cls"""
+        from detector import boxes_to_array
+        
+        class TrackedBoxes:
+            data = np.array([[1, 2, 3, 4, 7, 0.8, 5]], dtype=np.float32)
+        
+        data = boxes_to_array(TrackedBoxes())
+        np.testing.assert_allclose(data[0], [1, 2, 3, 4, 0.8, 5])
+    
+    def test_get_detections_array_fields(self, detector):
+        """Test that the structured array holds boxes, areas and distance buckets"""
+        from detector import DETECTION_DTYPE, DISTANCE_LABELS
+        
+        class MockResults:
+            class boxes:
+                data = np.array([
+                    [100.9, 100, 400, 400, 0.9, 0],   # 299x300 -> close
+                    [0, 0, 200, 100, 0.8, 1],         # exactly 20,000 -> far
+                    [0, 0, 250, 200, 0.7, 2],         # exactly 50,000 -> medium
+                    [0, 0, 10, 10, 0.2, 3],           # below threshold
+                ], dtype=np.float32)
+        
+        detections = detector.get_detections_array(MockResults())
+        
+        assert detections.dtype == DETECTION_DTYPE
+        assert len(detections) == 3
+        assert detections['box'][0].tolist() == [100, 100, 400, 400]
+        assert detections['area'].tolist() == [90000, 20000, 50000]
+        assert [DISTANCE_LABELS[d] for d in detections['distance']] == ['close', 'far', 'medium']
+        assert detections['class_id'].tolist() == [0, 1, 2]
+    
+    def test_get_detections_array_empty(self, detector):
+        """Test that empty results produce an empty array and list"""
+        class MockResults:
+            boxes = []
+        
+        assert len(detector.get_detections_array(MockResults())) == 0
+        assert detector.get_detections_list(MockResults()) == []
+    
+    def test_detections_list_matches_array(self, detector, mock_detections):
+        """Test that the dict list is a view of the structured array"""
+        detections = detector.get_detections_list(mock_detections)
+        
+        assert [d['label'] for d in detections] == [detector.model.names[0], detector.model.names[56]]
+        # 200x200 = 40,000 pixels -> medium, 50x50 -> far
+        assert [d['distance'] for d in detections] == ['medium', 'far']
+        assert all(isinstance(d['confidence'], float) for d in detections)
+
+class TestFrameDetections:
+    
+    def test_detect_returns_frame_detections(self, detector, sample_frame):
+        """Test that detect parses model output into FrameDetections"""
+        from detector import FrameDetections
+        
+        detections = detector.detect(sample_frame)
+        
+        assert isinstance(detections, FrameDetections)
+        assert len(detections.labels) == len(detections)
+        assert all(c > detector.confidence_threshold for c in detections.confidences)
+    
+    def test_parse_detections_applies_detector_threshold(self, detector, mock_detections):
+        """Test that the threshold lives on the detector and is applied once"""
+        detections = detector.parse_detections(mock_detections)
+        
+        assert len(detections) == 2
+        assert detections.class_ids.tolist() == [0, 56]
+        assert detections.labels == [detector.model.names[0], detector.model.names[56]]
+        # Parsing again is a no-op
+        assert detector.parse_detections(detections) is detections
+    
+    def test_consumers_share_parsed_detections(self, detector, mock_detections):
+        """Test that drawing and announcements read the same parsed detections"""
+        detections = detector.parse_detections(mock_detections)
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        
+        annotated = detector.draw_detections(frame, detections)
+        
+        assert np.any(annotated > 0)
+        assert detector.get_detections_list(detections) == detections.to_list()
+        assert detector.get_detections_list(mock_detections) == detections.to_list()
+    
+    def test_stricter_threshold_filters_parsed_detections(self, detector, mock_detections):
+        """Test that a higher threshold filters already parsed detections"""
+        detections = detector.parse_detections(mock_detections)
+        
+        strict = detector.get_detections_list(detections, confidence_threshold=0.8)
+        assert [d['confidence'] > 0.8 for d in strict] == [True]
+    
+    def test_lower_threshold_on_raw_results(self, detector, mock_detections):
+        """Test that raw results can still be parsed with a looser threshold"""
+        detections = detector.get_detections_list(mock_detections, confidence_threshold=0.4)
+        assert len(detections) == 3
+
+class TestTrackingMode:
+    
+    @pytest.fixture
+    def tracking_detector(self, detector):
+        detector.detect_interval = 3
+        detector.tracker = IoUTracker()
+        detector._frames_since_inference = 0
+        yield detector
+        detector.detect_interval = 1
+        detector.tracker = None
+    
+    def test_model_runs_every_n_frames(self, tracking_detector, mock_detections, sample_frame):
+        """Test that inference only runs every detect_interval frames"""
+        with patch.object(tracking_detector, 'detect_objects', return_value=mock_detections) as mock_detect:
+            frames = [tracking_detector.detect(sample_frame) for _ in range(6)]
+        
+        assert mock_detect.call_count == 2
+        assert [f.inferred for f in frames] == [True, False, False, True, False, False]
+    
+    def test_tracked_detections_keep_shape(self, tracking_detector, mock_detections, sample_frame):
+        """Test that tracked frames produce the same detections list as inferred ones"""
+        with patch.object(tracking_detector, 'detect_objects', return_value=mock_detections):
+            inferred = tracking_detector.detect(sample_frame)
+            tracked = tracking_detector.detect(sample_frame)
+        
+        assert tracked.track_ids.tolist() == inferred.track_ids.tolist()
+        assert [d['label'] for d in tracking_detector.get_detections_list(tracked)] == \
+            [d['label'] for d in tracking_detector.get_detections_list(inferred)]
+        assert set(tracked.to_list()[0]) == {'label', 'confidence', 'distance'}
+    
+    def test_low_track_confidence_forces_inference(self, tracking_detector, mock_detections, sample_frame):
+        """Test that the model reruns once a track would fade below the threshold"""
+        tracking_detector.tracker.confidence_decay = 0.7
+        with patch.object(tracking_detector, 'detect_objects', return_value=mock_detections) as mock_detect:
+            tracking_detector.detect(sample_frame)
+            tracking_detector.detect(sample_frame)
+        
+        # 0.65 * 0.7 < 0.5, so the second frame runs the model again
+        assert mock_detect.call_count == 2
+
+class TestMotionGatedDetection:
+    
+    @pytest.fixture
+    def gated_detector(self, detector):
+        from motion_gate import MotionGate
+        detector.motion_gate = MotionGate()
+        detector._last_detections = None
+        yield detector
+        detector.motion_gate = None
+    
+    def test_static_frames_reuse_last_detections(self, gated_detector, mock_detections, sample_frame):
+        """Test that the model is skipped while the scene is unchanged"""
+        with patch.object(gated_detector, 'detect_objects', return_value=mock_detections) as mock_detect:
+            first = gated_detector.detect(sample_frame)
+            second = gated_detector.detect(sample_frame.copy())
+        
+        assert mock_detect.call_count == 1
+        assert first.inferred and not second.inferred
+        assert second.to_list() == first.to_list()
+    
+    def test_motion_reruns_model(self, gated_detector, mock_detections, sample_frame):
+        """Test that a changed scene goes back to the model"""
+        moved = np.full_like(sample_frame, 255)
+        with patch.object(gated_detector, 'detect_objects', return_value=mock_detections) as mock_detect:
+            gated_detector.detect(sample_frame)
+            gated_detector.detect(moved)
+        
+        assert mock_detect.call_count == 2
+
+class TestDetectBatch:
+    
+    def test_one_forward_pass_for_all_frames(self, detector, mock_detections, sample_frame):
+        """Test that a batch is one model call with one parsed result per frame"""
+        with patch.object(detector, 'model', return_value=[mock_detections, mock_detections]) as mock_model:
+            mock_model.names = {0: 'person', 56: 'chair'}
+            batch = detector.detect_batch([sample_frame, sample_frame])
+        
+        mock_model.assert_called_once()
+        assert len(mock_model.call_args.args[0]) == 2
+        assert [len(detections) for detections in batch] == [2, 2]
+        assert batch[0].labels == ['person', 'chair']
+    
+    def test_empty_batch_skips_model(self, detector):
+        """Test that no frames means no model call"""
+        with patch.object(detector, 'model') as mock_model:
+            assert detector.detect_batch([]) == []
+        mock_model.assert_not_called()
+    
+    def test_mixed_frame_sizes(self, detector, sample_frame):
+        """Test a real batch of frames from differently sized sources"""
+        small = cv2.resize(sample_frame, (320, 240))
+        batch = detector.detect_batch([sample_frame, small])
+        
+        assert len(batch) == 2
+        assert all(isinstance(detections, FrameDetections) for detections in batch)
+
+class TestTiledInference:
+    
+    def test_tiles_run_in_one_batch(self, sample_frame):
+        """Test that tiles and the whole frame share one model call and map back to the frame"""
+        detector = ObjectDetector('yolov8n.pt', tile_size=320, tile_overlap=0.25)
+        crops = []
+        
+        def model(sources, verbose=False, **options):
+            crops.extend(sources)
+            # Every tile sees one object in its top-left corner
+            return [NumpyResults(NumpyBoxes(np.array([[0, 0, 40, 40, 0.9, 0]], np.float32)),
+                                 crop.shape[:2], detector.model.names) for crop in sources]
+        
+        with patch.object(detector, 'model', side_effect=model) as mock_model:
+            mock_model.names = {0: 'person'}
+            detections = detector.parse_detections(detector.detect_objects(sample_frame))
+        
+        mock_model.assert_called_once()
+        height, width = sample_frame.shape[:2]
+        tiles = plan_tiles(width, height, 320, 0.25)
+        assert len(crops) == len(tiles) + 1
+        assert crops[-1].shape == sample_frame.shape
+        # The tile at the origin and the whole frame report the same box
+        assert sorted(detections.boxes[:, :2].tolist()) == sorted(tiles[:, :2].tolist())
+    
+    def test_roi_crops_the_frame(self, sample_frame):
+        """Test that a region of interest is the only part of the frame detected on"""
+        detector = ObjectDetector('yolov8n.pt', roi=(100, 50, 300, 250))
+        
+        with patch.object(detector, 'model', return_value=[
+                NumpyResults(NumpyBoxes(np.array([[10, 20, 110, 120, 0.9, 0]], np.float32)), (200, 200), {})
+        ]) as mock_model:
+            mock_model.names = {0: 'person'}
+            detections = detector.parse_detections(detector.detect_objects(sample_frame))
+        
+        assert mock_model.call_args.args[0][0].shape[:2] == (200, 200)
+        assert detections.boxes.tolist() == [[110, 70, 210, 170]]
+    
+    def test_real_model_batch(self, sample_frame):
+        """Test tiled detection of several frames with the real model"""
+        detector = ObjectDetector('yolov8n.pt', tile_size=256)
+        batch = detector.detect_batch([sample_frame, sample_frame])
+        
+        assert len(batch) == 2
+        assert all(isinstance(detections, FrameDetections) for detections in batch)
+
+class TestWarmUp:
+    
+    def test_warm_up_runs_model_without_state(self):
+        """Test that warm-up runs one blank frame and leaves tracking and resolution alone"""
+        detector = ObjectDetector(model=Mock(names={0: 'person'}), detect_interval=3, latency_target=0.05)
+        detector.model.return_value = [NumpyResults(NumpyBoxes(np.empty((0, 6), np.float32)),
+                                                    (480, 640), {0: 'person'})]
+        
+        assert detector.warm_up() >= 0
+        
+        frame = detector.model.call_args.args[0]
+        assert frame.shape == (480, 640, 3) and not frame.any()
+        assert detector.resolution is not None and not detector.resolution._latencies
+        assert detector._frames_since_inference == 0 and detector._last_detections is None
+    
+    def test_import_does_not_load_ultralytics(self):
+        """Test that torch and ultralytics are only imported when a model is loaded"""
+        import subprocess
+        code = "import sys; import main; print('ultralytics' in sys.modules, 'torch' in sys.modules)"
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                cwd=Path(__file__).parent.parent / "src")
+        assert result.stdout.split() == ['False', 'False']
+
+class TestInferenceOptions:
+    
+    @pytest.fixture
+    def model(self):
+        model = Mock(names={0: 'person', 1: 'car', 2: 'dog'})
+        model.return_value = [NumpyResults(NumpyBoxes(np.array([
+            [0, 0, 10, 10, 0.5, 0],     # person below its own 0.6 threshold
+            [0, 0, 20, 20, 0.7, 0],
+            [0, 0, 30, 30, 0.3, 1],     # car above its own 0.2 threshold
+            [0, 0, 40, 40, 0.9, 2],     # dog is not in the allow-list
+        ], dtype=np.float32)), (480, 640), {0: 'person', 1: 'car', 2: 'dog'})]
+        return model
+    
+    def test_thresholds_reach_the_model(self, model, sample_frame):
+        """Test that NMS settings and the allow-list are passed to the model"""
+        detector = ObjectDetector(model=model, confidence_threshold=0.4, iou_threshold=0.5, max_detections=10,
+                                  classes=['person', '1'], class_confidence={'car': 0.2, 'person': 0.6})
+        
+        detector.detect_objects(sample_frame)
+        
+        # The lowest threshold in use, so per-class overrides can still accept boxes
+        assert model.call_args.kwargs == {'verbose': False, 'conf': 0.2, 'iou': 0.5, 'max_det': 10,
+                                          'classes': [0, 1]}
+    
+    def test_per_class_thresholds(self, model, sample_frame):
+        """Test that each class is held to its own threshold and the allow-list"""
+        detector = ObjectDetector(model=model, confidence_threshold=0.4, classes=['person', 'car'],
+                                  class_confidence={'car': 0.2, 'person': 0.6})
+        
+        detections = detector.detect(sample_frame)
+        
+        assert detections.labels == ['person', 'car']
+        assert detections.confidences.tolist() == pytest.approx([0.7, 0.3])
+        # An explicit threshold applies to every class alike
+        explicit = detector.parse_detections(detector.detect_objects(sample_frame), 0.4)
+        assert explicit.labels == ['person', 'person', 'dog']
+    
+    def test_defaults_use_one_threshold(self, model, sample_frame):
+        """Test that without overrides the model gets the detector threshold and every class"""
+        detector = ObjectDetector(model=model)
+        
+        assert detector.class_thresholds is None
+        assert detector.detect(sample_frame).labels == ['person', 'dog']
+        assert model.call_args.kwargs == {'verbose': False, 'conf': 0.5, 'iou': 0.7, 'max_det': 300}
+    
+    def test_tracks_are_held_to_their_class_threshold(self, sample_frame):
+        """Test that tracks carry forward and fade out against their own class's threshold"""
+        names = {0: 'person', 1: 'car'}
+        model = Mock(names=names, return_value=[NumpyResults(NumpyBoxes(np.array([
+            [0, 0, 50, 50, 0.35, 0],       # person above its own 0.3 threshold
+            [100, 100, 200, 200, 0.85, 1],  # car above its own 0.82 threshold
+        ], dtype=np.float32)), (480, 640), names)])
+        
+        detector = ObjectDetector(model=model, detect_interval=5, class_confidence={'person': 0.3})
+        for _ in range(10):
+            detector.detect(sample_frame)
+        # Not on every frame for being below the global 0.5: only when the person
+        # would fade below 0.3 (after three decays of 0.95) or detect_interval is up
+        assert model.call_count == 3
+        
+        detector = ObjectDetector(model=model, detect_interval=5, class_confidence={'person': 0.3, 'car': 0.82})
+        frames = [detector.detect(sample_frame) for _ in range(4)]
+        # 0.85 * 0.95 would fall below the car's 0.82, so the model reruns instead of drawing it
+        assert [f.inferred for f in frames] == [True, True, True, True]
+        assert all(f.labels == ['person', 'car'] for f in frames)
+    
+    def test_unknown_class(self, model):
+        """Test that allow-list and overrides only accept known classes"""
+        with pytest.raises(ValueError, match="Unknown class 'cat'"):
+            ObjectDetector(model=model, classes=['cat'])
+        with pytest.raises(ValueError, match="Unknown class '7'"):
+            ObjectDetector(model=model, class_confidence={7: 0.3})
+    
+    def test_real_model_allow_list(self, sample_image_path):
+        """Test that the real model only returns allowed classes"""
+        detector = ObjectDetector('yolov8n.pt', confidence_threshold=0.01, classes=[0])
+        detections = detector.detect(cv2.imread(sample_image_path))
+        
+        assert set(detections.class_ids.tolist()) <= {0}
@@ -0,0 +1,64 @@
+import pytest
+import sys
+from pathlib import Path
+import cv2
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from frame_sources import read_frames, synthetic_frames
+
+@pytest.fixture
+def image_dir(tmp_path):
+    """Directory of three numbered images plus a non-image file"""
+    for i in range(3):
+        cv2.imwrite(str(tmp_path / f"frame_{i}.png"), np.full((48, 64, 3), i * 50, dtype=np.uint8))
+    (tmp_path / "notes.txt").write_text("not an image")
+    return tmp_path
+
+@pytest.fixture
+def video_path(tmp_path):
+    """Short MJPG video with five frames"""
+    path = tmp_path / "clip.avi"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), 10, (64, 48))
+    for i in range(5):
+        writer.write(np.full((48, 64, 3), i * 40, dtype=np.uint8))
+    writer.release()
+    return path
+
+class TestReadFrames:
+    
+    def test_reads_image_directory_in_order(self, image_dir):
+        """Test that images are read sorted by name and other files skipped"""
+        frames = list(read_frames(image_dir))
+        
+        assert len(frames) == 3
+        assert [int(f[0, 0, 0]) for f in frames] == [0, 50, 100]
+    
+    def test_reads_video_file(self, video_path):
+        """Test that all frames of a video are read"""
+        frames = list(read_frames(video_path))
+        
+        assert len(frames) == 5
+        assert frames[0].shape == (48, 64, 3)
+    
+    def test_limit(self, image_dir, video_path):
+        """Test that limit caps the number of frames"""
+        assert len(list(read_frames(image_dir, limit=2))) == 2
+        assert len(list(read_frames(video_path, limit=2))) == 2
+    
+    def test_missing_source_yields_nothing(self, tmp_path):
+        """Test that an unreadable source produces no frames"""
+        assert list(read_frames(tmp_path / "missing.mp4")) == []
+
+class TestSyntheticFrames:
+    
+    def test_frames_are_reproducible(self):
+        """Test that synthetic frames are deterministic and move"""
+        first = list(synthetic_frames(3, 160, 120))
+        second = list(synthetic_frames(3, 160, 120))
+        
+        assert first[0].shape == (120, 160, 3)
+        assert all(np.array_equal(a, b) for a, b in zip(first, second))
+        assert not np.array_equal(first[0], first[1])
@@ -1,4 +1,5 @@
 import pytest
+import json
 import sys
 from pathlib import Path
 from unittest.mock import Mock, patch, MagicMock, call
@@ -79,3 +80,590 @@ class TestMainCompleteCoverage:
         # (if we import it, __name__ != "__main__", so line 70 doesn't run)
         # This test passing means the module structure is correct
         assert True
+
+class TestMainPipelineMode:
+    
+    def test_parse_args_defaults(self):
+        """Test that the sequential loop is the default"""
+        import main
+        args = main.parse_args([])
+        assert not args.pipeline
+        assert main.parse_args(['--pipeline']).pipeline
+    
+    @patch('main.ObjectDetector')
+    @patch('main.AudioFeedback')
+    @patch('cv2.VideoCapture')
+    @patch('cv2.imshow')
+    @patch('cv2.waitKey')
+    @patch('cv2.destroyAllWindows')
+    def test_pipeline_mode_displays_and_announces(self, mock_destroy, mock_waitkey, mock_imshow,
+                                                  mock_cap, mock_audio_cls, mock_detector_cls):
+        """Test that pipeline mode draws results, announces and cleans up"""
+        mock_detector = Mock()
+        mock_detector_cls.return_value = mock_detector
+        mock_detector.detect.return_value = Mock()
+        mock_detector.draw_detections.side_effect = lambda frame, results: frame
+        mock_detector.get_detections_list.return_value = [
+            {'label': 'person', 'confidence': 0.9, 'distance': 'close'}
+        ]
+        mock_audio = Mock()
+        mock_audio_cls.return_value = mock_audio
+        
+        mock_video = Mock()
+        mock_video.isOpened.return_value = True
+        mock_video.read.return_value = (True, np.zeros((480, 640, 3), dtype=np.uint8))
+        mock_cap.return_value = mock_video
+        
+        # Keep running until something has been announced, then quit
+        mock_waitkey.side_effect = lambda delay: ord('q') if mock_audio.announce_detections.called else 255
+        
+        import main
+        with patch('main.time.monotonic', side_effect=[0] + [10] * 10000):
+            main.main(main.parse_args(['--pipeline']))
+        
+        mock_audio.announce_detections.assert_called()
+        mock_detector.draw_detections.assert_called()
+        mock_audio.close.assert_called_once()
+        mock_video.release.assert_called_once()
+        mock_destroy.assert_called_once()
+    
+    @patch('main.ObjectDetector')
+    @patch('main.AudioFeedback')
+    @patch('cv2.VideoCapture')
+    @patch('cv2.imshow')
+    @patch('cv2.waitKey', return_value=ord('s'))
+    @patch('cv2.destroyAllWindows')
+    def test_pipeline_mode_exits_when_capture_ends(self, mock_destroy, mock_waitkey, mock_imshow,
+                                                   mock_cap, mock_audio_cls, mock_detector_cls):
+        """Test that pipeline mode stops when the camera stops delivering frames"""
+        mock_video = Mock()
+        mock_video.isOpened.return_value = True
+        mock_video.read.side_effect = [(True, np.zeros((480, 640, 3), dtype=np.uint8))] * 3 + [(False, None)] * 100
+        mock_cap.return_value = mock_video
+        
+        import main
+        main.main(main.parse_args(['--pipeline']))
+        
+        mock_video.release.assert_called_once()
+
+class TestMainMetrics:
+    
+    @patch('main.ObjectDetector')
+    @patch('main.AudioFeedback')
+    @patch('cv2.VideoCapture')
+    @patch('cv2.imshow')
+    @patch('cv2.waitKey', side_effect=[255, 255, ord('q')])
+    @patch('cv2.destroyAllWindows')
+    def test_metrics_file_and_hud(self, mock_destroy, mock_waitkey, mock_imshow,
+                                  mock_cap, mock_audio_cls, mock_detector_cls, tmp_path):
+        """Test that stage timings are exported on exit and drawn as a HUD"""
+        mock_detector = Mock()
+        mock_detector_cls.return_value = mock_detector
+        mock_detector.detect.return_value = Mock(inferred=False)
+        mock_detector.draw_detections.side_effect = lambda frame, results: frame
+        mock_detector.get_detections_list.return_value = []
+        
+        mock_video = Mock()
+        mock_video.isOpened.return_value = True
+        mock_video.read.return_value = (True, np.zeros((480, 640, 3), dtype=np.uint8))
+        mock_cap.return_value = mock_video
+        
+        import main
+        path = tmp_path / 'metrics.json'
+        with patch('main.draw_hud', wraps=main.draw_hud) as mock_hud:
+            main.main(main.parse_args(['--metrics', str(path), '--hud']))
+        
+        snapshot = json.loads(path.read_text())
+        assert snapshot['stages']['inference']['count'] == 3
+        assert snapshot['stages']['frame']['count'] == 3
+        assert snapshot['counters']['inference_skipped'] == 3
+        assert mock_hud.call_count == 3
+        assert mock_audio_cls.call_args.kwargs['metrics'] is not None
+
+class TestMainHeadless:
+    
+    @pytest.fixture
+    def video_path(self, tmp_path):
+        """Short video file standing in for the camera"""
+        path = tmp_path / "clip.avi"
+        writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), 10, (64, 48))
+        for i in range(4):
+            writer.write(np.full((48, 64, 3), i * 40, dtype=np.uint8))
+        writer.release()
+        return path
+    
+    @pytest.fixture
+    def mock_detector(self):
+        from detector import FrameDetections, DETECTION_DTYPE
+        detections = np.zeros(1, dtype=DETECTION_DTYPE)
+        detections['box'] = [1, 2, 30, 40]
+        detector = Mock()
+        detector.detect.return_value = FrameDetections(detections, {0: 'person'})
+        return detector
+    
+    def test_source_option(self):
+        """Test that device indexes open a camera and anything else a file or URL"""
+        import main
+        with patch('cv2.VideoCapture') as mock_cap:
+            main.open_source('1')
+            main.open_source('rtsp://camera/stream')
+        assert [c.args[0] for c in mock_cap.call_args_list] == [1, 'rtsp://camera/stream']
+    
+    @patch('main.AudioFeedback')
+    @patch('cv2.imshow')
+    @patch('cv2.waitKey')
+    def test_headless_writes_ndjson_per_frame(self, mock_waitkey, mock_imshow, mock_audio_cls,
+                                              video_path, mock_detector, capsysbinary):
+        """Test that headless mode reads the file and writes one record per frame"""
+        import main
+        with patch('main.build_detector', return_value=mock_detector):
+            main.main(main.parse_args(['--headless', '--source', str(video_path)]))
+        
+        out, err = capsysbinary.readouterr()
+        records = [json.loads(line) for line in out.decode().splitlines()]
+        assert [r['frame'] for r in records] == [0, 1, 2, 3]
+        assert records[0]['detections'][0]['box'] == [1, 2, 30, 40]
+        assert b"Processed 4 frames" in err
+        mock_imshow.assert_not_called()
+        mock_waitkey.assert_not_called()
+        mock_audio_cls.assert_not_called()
+        mock_detector.draw_detections.assert_not_called()
+    
+    def test_headless_max_frames(self, video_path, mock_detector, capsysbinary):
+        """Test that --max-frames stops early"""
+        import main
+        with patch('main.build_detector', return_value=mock_detector):
+            main.main(main.parse_args(['--headless', '--source', str(video_path), '--max-frames', '2']))
+        
+        assert len(capsysbinary.readouterr().out.splitlines()) == 2
+    
+    def test_headless_missing_source(self, tmp_path, mock_detector, capsysbinary):
+        """Test that an unreadable source is reported on stderr"""
+        import main
+        with patch('main.build_detector', return_value=mock_detector):
+            main.main(main.parse_args(['--headless', '--source', str(tmp_path / 'missing.mp4')]))
+        
+        out, err = capsysbinary.readouterr()
+        assert out == b''
+        assert b"Could not open video source" in err
+    
+    def test_headless_stops_on_closed_reader(self, video_path, mock_detector):
+        """Test that a reader closing the pipe ends the run quietly"""
+        import main
+        writer = Mock()
+        writer.write.side_effect = BrokenPipeError
+        with patch('main.build_detector', return_value=mock_detector), \
+                patch('main.open_writer', return_value=writer):
+            main.main(main.parse_args(['--headless', '--source', str(video_path)]))
+        
+        assert writer.write.call_count == 1
+
+class TestMainMultiSource:
+    
+    @patch('main.ObjectDetector')
+    @patch('main.AudioFeedback')
+    @patch('cv2.VideoCapture')
+    @patch('cv2.imshow')
+    @patch('cv2.waitKey')
+    @patch('cv2.destroyAllWindows')
+    def test_sources_share_one_batch(self, mock_destroy, mock_waitkey, mock_imshow,
+                                     mock_cap, mock_audio_cls, mock_detector_cls):
+        """Test batched detection, per-source windows and a combined announcement"""
+        mock_detector = Mock()
+        mock_detector_cls.return_value = mock_detector
+        mock_detector.detect_batch.side_effect = lambda frames: [Mock() for _ in frames]
+        mock_detector.draw_detections.side_effect = lambda frame, detections: frame
+        mock_detector.get_detections_list.return_value = [
+            {'label': 'person', 'confidence': 0.9, 'distance': 'close'}
+        ]
+        mock_audio = Mock()
+        mock_audio_cls.return_value = mock_audio
+        
+        videos = []
+        for value in (1, 2):
+            video = Mock()
+            video.isOpened.return_value = True
+            video.read.return_value = (True, np.full((48, 64, 3), value, dtype=np.uint8))
+            videos.append(video)
+        mock_cap.side_effect = videos
+        mock_waitkey.side_effect = lambda delay: ord('q') if mock_audio.announce_sources.called else 255
+        
+        import main
+        with patch('main.time.monotonic', side_effect=[0] + [10] * 10000):
+            main.main(main.parse_args(['--sources', '0', 'clip.mp4']))
+        
+        assert [c.args[0] for c in mock_cap.call_args_list] == [0, 'clip.mp4']
+        assert max(len(c.args[0]) for c in mock_detector.detect_batch.call_args_list) <= 2
+        windows = {c.args[0] for c in mock_imshow.call_args_list}
+        assert windows <= {"Vision Assistant - Camera 1", "Vision Assistant - Camera 2"}
+        names = [name for name, _ in mock_audio.announce_sources.call_args.args[0]]
+        assert set(names) <= {"Camera 1", "Camera 2"} and names
+        for video in videos:
+            video.release.assert_called_once()
+    
+    @patch('main.ObjectDetector')
+    @patch('main.AudioFeedback')
+    @patch('cv2.VideoCapture')
+    def test_unopened_source_releases_others(self, mock_cap, mock_audio_cls, mock_detector_cls):
+        """Test that one failed source stops startup and releases the rest"""
+        opened, failed = Mock(), Mock()
+        opened.isOpened.return_value = True
+        failed.isOpened.return_value = False
+        mock_cap.side_effect = [opened, failed]
+        
+        import main
+        main.main(main.parse_args(['--sources', '0', '1']))
+        
+        opened.release.assert_called_once()
+        mock_audio_cls.return_value.close.assert_called_once()
+
+class TestMainInferenceProcesses:
+    
+    @patch('main.SharedMemoryPipeline')
+    @patch('main.run_pipeline')
+    @patch('main.ObjectDetector')
+    @patch('main.AudioFeedback')
+    @patch('cv2.VideoCapture')
+    @patch('cv2.destroyAllWindows')
+    def test_processes_use_shared_memory_pipeline(self, mock_destroy, mock_cap, mock_audio_cls,
+                                                  mock_detector_cls, mock_run, mock_pipeline_cls):
+        """Test that --inference-processes runs the display loop on a SharedMemoryPipeline"""
+        mock_cap.return_value.isOpened.return_value = True
+        
+        import main
+        main.main(main.parse_args(['--inference-processes', '3', '--backend', 'onnx']))
+        
+        options, processes = mock_pipeline_cls.call_args.args[1:3]
+        assert options['backend'] == 'onnx' and options['model_name'] == 'yolov8n.pt'
+        assert processes == 3
+        pipeline = mock_pipeline_cls.return_value
+        pipeline.start.assert_called_once()
+        assert mock_run.call_args.kwargs['pipeline'] is pipeline
+        # The display process never loads a model of its own
+        mock_detector_cls.assert_called_once()
+        assert mock_detector_cls.call_args.kwargs['model'].names is pipeline.names
+    
+    def test_pipeline_stops_when_start_fails(self):
+        """Test that a pipeline failing to start is still stopped"""
+        import main
+        pipeline = Mock()
+        pipeline.start.side_effect = ValueError("Unknown backend")
+        
+        with pytest.raises(ValueError):
+            main.run_pipeline(Mock(), Mock(), Mock(), pipeline=pipeline)
+        pipeline.stop.assert_called_once()
+
+class TestMainTiling:
+    
+    @patch('main.ObjectDetector')
+    @patch('main.AudioFeedback')
+    @patch('main.run_loop')
+    @patch('cv2.VideoCapture')
+    @patch('cv2.destroyAllWindows')
+    def test_tile_options_reach_detector(self, mock_destroy, mock_cap, mock_run, mock_audio_cls,
+                                         mock_detector_cls):
+        """Test that --tile-size, --tile-overlap and --roi configure the detector"""
+        mock_cap.return_value.isOpened.return_value = True
+        
+        import main
+        main.main(main.parse_args(['--tile-size', '640', '--tile-overlap', '0.1',
+                                   '--roi', '0', '100', '1920', '900']))
+        
+        kwargs = mock_detector_cls.call_args.kwargs
+        assert kwargs['tile_size'] == 640 and kwargs['tile_overlap'] == 0.1
+        assert kwargs['roi'] == [0, 100, 1920, 900]
+    
+    @pytest.mark.parametrize('option', [['--tile-size', '0'], ['--tile-overlap', '1'], ['--tile-overlap', '-0.5']])
+    def test_invalid_tiling_is_rejected(self, option):
+        """Test that tile sizes must be positive and overlaps in [0, 1)"""
+        import main
+        with pytest.raises(SystemExit):
+            main.parse_args(option)
+
+class TestMainPhraseCache:
+    
+    @patch('main.ObjectDetector')
+    @patch('main.AudioFeedback')
+    @patch('main.run_loop')
+    @patch('cv2.VideoCapture')
+    @patch('cv2.destroyAllWindows')
+    def test_cache_sizes_reach_audio(self, mock_destroy, mock_cap, mock_run, mock_audio_cls, mock_detector_cls):
+        """Test that --phrase-cache-size and --phrase-cache-disk-size bound the phrase cache"""
+        mock_cap.return_value.isOpened.return_value = True
+        mock_detector_cls.return_value.model.names = {0: 'person'}
+        
+        import main
+        main.main(main.parse_args(['--phrase-cache', 'models/phrases', '--phrase-cache-size', '32',
+                                   '--phrase-cache-disk-size', '200']))
+        
+        kwargs = mock_audio_cls.call_args.kwargs
+        assert (kwargs['phrase_cache_size'], kwargs['phrase_cache_disk_size']) == (32, 200)
+
+class TestMainMotionGate:
+    
+    @patch('main.ObjectDetector')
+    @patch('main.AudioFeedback')
+    @patch('main.run_loop')
+    @patch('cv2.VideoCapture')
+    @patch('cv2.destroyAllWindows')
+    def test_sensitivity_options_reach_gate(self, mock_destroy, mock_cap, mock_run, mock_audio_cls,
+                                            mock_detector_cls):
+        """Test that the motion gate sensitivity can be set from the command line"""
+        mock_cap.return_value.isOpened.return_value = True
+        
+        import main
+        main.main(main.parse_args(['--motion-gate', '--motion-threshold', '0.05', '--motion-pixel-delta', '40',
+                                   '--max-reuse-age', '3']))
+        
+        gate = mock_detector_cls.call_args.kwargs['motion_gate']
+        assert (gate.min_changed_fraction, gate.pixel_delta, gate.max_reuse_age) == (0.05, 40, 3.0)
+    
+    def test_sensitivity_defaults_match_gate(self):
+        """Test that the command line defaults are the MotionGate defaults"""
+        import main
+        from motion_gate import MotionGate
+        args = main.parse_args([])
+        gate = MotionGate()
+        assert (args.motion_threshold, args.motion_pixel_delta) == (gate.min_changed_fraction, gate.pixel_delta)
+
+class TestMainThresholds:
+    
+    @patch('main.ObjectDetector')
+    @patch('main.AudioFeedback')
+    @patch('main.run_loop')
+    @patch('cv2.VideoCapture')
+    @patch('cv2.destroyAllWindows')
+    def test_threshold_options_reach_detector(self, mock_destroy, mock_cap, mock_run, mock_audio_cls,
+                                              mock_detector_cls):
+        """Test that class and threshold options configure the detector"""
+        mock_cap.return_value.isOpened.return_value = True
+        
+        import main
+        main.main(main.parse_args(['--classes', 'person', 'car', '--class-confidence', 'person=0.3',
+                                   '--confidence', '0.6', '--iou', '0.5', '--max-detections', '50']))
+        
+        kwargs = mock_detector_cls.call_args.kwargs
+        assert kwargs['classes'] == ['person', 'car']
+        assert kwargs['class_confidence'] == {'person': 0.3}
+        assert kwargs['confidence_threshold'] == 0.6
+        assert kwargs['iou_threshold'] == 0.5 and kwargs['max_detections'] == 50
+    
+    @pytest.mark.parametrize('value', ['person', 'person=high', '=0.3'])
+    def test_bad_class_confidence(self, value):
+        """Test that --class-confidence values must be CLASS=CONFIDENCE"""
+        import main
+        with pytest.raises(SystemExit):
+            main.parse_args(['--class-confidence', value])
+
+class TestMainCascade:
+    
+    @patch('main.RefinementCascade')
+    @patch('main.ObjectDetector')
+    @patch('main.AudioFeedback')
+    @patch('main.run_loop')
+    @patch('cv2.VideoCapture')
+    @patch('cv2.destroyAllWindows')
+    def test_refine_model_builds_cascade(self, mock_destroy, mock_cap, mock_run, mock_audio_cls,
+                                         mock_detector_cls, mock_cascade_cls, capsys):
+        """Test that --refine-model loads the larger model into a cascade for the fast one"""
+        mock_cap.return_value.isOpened.return_value = True
+        
+        import main
+        main.main(main.parse_args(['--refine-model', 'yolov8s.pt', '--refine-below', '0.4', '--quantize', 'dynamic',
+                                   '--backend', 'onnx']))
+        
+        accurate, fast = mock_detector_cls.call_args_list
+        assert accurate.kwargs['model_name'] == 'yolov8s.pt' and accurate.kwargs['quantization'] is None
+        assert fast.kwargs['model_name'] == 'yolov8n.pt' and fast.kwargs['quantization'] == 'dynamic'
+        assert fast.kwargs['cascade'] is mock_cascade_cls.return_value
+        assert mock_cascade_cls.call_args.kwargs == {'uncertain_below': 0.4, 'min_interval': 1.0}
+        mock_detector_cls.return_value.cascade.close.assert_called_once()
+        assert "refine model " in capsys.readouterr().out
+    
+    @pytest.mark.parametrize('mode', [['--inference-processes', '2'], ['--sources', '0', '1']])
+    def test_refine_model_needs_in_process_detection(self, mode):
+        """Test that --refine-model is rejected where the cascade would never run"""
+        import main
+        with pytest.raises(SystemExit):
+            main.parse_args(['--refine-model', 'yolov8s.pt', *mode])
+    
+    @patch('cv2.imshow')
+    @patch('cv2.waitKey', side_effect=[ord('d'), 255, ord('q')])
+    def test_describe_key_announces_refined_scene(self, mock_waitkey, mock_imshow, sample_frame):
+        """Test that D asks the larger model for the scene and announces its answer"""
+        from concurrent.futures import Future
+        import main
+        description = Future()
+        description.set_result('refined')
+        detector = Mock()
+        detector.draw_detections.side_effect = lambda frame, detections: frame
+        detector.cascade.request.return_value = description
+        detector.get_detections_list.return_value = [{'label': 'dog', 'confidence': 0.9, 'distance': 'close'}]
+        cap = Mock()
+        cap.read.return_value = (True, sample_frame)
+        audio = Mock()
+        
+        main.run_loop(cap, detector, audio)
+        
+        detector.cascade.request.assert_called_once()
+        detector.get_detections_list.assert_called_once_with('refined')
+        audio.announce_detections.assert_called_once_with(detector.get_detections_list.return_value)
+
+class TestMainServer:
+    
+    @patch('main.DetectionClient')
+    @patch('main.ObjectDetector')
+    @patch('main.AudioFeedback')
+    @patch('main.run_loop')
+    @patch('cv2.VideoCapture')
+    @patch('cv2.destroyAllWindows')
+    def test_server_replaces_local_model(self, mock_destroy, mock_cap, mock_run, mock_audio_cls,
+                                         mock_detector_cls, mock_client_cls):
+        """Test that --server connects a DetectionClient instead of loading the model"""
+        mock_cap.return_value.isOpened.return_value = True
+        
+        import main
+        main.main(main.parse_args(['--server', '/tmp/detect.sock', '--detect-every', '3']))
+        
+        mock_detector_cls.assert_not_called()
+        assert mock_client_cls.call_args.args == ('/tmp/detect.sock',)
+        assert mock_client_cls.call_args.kwargs['detect_interval'] == 3
+        assert mock_run.call_args.args[1] is mock_client_cls.return_value
+
+class TestMainCapture:
+    
+    @patch('main.ObjectDetector')
+    @patch('main.AudioFeedback')
+    @patch('main.run_loop')
+    @patch('cv2.VideoCapture')
+    @patch('cv2.destroyAllWindows')
+    def test_low_latency_configures_camera(self, mock_destroy, mock_cap, mock_run, mock_audio_cls,
+                                           mock_detector_cls, capsys):
+        """Test that --low-latency asks for MJPG and a one-frame buffer and drains stale frames"""
+        camera = mock_cap.return_value
+        camera.isOpened.return_value = True
+        camera.get.return_value = 1
+        
+        import main
+        main.main(main.parse_args(['--low-latency', '--width', '1280', '--height', '720']))
+        
+        props = {c.args[0]: c.args[1] for c in camera.set.call_args_list}
+        assert props[cv2.CAP_PROP_FOURCC] == cv2.VideoWriter_fourcc(*'MJPG')
+        assert props[cv2.CAP_PROP_BUFFERSIZE] == 1
+        assert props[cv2.CAP_PROP_FRAME_WIDTH] == 1280
+        cap = mock_run.call_args.args[0]
+        assert cap.cap is camera and cap.drain == 2
+        assert "Camera 0:" in capsys.readouterr().out
+    
+    @patch('main.ObjectDetector')
+    @patch('main.AudioFeedback')
+    @patch('main.run_loop')
+    @patch('cv2.VideoCapture')
+    @patch('cv2.destroyAllWindows')
+    def test_files_are_left_unconfigured(self, mock_destroy, mock_cap, mock_run, mock_audio_cls,
+                                         mock_detector_cls):
+        """Test that camera settings are not sent to a file and its frames are not drained"""
+        mock_cap.return_value.isOpened.return_value = True
+        
+        import main
+        main.main(main.parse_args(['--source', 'clip.mp4', '--low-latency']))
+        
+        mock_cap.return_value.set.assert_not_called()
+        assert mock_run.call_args.args[0].drain == 0
+    
+    def test_low_latency_reads_every_file_frame(self, tmp_path):
+        """Test that --low-latency does not drain unpaced files, but does drain paced ones"""
+        path = tmp_path / "clip.avi"
+        writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), 10, (64, 48))
+        for i in range(12):
+            writer.write(np.full((48, 64, 3), i * 20, dtype=np.uint8))
+        writer.release()
+        
+        import main
+        cap = main.open_capture(str(path), main.parse_args(['--low-latency']))
+        frames = 0
+        while cap.read()[0]:
+            frames += 1
+        cap.release()
+        
+        assert frames == 12
+        paced = main.open_capture(str(path), main.parse_args(['--low-latency', '--realtime']))
+        assert paced.drain == 2
+        paced.release()
+    
+    def test_headless_reports_capture_latency(self, tmp_path, capsysbinary):
+        """Test that headless mode stamps frames from a paced file and reports the latency"""
+        from detector import FrameDetections, DETECTION_DTYPE
+        path = tmp_path / "clip.avi"
+        writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), 20, (64, 48))
+        for i in range(3):
+            writer.write(np.full((48, 64, 3), i * 40, dtype=np.uint8))
+        writer.release()
+        detector = Mock()
+        detector.detect.return_value = FrameDetections(np.zeros(0, dtype=DETECTION_DTYPE), {})
+        
+        import main
+        with patch('main.build_detector', return_value=detector):
+            main.main(main.parse_args(['--headless', '--realtime', '--source', str(path)]))
+        
+        out, err = capsysbinary.readouterr()
+        assert len(out.splitlines()) == 3
+        assert b"Capture to detection: p50" in err
+
+class TestMainStartup:
+    
+    @patch('main.ObjectDetector')
+    @patch('main.AudioFeedback')
+    @patch('main.run_loop')
+    @patch('cv2.VideoCapture')
+    @patch('cv2.destroyAllWindows')
+    def test_model_loads_while_camera_opens(self, mock_destroy, mock_cap, mock_run, mock_audio_cls,
+                                            mock_detector_cls, capsys):
+        """Test that the model, speech engine and camera initialize concurrently, then warm up"""
+        import threading
+        camera_opened = threading.Event()
+        model_loading = threading.Event()
+        
+        def open_camera(source):
+            model_loading.wait(2)
+            camera_opened.set()
+            return Mock(isOpened=Mock(return_value=True))
+        
+        def load_model(**kwargs):
+            model_loading.set()
+            # Only finishes in time if the camera is opening at the same time
+            assert camera_opened.wait(2)
+            return Mock()
+        
+        mock_cap.side_effect = open_camera
+        mock_detector_cls.side_effect = load_model
+        
+        import main
+        main.main(main.parse_args([]))
+        
+        detector = mock_run.call_args.args[1]
+        detector.warm_up.assert_called_once()
+        out = capsys.readouterr().out
+        assert "Startup: " in out
+        for phase in ('model', 'warm-up', 'speech', 'camera'):
+            assert f"{phase} " in out.split("Startup: ")[1].splitlines()[0]
+    
+    @patch('main.ObjectDetector')
+    @patch('main.AudioFeedback')
+    @patch('main.run_loop')
+    @patch('cv2.VideoCapture')
+    @patch('cv2.destroyAllWindows')
+    def test_no_warm_up(self, mock_destroy, mock_cap, mock_run, mock_audio_cls, mock_detector_cls):
+        """Test that --no-warm-up skips the blank-frame pass"""
+        mock_cap.return_value.isOpened.return_value = True
+        
+        import main
+        main.main(main.parse_args(['--no-warm-up']))
+        
+        mock_detector_cls.return_value.warm_up.assert_not_called()
+    
+    def test_startup_report(self):
+        """Test the per-phase startup line"""
+        import main
+        report = main.startup_report({'model': 1.234, 'camera': 0.5}, 1.3)
+        assert report == "Startup: 1.30s (model 1.23s, camera 0.50s)"
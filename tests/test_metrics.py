@@ -0,0 +1,126 @@
+import pytest
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from metrics import Metrics, RollingHistogram, latency_percentiles
+
+class TestRollingHistogram:
+    
+    def test_window_keeps_recent_samples(self):
+        """Test that old samples roll out but lifetime totals keep counting"""
+        histogram = RollingHistogram(window=3)
+        for seconds in (1.0, 2.0, 3.0, 4.0):
+            histogram.observe(seconds)
+        
+        assert list(histogram.samples) == [2.0, 3.0, 4.0]
+        assert histogram.count == 4
+        assert histogram.total == 10.0
+    
+    def test_latency_percentiles(self):
+        """Test percentile summary in milliseconds"""
+        summary = latency_percentiles([0.001 * i for i in range(1, 101)])
+        
+        assert summary['count'] == 100
+        assert summary['p50_ms'] == pytest.approx(50.5)
+        assert summary['p99_ms'] == pytest.approx(99.01)
+        assert latency_percentiles([]) == {'count': 0}
+
+class TestMetrics:
+    
+    def test_span_records_stage_latency(self):
+        """Test that a span adds one observation to its stage"""
+        metrics = Metrics()
+        with metrics.span('inference'):
+            time.sleep(0.01)
+        
+        stage = metrics.snapshot()['stages']['inference']
+        assert stage['count'] == 1
+        assert stage['p50_ms'] >= 10
+    
+    def test_span_records_on_error(self):
+        """Test that a failing stage is still timed"""
+        metrics = Metrics()
+        with pytest.raises(RuntimeError):
+            with metrics.span('draw'):
+                raise RuntimeError("boom")
+        
+        assert metrics.snapshot()['stages']['draw']['count'] == 1
+    
+    def test_counters(self):
+        """Test incremented and mirrored counters"""
+        metrics = Metrics()
+        metrics.increment('inference_skipped')
+        metrics.increment('inference_skipped', 2)
+        metrics.set_counter('frames_dropped', 7)
+        
+        assert metrics.snapshot()['counters'] == {'inference_skipped': 3, 'frames_dropped': 7}
+    
+    def test_concurrent_observations(self):
+        """Test that stages can be recorded from several threads"""
+        metrics = Metrics()
+        
+        def work():
+            for _ in range(1000):
+                metrics.observe('capture', 0.001)
+                metrics.increment('frames')
+        
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert metrics.histograms['capture'].count == 4000
+        assert metrics.counters['frames'] == 4000
+    
+    def test_prometheus_format(self):
+        """Test the Prometheus text exposition output"""
+        metrics = Metrics()
+        metrics.observe('inference', 0.02)
+        metrics.observe('inference', 0.04)
+        metrics.increment('announcements_coalesced')
+        
+        text = metrics.to_prometheus()
+        
+        assert '# TYPE vision_assistant_stage_seconds summary' in text
+        assert 'vision_assistant_stage_seconds{stage="inference",quantile="0.5"} 0.03' in text
+        assert 'vision_assistant_stage_seconds_count{stage="inference"} 2' in text
+        assert 'vision_assistant_announcements_coalesced_total 1' in text
+    
+    def test_write_picks_format_from_suffix(self, tmp_path):
+        """Test JSON and Prometheus file export"""
+        metrics = Metrics()
+        metrics.observe('draw', 0.005)
+        
+        metrics.write(tmp_path / 'metrics.json')
+        metrics.write(tmp_path / 'metrics.prom')
+        
+        assert json.loads((tmp_path / 'metrics.json').read_text())['stages']['draw']['count'] == 1
+        assert 'stage="draw"' in (tmp_path / 'metrics.prom').read_text()
+        assert sorted(p.name for p in tmp_path.iterdir()) == ['metrics.json', 'metrics.prom']
+    
+    def test_maybe_export_respects_interval(self, tmp_path):
+        """Test that the export file is only rewritten once the interval passes"""
+        path = tmp_path / 'metrics.prom'
+        metrics = Metrics(export_path=path, export_interval=0.05)
+        
+        metrics.maybe_export()
+        assert not path.exists()
+        
+        time.sleep(0.06)
+        metrics.maybe_export()
+        assert path.exists()
+    
+    def test_hud_lines(self):
+        """Test the overlay text for recorded stages and counters"""
+        metrics = Metrics()
+        metrics.observe('inference', 0.025)
+        metrics.set_counter('frames_dropped', 2)
+        
+        assert metrics.hud_lines() == ["inference: 25.0 / 25.0 ms", "frames_dropped=2"]
@@ -0,0 +1,67 @@
+import pytest
+import sys
+from pathlib import Path
+from unittest.mock import patch
+import cv2
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from motion_gate import MotionGate
+
+class TestMotionGate:
+
+    def test_first_frame_always_changes(self, sample_frame):
+        """Test that there is nothing to reuse before the first inference"""
+        gate = MotionGate()
+        assert gate.changed(sample_frame)
+    
+    def test_static_scene_is_skipped(self, sample_frame):
+        """Test that an identical frame reuses the last result"""
+        gate = MotionGate()
+        gate.changed(sample_frame)
+        
+        assert not gate.changed(sample_frame.copy())
+        assert gate.skipped == 1
+    
+    def test_sensor_noise_is_ignored(self, sample_frame):
+        """Test that small per-pixel noise does not count as motion"""
+        gate = MotionGate()
+        gate.changed(sample_frame)
+        
+        noise = np.random.default_rng(0).integers(0, 10, sample_frame.shape, dtype=np.uint8)
+        assert not gate.changed(cv2.add(sample_frame, noise))
+    
+    def test_moving_object_triggers_inference(self, sample_frame):
+        """Test that an object entering the scene reruns the model"""
+        gate = MotionGate()
+        gate.changed(sample_frame)
+        
+        moved = sample_frame.copy()
+        cv2.rectangle(moved, (400, 300), (500, 400), (255, 255, 255), -1)
+        assert gate.changed(moved)
+    
+    def test_sensitivity_is_configurable(self, sample_frame):
+        """Test that a higher changed-fraction threshold tolerates small motion"""
+        gate = MotionGate(min_changed_fraction=0.5)
+        gate.changed(sample_frame)
+        
+        moved = sample_frame.copy()
+        cv2.rectangle(moved, (400, 300), (500, 400), (255, 255, 255), -1)
+        assert not gate.changed(moved)
+    
+    def test_max_reuse_age_forces_inference(self, sample_frame):
+        """Test that a static result is not reused forever"""
+        gate = MotionGate(max_reuse_age=1.0)
+        with patch('motion_gate.time.monotonic', side_effect=[0.0, 0.5, 1.6]):
+            assert gate.changed(sample_frame)
+            assert not gate.changed(sample_frame)
+            assert gate.changed(sample_frame)
+    
+    def test_reset(self, sample_frame):
+        """Test that reset forces the next frame through"""
+        gate = MotionGate()
+        gate.changed(sample_frame)
+        gate.reset()
+        assert gate.changed(sample_frame)
@@ -0,0 +1,88 @@
+import pytest
+import sys
+from pathlib import Path
+import cv2
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from detector import FrameDetections, set_box_geometry
+from overlay import FONT, SpriteCache, OverlayRenderer, draw_text
+
+def put_text(frame, text, org, font_scale=0.5, thickness=2):
+    """cv2.putText with the hard edges sprites use (OpenCV 4 draws text unsmoothed)"""
+    coverage = np.zeros(frame.shape[:2], dtype=np.uint8)
+    cv2.putText(coverage, text, org, FONT, font_scale, 255, thickness)
+    frame[coverage >= 128] = (0, 255, 0)
+    return frame
+
+@pytest.fixture
+def frame_detections(make_detections):
+    """FrameDetections with box geometry from (x1, y1, x2, y2, conf, cls) rows"""
+    return lambda rows: FrameDetections(set_box_geometry(make_detections(rows)), {0: 'person', 1: 'car'})
+
+@pytest.fixture
+def background():
+    return np.random.default_rng(0).integers(0, 256, (240, 320, 3), dtype=np.uint8)
+
+class TestDrawText:
+    
+    @pytest.mark.parametrize('org', [(40, 60), (-8, 6), (300, 235)])
+    @pytest.mark.parametrize('font_scale, thickness', [(0.5, 2), (1, 2), (0.5, 1)])
+    def test_matches_put_text(self, background, org, font_scale, thickness):
+        """Test that a sprite sets the same pixels as putText, clipped at the edges"""
+        expected = put_text(background.copy(), "Sound: ON", org, font_scale, thickness)
+        drawn = draw_text(background.copy(), "Sound: ON", org, font_scale, (0, 255, 0), thickness)
+        np.testing.assert_array_equal(drawn, expected)
+    
+    def test_sprites_are_cached(self, background):
+        """Test that text is rasterized once and evicted least recently used first"""
+        sprites = SpriteCache(max_size=2)
+        for text in ("a", "b", "a", "c"):
+            draw_text(background, text, (10, 20), sprites=sprites)
+        
+        assert (sprites.misses, sprites.hits) == (3, 1)
+        assert len(sprites) == 2
+        sprites.get("a")
+        assert sprites.hits == 2
+
+class TestOverlayRenderer:
+    
+    def test_boxes_and_labels(self, background, frame_detections):
+        """Test that boxes match cv2.rectangle and each label starts like putText"""
+        detections = frame_detections([(40, 60, 200, 180, 0.87, 0), (220, 30, 310, 120, 0.5, 1)])
+        drawn = OverlayRenderer(sprites=SpriteCache()).render(background.copy(), detections)
+        
+        expected = background.copy()
+        for (x1, y1, x2, y2), label in zip(detections.boxes.tolist(), detections.labels):
+            cv2.rectangle(expected, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            put_text(expected, label, (x1, y1 - 10))
+        # Class names are exact; the confidence follows at most a pixel away
+        for (x1, y1), label in zip(((40, 60), (220, 30)), detections.labels):
+            x2 = x1 + cv2.getTextSize(label, FONT, 0.5, 2)[0][0]
+            np.testing.assert_array_equal(drawn[y1 - 30:y1 + 2, x1 - 2:x2], expected[y1 - 30:y1 + 2, x1 - 2:x2])
+        np.testing.assert_array_equal(drawn[62:179, 40:200], expected[62:179, 40:200])
+    
+    def test_plan_is_reused_for_the_same_detections(self, background, frame_detections):
+        """Test that redrawing unchanged detections skips formatting and lookups"""
+        renderer = OverlayRenderer(sprites=SpriteCache())
+        detections = frame_detections([(40, 60, 200, 180, 0.87, 0)])
+        
+        first = renderer.render(background.copy(), detections)
+        # The motion gate re-wraps the same array
+        again = renderer.render(background.copy(),
+                                FrameDetections(detections.detections, detections.names, inferred=False))
+        
+        assert renderer.rebuilds == 1
+        assert renderer.sprites.misses == 3  # " ", "person", "0.87"
+        np.testing.assert_array_equal(first, again)
+        
+        renderer.render(background.copy(), frame_detections([(10, 20, 30, 40, 0.6, 1)]))
+        assert renderer.rebuilds == 2
+    
+    def test_no_detections(self, background, frame_detections):
+        """Test that an empty frame of detections leaves the frame unchanged"""
+        detections = frame_detections([])
+        drawn = OverlayRenderer().render(background.copy(), detections)
+        np.testing.assert_array_equal(drawn, background)
@@ -0,0 +1,85 @@
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from phrase_cache import PhraseCache
+
+class TestPhraseCache:
+    
+    def test_miss_synthesizes_once(self, tmp_path, make_tts_engine):
+        """Test that a phrase is rendered on first use and then served from memory"""
+        engine = make_tts_engine()
+        cache = PhraseCache(engine, tmp_path)
+        
+        params, frames = cache.get("person")
+        cache.get("person")
+        
+        assert engine.save_to_file.call_count == 1
+        assert params.framerate == 16000
+        assert len(frames) == 2 * len("person")
+        assert (cache.hits, cache.misses) == (1, 1)
+    
+    def test_disk_cache_survives_restart(self, tmp_path, make_tts_engine):
+        """Test that a new cache on the same directory reuses rendered clips"""
+        PhraseCache(make_tts_engine(), tmp_path).get("chair")
+        
+        engine = make_tts_engine()
+        clip = PhraseCache(engine, tmp_path).get("chair")
+        
+        engine.save_to_file.assert_not_called()
+        assert clip is not None
+    
+    def test_voice_settings_are_part_of_key(self, tmp_path, make_tts_engine):
+        """Test that changing the voice re-renders clips"""
+        PhraseCache(make_tts_engine(), tmp_path).get("dog")
+        
+        engine = make_tts_engine(voice='other')
+        PhraseCache(engine, tmp_path).get("dog")
+        
+        assert engine.save_to_file.call_count == 1
+    
+    def test_memory_lru_eviction(self, tmp_path, make_tts_engine):
+        """Test that the in-memory cache keeps only the most recently used clips"""
+        cache = PhraseCache(make_tts_engine(), tmp_path, max_memory_clips=2)
+        for phrase in ("a", "b", "a", "c"):
+            cache.get(phrase)
+        
+        assert list(cache._clips) == ["a", "c"]
+    
+    def test_disk_eviction(self, tmp_path, make_tts_engine):
+        """Test that the disk cache is capped"""
+        cache = PhraseCache(make_tts_engine(), tmp_path, max_disk_clips=2)
+        cache.warm_up(["one", "two", "three"])
+        
+        assert len(list(tmp_path.glob('*.wav'))) == 2
+    
+    def test_assemble_concatenates_with_gap(self, tmp_path, make_tts_engine):
+        """Test that clips are joined with a short silence"""
+        cache = PhraseCache(make_tts_engine(framerate=1000), tmp_path)
+        
+        params, frames = cache.assemble(["ab", "cde"], gap=0.01)
+        
+        # 2 + 3 frames of audio plus 10 frames of silence, 2 bytes each
+        assert len(frames) == 2 * (2 + 10 + 3)
+        assert frames[4:24] == b'\x00' * 20
+    
+    def test_assemble_rejects_mixed_formats(self, tmp_path, make_tts_engine):
+        """Test fallback when clips don't share an audio format"""
+        cache = PhraseCache(make_tts_engine(framerate=1000), tmp_path)
+        cache.get("a")
+        cache.engine = make_tts_engine(framerate=2000, voice='other')
+        
+        assert cache.assemble(["a", "b"]) is None
+    
+    def test_unreadable_clip_is_discarded(self, tmp_path, make_tts_engine):
+        """Test that a corrupt file is removed and reported as unavailable"""
+        engine = make_tts_engine()
+        engine.save_to_file.side_effect = lambda text, path: Path(path).write_bytes(b'junk')
+        cache = PhraseCache(engine, tmp_path)
+        
+        assert cache.get("cat") is None
+        assert cache.assemble(["cat"]) is None
+        assert list(tmp_path.glob('*.wav')) == []
@@ -0,0 +1,266 @@
+import pytest
+import sys
+import threading
+import time
+from pathlib import Path
+from queue import Queue
+from unittest.mock import Mock, patch
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from pipeline import LatestFrameQueue, DetectionPipeline, MultiSourceCapture, SharedMemoryPipeline
+from metrics import Metrics
+
+class TestLatestFrameQueue:
+    
+    def test_get_returns_newest_item(self):
+        """Test that a newer item replaces an unread one"""
+        queue = LatestFrameQueue()
+        queue.put(1)
+        queue.put(2)
+        
+        assert queue.get(timeout=0) == 2
+        assert queue.dropped == 1
+    
+    def test_bounded_queue_keeps_latest_items(self):
+        """Test that a larger queue drops only the oldest items"""
+        queue = LatestFrameQueue(maxsize=2)
+        for item in range(4):
+            queue.put(item)
+        
+        assert queue.get(timeout=0) == 2
+        assert queue.get(timeout=0) == 3
+        assert queue.dropped == 2
+    
+    def test_get_times_out_when_empty(self):
+        """Test that get returns None when nothing arrives"""
+        queue = LatestFrameQueue()
+        assert queue.get(timeout=0.01) is None
+    
+    def test_close_wakes_waiting_consumer(self):
+        """Test that closing the queue releases a blocked get"""
+        queue = LatestFrameQueue()
+        result = []
+        thread = threading.Thread(target=lambda: result.append(queue.get()))
+        thread.start()
+        
+        queue.close()
+        thread.join(timeout=1)
+        
+        assert not thread.is_alive()
+        assert result == [None]
+
+class TestDetectionPipeline:
+    
+    def test_pipeline_runs_inference_on_captured_frames(self):
+        """Test that captured frames reach the detector and results come back"""
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        cap = Mock()
+        cap.read.return_value = (True, frame)
+        detector = Mock()
+        detector.detect.return_value = 'results'
+        
+        pipeline = DetectionPipeline(cap, detector)
+        pipeline.start()
+        
+        assert pipeline.results.get(timeout=1) == 'results'
+        pipeline.stop()
+        
+        assert not pipeline.running
+        detector.detect.assert_called_with(frame)
+    
+    def test_pipeline_stops_when_capture_ends(self):
+        """Test that a failed read stops the pipeline and closes the display queue"""
+        cap = Mock()
+        cap.read.return_value = (False, None)
+        
+        pipeline = DetectionPipeline(cap, Mock())
+        pipeline.start()
+        
+        assert pipeline.display.get(timeout=1) is None
+        assert not pipeline.running
+        pipeline.stop()
+    
+    def test_slow_inference_drops_stale_frames(self):
+        """Test that frames captured during inference are dropped, not queued"""
+        frames = [np.full((4, 4, 3), i, dtype=np.uint8) for i in range(20)]
+        cap = Mock()
+        cap.read.side_effect = [(True, f) for f in frames] + [(False, None)] * 100
+        seen = []
+        
+        def slow_detect(frame):
+            seen.append(int(frame[0, 0, 0]))
+            time.sleep(0.05)
+            return frame
+        
+        detector = Mock()
+        detector.detect.side_effect = slow_detect
+        
+        pipeline = DetectionPipeline(cap, detector)
+        pipeline.start()
+        time.sleep(0.2)
+        pipeline.stop()
+        
+        assert len(seen) < len(frames)
+        assert pipeline.frames.dropped > 0
+    
+    def test_pipeline_records_metrics(self):
+        """Test that capture and inference are timed and skipped inference counted"""
+        cap = Mock()
+        cap.read.return_value = (True, np.zeros((4, 4, 3), dtype=np.uint8))
+        detector = Mock()
+        detector.detect.return_value = Mock(inferred=False)
+        metrics = Metrics()
+        
+        pipeline = DetectionPipeline(cap, detector, metrics)
+        pipeline.start()
+        assert pipeline.results.get(timeout=1) is not None
+        pipeline.stop()
+        
+        snapshot = metrics.snapshot()
+        assert snapshot['stages']['capture']['count'] > 0
+        assert snapshot['stages']['inference']['count'] > 0
+        assert snapshot['counters']['inference_skipped'] > 0
+        assert 'frames_dropped' in snapshot['counters']
+
+class TestMultiSourceCapture:
+    
+    def test_collects_newest_frame_per_source(self):
+        """Test that each source contributes its latest frame"""
+        caps = []
+        for value in (1, 2):
+            cap = Mock()
+            cap.read.return_value = (True, np.full((4, 4, 3), value, dtype=np.uint8))
+            caps.append(cap)
+        
+        capture = MultiSourceCapture(caps)
+        capture.start()
+        seen = {}
+        for _ in range(20):
+            for index, frame in capture.get_latest(timeout=1):
+                seen[index] = int(frame[0, 0, 0])
+            if len(seen) == 2:
+                break
+        capture.stop()
+        
+        assert seen == {0: 1, 1: 2}
+        assert capture.dropped > 0
+    
+    def test_stops_when_all_sources_end(self):
+        """Test that the capture stops running once every source is exhausted"""
+        caps = []
+        for frames in (2, 5):
+            cap = Mock()
+            cap.read.side_effect = [(True, np.zeros((4, 4, 3), dtype=np.uint8))] * frames + [(False, None)]
+            caps.append(cap)
+        
+        capture = MultiSourceCapture(caps)
+        capture.start()
+        while capture.get_latest(timeout=1):
+            pass
+        
+        assert not capture.running
+        capture.stop()
+
+class TestSharedMemoryPipeline:
+    
+    def test_inference_processes_return_results(self, sample_frame):
+        """Test frames going through the ring to a worker process and back"""
+        cap = Mock()
+        cap.read.side_effect = lambda image=None: (True, sample_frame)
+        metrics = Metrics()
+        
+        pipeline = SharedMemoryPipeline(cap, {'model_name': 'yolov8n.pt'}, processes=1, metrics=metrics)
+        pipeline.start()
+        try:
+            detections = pipeline.results.get(timeout=30)
+            displayed = pipeline.display.get(timeout=1)
+        finally:
+            pipeline.stop()
+        
+        assert len(detections.to_list()) == len(detections)
+        assert pipeline.names[0]
+        assert np.array_equal(displayed, sample_frame)
+        assert metrics.snapshot()['stages']['inference']['count'] > 0
+        assert pipeline.ring is None
+        assert not pipeline.running
+    
+    def test_worker_failure_cleans_up(self, sample_frame):
+        """Test that a worker failing to load its model fails start() and frees the ring"""
+        cap = Mock()
+        cap.read.side_effect = lambda image=None: (True, sample_frame)
+        pipeline = SharedMemoryPipeline(cap, {'model_name': 'yolov8n.pt', 'classes': ['unicorn']}, processes=1)
+        
+        with pytest.raises(ValueError, match="unicorn"):
+            pipeline.start(timeout=60)
+        
+        assert pipeline.ring is None
+        assert not pipeline._workers
+        assert not pipeline.running
+    
+    def test_model_is_exported_before_the_workers_start(self, sample_frame):
+        """Test that the parent exports the model once instead of every worker at the same time"""
+        cap = Mock()
+        cap.read.side_effect = lambda image=None: (True, sample_frame)
+        options = {'model_name': 'yolov8n.pt', 'backend': 'onnx', 'quantization': 'dynamic'}
+        pipeline = SharedMemoryPipeline(cap, options, processes=3)
+        
+        with patch('pipeline.prepare_backend', side_effect=RuntimeError("export failed")) as mock_prepare:
+            with pytest.raises(RuntimeError):
+                pipeline.start()
+        
+        mock_prepare.assert_called_once_with('yolov8n.pt', 'onnx', quantization='dynamic', mmap_weights=False)
+        assert not pipeline._workers
+        assert pipeline.ring is None
+    
+    def test_ring_outlives_blocked_capture(self, sample_frame):
+        """Test that stop() leaves the ring to a capture blocked in read() and keeps the dropped count"""
+        reads = []
+        unblock = threading.Event()
+        
+        def read(image=None):
+            reads.append(image)
+            if len(reads) > 5:
+                unblock.wait(5)
+                return False, None
+            return True, sample_frame
+        
+        def start_no_workers(pipeline, frame, timeout):
+            pipeline._worker_results = Queue()
+            pipeline.ring.write(frame)
+        
+        cap = Mock()
+        cap.read.side_effect = read
+        pipeline = SharedMemoryPipeline(cap, {'model_name': 'yolov8n.pt'}, processes=1)
+        with patch.object(SharedMemoryPipeline, '_start_workers', start_no_workers):
+            pipeline.start()
+        while len(reads) <= 5:
+            time.sleep(0.01)
+        # Claiming the newest frame drops the ones before it
+        pipeline.ring.claim_latest(threading.Lock())
+        dropped = pipeline.dropped
+        
+        pipeline.stop(timeout=0.1)
+        assert pipeline.ring is not None
+        unblock.set()
+        deadline = time.monotonic() + 5
+        while pipeline.ring is not None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        
+        assert pipeline.ring is None
+        assert pipeline.dropped == dropped > 0
+    
+    def test_capture_failure_before_first_frame(self):
+        """Test that no ring or processes are started without frames"""
+        cap = Mock()
+        cap.read.return_value = (False, None)
+        
+        pipeline = SharedMemoryPipeline(cap, {'model_name': 'yolov8n.pt'})
+        pipeline.start()
+        
+        assert pipeline.display.get(timeout=1) is None
+        assert pipeline.ring is None
+        assert not pipeline.running
+        pipeline.stop()
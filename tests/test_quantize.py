@@ -0,0 +1,120 @@
+import pytest
+import json
+import sys
+from pathlib import Path
+import cv2
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from backends import NumpyBoxes, NumpyResults, export_model, load_backend, quantize_model, quantized_path
+from quantize import match_detections, latency_summary, compare_models, parse_args, main
+
+class FixedModel:
+    """Model returning the same detections for every frame"""
+    
+    def __init__(self, data):
+        self.data = np.asarray(data, dtype=np.float32).reshape(-1, 6)
+    
+    def __call__(self, frame, verbose=False, conf=0.25):
+        return [NumpyResults(NumpyBoxes(self.data), frame.shape[:2], {})]
+
+@pytest.fixture(scope='module')
+def onnx_model(tmp_path_factory):
+    pytest.importorskip('onnxruntime')
+    return export_model('yolov8n.pt', 'onnx', cache_dir=tmp_path_factory.mktemp('models'))
+
+class TestAgreement:
+    
+    def test_match_detections_same_class_only(self):
+        """Test that only overlapping boxes of the same class match"""
+        reference = np.array([[0, 0, 10, 10, 0.9, 0], [20, 20, 30, 30, 0.9, 1]], dtype=np.float32)
+        candidate = np.array([[1, 1, 10, 10, 0.8, 0], [20, 20, 30, 30, 0.8, 2]], dtype=np.float32)
+        
+        assert match_detections(reference, candidate) == 1
+    
+    def test_reference_box_matches_once(self):
+        """Test that duplicate candidates cannot both match one reference box"""
+        reference = np.array([[0, 0, 10, 10, 0.9, 0]], dtype=np.float32)
+        candidate = np.array([[0, 0, 10, 10, 0.8, 0], [0, 0, 10, 10, 0.7, 0]], dtype=np.float32)
+        
+        assert match_detections(reference, candidate) == 1
+        assert match_detections(np.zeros((0, 6), dtype=np.float32), candidate) == 0
+    
+    def test_latency_summary(self):
+        """Test latency percentiles and throughput"""
+        summary = latency_summary([0.01] * 9 + [0.11])
+        
+        assert summary['p50_ms'] == pytest.approx(10)
+        assert summary['mean_ms'] == pytest.approx(20)
+        assert summary['fps'] == pytest.approx(50)
+    
+    def test_compare_models_reports_precision_and_recall(self, sample_frame):
+        """Test the comparison report against a reference model"""
+        reference = FixedModel([[0, 0, 10, 10, 0.9, 0], [50, 50, 90, 90, 0.9, 1]])
+        candidate = FixedModel([[0, 0, 10, 10, 0.8, 0], [200, 200, 210, 210, 0.7, 3]])
+        
+        report = compare_models(reference, candidate, [sample_frame] * 3)
+        
+        assert report['frames'] == 3
+        assert report['precision'] == pytest.approx(0.5)
+        assert report['recall'] == pytest.approx(0.5)
+        assert len(report['per_frame_ms']['candidate']) == 3
+        assert report['speedup'] > 0
+
+class TestQuantization:
+    
+    def test_dynamic_quantization(self, onnx_model, sample_frame):
+        """Test that a dynamic INT8 model is written and runs"""
+        path = quantize_model(onnx_model, 'dynamic')
+        
+        assert path.name == f"{onnx_model.stem}_int8_dynamic.onnx"
+        model = load_backend(str(path), 'onnx')
+        assert len(model(sample_frame)) == 1
+    
+    def test_static_quantization_needs_calibration(self, onnx_model):
+        """Test that static quantization refuses to run without frames"""
+        with pytest.raises(ValueError):
+            quantize_model(onnx_model, 'static')
+    
+    def test_static_copies_are_keyed_by_calibration(self, onnx_model, sample_frame):
+        """Test that another calibration set does not reuse a static INT8 copy"""
+        first = quantized_path(onnx_model, 'static', [sample_frame])
+        
+        assert first != quantized_path(onnx_model, 'static', [sample_frame[::-1]])
+        assert first == quantized_path(onnx_model, 'static', [sample_frame.copy()])
+        assert quantized_path(onnx_model, 'dynamic', [sample_frame]).name == f"{onnx_model.stem}_int8_dynamic.onnx"
+    
+    def test_unknown_mode(self, onnx_model):
+        """Test that unsupported modes are rejected"""
+        with pytest.raises(ValueError):
+            quantize_model(onnx_model, 'int4')
+    
+    def test_quantization_requires_onnx_backend(self):
+        """Test that quantization is only offered for the onnx backend"""
+        with pytest.raises(ValueError):
+            load_backend('yolov8n.pt', 'openvino', quantization='dynamic')
+    
+    def test_detector_rejects_quantized_torch(self):
+        """Test that the detector does not silently run FP32 when INT8 was asked for"""
+        from detector import ObjectDetector
+        with pytest.raises(ValueError, match="onnx backend"):
+            ObjectDetector('yolov8n.pt', quantization='static')
+    
+    def test_static_quantization_with_comparison_report(self, onnx_model, tmp_path, sample_frame):
+        """Test the command line flow: calibrate, quantize and compare"""
+        frames_dir = tmp_path / 'frames'
+        frames_dir.mkdir()
+        for i in range(3):
+            cv2.imwrite(str(frames_dir / f"{i}.png"), np.roll(sample_frame, i * 20, axis=1))
+        output = tmp_path / 'report.json'
+        
+        args = parse_args([str(onnx_model), '--mode', 'static', '--calibration', str(frames_dir),
+                           '--compare', str(frames_dir), '--output', str(output)])
+        report = main(args)
+        
+        assert len(list(onnx_model.parent.glob(f"{onnx_model.stem}_int8_static_*.onnx"))) == 1
+        assert report['frames'] == 3
+        assert json.loads(output.read_text())['frames'] == 3
+        assert 0.0 <= report['precision'] <= 1.0
@@ -0,0 +1,110 @@
+import pytest
+import sys
+from pathlib import Path
+from unittest.mock import Mock
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from backends import ExportedModel
+from resolution import ResolutionController
+
+class ScaledModel(ExportedModel):
+    """Exported model that always sees one object covering the middle of its input"""
+    
+    def __init__(self):
+        super().__init__({0: 'person'}, imgsz=640)
+        self.sizes = []
+    
+    def _run(self, batch):
+        size = batch.shape[-1]
+        self.sizes.append(size)
+        output = np.zeros((5, 1), dtype=np.float32)
+        # Centre box spanning half the letterboxed width and height
+        output[:, 0] = (size / 2, size / 2, size / 2, size / 2 * 0.75, 0.9)
+        return output[None]
+
+class TestResolutionController:
+    
+    def test_starts_at_largest_size(self):
+        """Test that the controller starts at full resolution"""
+        assert ResolutionController(0.05).size == 640
+    
+    def test_steps_down_when_over_budget(self):
+        """Test that slow frames lower the inference size one step at a time"""
+        controller = ResolutionController(0.05, window=3)
+        for _ in range(3):
+            controller.record(0.08)
+        assert controller.size == 416
+        
+        for _ in range(3):
+            controller.record(0.06)
+        assert controller.size == 320
+    
+    def test_waits_for_full_window(self):
+        """Test that a single slow frame does not change the size"""
+        controller = ResolutionController(0.05, window=3)
+        controller.record(0.5)
+        controller.record(0.5)
+        assert controller.size == 640
+    
+    def test_steps_up_only_with_headroom(self):
+        """Test hysteresis: stepping up needs the larger size to fit the budget"""
+        controller = ResolutionController(0.05, window=3)
+        controller.index = 0
+        
+        # 0.025 s at 320 predicts ~0.042 s at 416, over 0.8 * 0.05
+        for _ in range(3):
+            controller.record(0.025)
+        assert controller.size == 320
+        
+        for _ in range(3):
+            controller.record(0.02)
+        assert controller.size == 416
+    
+    def test_no_thrashing_inside_band(self):
+        """Test that latencies between the two thresholds keep the size stable"""
+        controller = ResolutionController(0.05, window=3)
+        controller.index = 1
+        sizes = set()
+        for _ in range(30):
+            sizes.add(controller.record(0.045))
+        assert sizes == {416}
+
+class TestAdaptiveDetection:
+    
+    def test_detector_feeds_latency_and_uses_size(self, sample_frame):
+        """Test that detect_objects passes the current size and records latency"""
+        from detector import ObjectDetector
+        
+        detector = ObjectDetector.__new__(ObjectDetector)
+        detector.model = Mock(return_value=['results'])
+        detector.resolution = Mock(size=416)
+        detector.tile_size = detector.roi = None
+        detector.inference_options = {}
+        
+        assert detector.detect_objects(sample_frame) == 'results'
+        detector.model.assert_called_once_with(sample_frame, verbose=False, imgsz=416)
+        detector.resolution.record.assert_called_once()
+    
+    def test_boxes_map_to_full_frame_at_every_size(self, sample_frame):
+        """Test that distance buckets do not depend on the inference size"""
+        from detector import ObjectDetector
+        
+        detector = ObjectDetector.__new__(ObjectDetector)
+        detector.model = ScaledModel()
+        detector.confidence_threshold = 0.5
+        detector.class_thresholds = None
+        detector.inference_options = {}
+        detector.resolution = ResolutionController(10.0)
+        detector.tile_size = detector.roi = None
+        
+        boxes = []
+        for index in range(3):
+            detector.resolution.index = index
+            detections = detector.parse_detections(detector.detect_objects(sample_frame))
+            boxes.append(detections.boxes[0].tolist())
+        
+        assert detector.model.sizes == [320, 416, 640]
+        assert boxes == [[160, 120, 480, 360]] * 3
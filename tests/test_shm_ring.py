@@ -0,0 +1,99 @@
+import pytest
+import sys
+import threading
+from multiprocessing import get_context
+from pathlib import Path
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from shm_ring import FrameRing
+
+def read_in_child(name, results):
+    """Attach to a ring from another process and report the newest frame"""
+    ring = FrameRing.attach(name)
+    seq, frame = ring.read_latest()
+    results.put((seq, int(frame[0, 0, 0]), frame.shape))
+    ring.close()
+
+@pytest.fixture
+def ring():
+    ring = FrameRing.create((48, 64, 3), slots=3)
+    yield ring
+    ring.close()
+
+def frame(value):
+    return np.full((48, 64, 3), value, dtype=np.uint8)
+
+class TestFrameRing:
+    
+    def test_empty_ring(self, ring):
+        """Test that nothing can be read before the first frame"""
+        assert ring.latest == 0
+        assert ring.read_latest() is None
+    
+    def test_newest_frame_wins(self, ring):
+        """Test that readers see the most recently committed frame"""
+        ring.write(frame(1))
+        ring.write(frame(2))
+        
+        seq, latest = ring.read_latest()
+        assert seq == 2
+        assert int(latest[0, 0, 0]) == 2
+    
+    def test_write_in_place(self, ring):
+        """Test filling a slot directly and publishing it"""
+        seq, view = ring.next_slot()
+        assert ring.view(seq) is None  # Not visible until committed
+        view[...] = 7
+        ring.commit(seq)
+        
+        assert np.shares_memory(ring.view(seq), view)
+        assert int(ring.view(seq)[0, 0, 0]) == 7
+    
+    def test_overwritten_frames_are_detected(self, ring):
+        """Test that a view's sequence stops being current once its slot is reused"""
+        first = ring.write(frame(1))
+        view = ring.view(first)
+        for value in range(2, 5):
+            ring.write(frame(value))
+        
+        assert not ring.is_current(first)
+        assert ring.view(first) is None
+        assert int(view[0, 0, 0]) == 4  # The slot now holds a newer frame
+        del view
+    
+    def test_claims_are_exclusive(self, ring):
+        """Test that readers sharing a lock never claim the same frame"""
+        lock = threading.Lock()
+        ring.write(frame(1))
+        ring.write(frame(2))
+        
+        assert ring.claim_latest(lock) == 2
+        assert ring.claim_latest(lock, timeout=0.01) is None
+        assert ring.dropped == 1
+        
+        ring.write(frame(3))
+        assert ring.claim_latest(lock, timeout=0.01) == 3
+    
+    def test_claim_waits_for_next_frame(self, ring):
+        """Test that a claim blocks until the writer publishes"""
+        lock = threading.Lock()
+        timer = threading.Timer(0.05, ring.write, args=(frame(9),))
+        timer.start()
+        
+        assert ring.claim_latest(lock, timeout=1) == 1
+        timer.join()
+    
+    def test_other_process_reads_without_copying_through_pipes(self, ring):
+        """Test attaching by name from a spawned process"""
+        ring.write(frame(5))
+        context = get_context('spawn')
+        results = context.Queue()
+        child = context.Process(target=read_in_child, args=(ring.name, results))
+        child.start()
+        
+        assert results.get(timeout=30) == (1, 5, (48, 64, 3))
+        child.join(timeout=5)
+        assert child.exitcode == 0
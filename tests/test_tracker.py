@@ -0,0 +1,64 @@
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from tracker import IoUTracker
+
+class TestIoUTracker:
+    
+    def test_new_detections_get_unique_ids(self, make_detections):
+        """Test that unmatched detections start new tracks"""
+        tracker = IoUTracker()
+        tracks = tracker.update(make_detections([
+            (0, 0, 100, 100, 0.9, 0),
+            (200, 200, 300, 300, 0.8, 1),
+        ]))
+        
+        assert tracks['track_id'].tolist() == [0, 1]
+    
+    def test_ids_are_stable_across_updates(self, make_detections):
+        """Test that overlapping detections keep their track id"""
+        tracker = IoUTracker()
+        tracker.update(make_detections([(0, 0, 100, 100, 0.9, 0), (200, 200, 300, 300, 0.8, 1)]))
+        tracks = tracker.update(make_detections([(205, 205, 305, 305, 0.8, 1), (5, 5, 105, 105, 0.9, 0)]))
+        
+        assert tracks['track_id'].tolist() == [1, 0]
+    
+    def test_class_change_starts_new_track(self, make_detections):
+        """Test that a box of a different class is not matched"""
+        tracker = IoUTracker()
+        tracker.update(make_detections([(0, 0, 100, 100, 0.9, 0)]))
+        tracks = tracker.update(make_detections([(0, 0, 100, 100, 0.9, 2)]))
+        
+        assert tracks['track_id'].tolist() == [1]
+    
+    def test_predict_moves_boxes_and_decays_confidence(self, make_detections):
+        """Test constant-velocity prediction between detections"""
+        tracker = IoUTracker(smoothing=0.0, confidence_decay=0.5)
+        tracker.update(make_detections([(0, 0, 100, 100, 0.8, 0)]))
+        tracker.update(make_detections([(10, 0, 110, 100, 0.8, 0)]))
+        
+        tracks = tracker.predict()
+        
+        assert tracks['box'][0].tolist() == [20, 0, 120, 100]
+        assert tracks['confidence'][0] == pytest.approx(0.4)
+        assert tracker.min_confidence == pytest.approx(0.4)
+    
+    def test_predict_clips_to_frame(self, make_detections):
+        """Test that predicted boxes stay inside the frame"""
+        tracker = IoUTracker(smoothing=0.0)
+        tracker.update(make_detections([(500, 0, 630, 100, 0.9, 0)]))
+        tracker.update(make_detections([(510, 0, 640, 100, 0.9, 0)]))
+        
+        tracks = tracker.predict((480, 640, 3))
+        
+        assert tracks['box'][0].tolist() == [520, 0, 640, 100]
+    
+    def test_predict_without_tracks(self):
+        """Test prediction before any detections"""
+        tracker = IoUTracker()
+        assert tracker.predict() is None
+        assert tracker.min_confidence == 1.0
@@ -0,0 +1,44 @@
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from weights_report import measure_loading, memory_usage, parse_args, summarize
+
+class TestMemoryUsage:
+    
+    @pytest.mark.skipif(not Path('/proc/self/smaps_rollup').exists(), reason="needs Linux smaps_rollup")
+    def test_reads_process_memory(self):
+        """Test that Pss and private memory never exceed Rss"""
+        usage = memory_usage()
+        assert 0 < usage['pss_bytes'] <= usage['rss_bytes']
+        assert 0 < usage['private_bytes'] <= usage['rss_bytes']
+    
+    def test_summary_means_and_total(self):
+        """Test that measurements are averaged and Pss is also totalled"""
+        summary = summarize([{'load_seconds': 1.0, 'pss_bytes': 100}, {'load_seconds': 3.0, 'pss_bytes': 300}])
+        assert summary == {'load_seconds': 2.0, 'pss_bytes': 200.0, 'total_pss_bytes': 400.0, 'processes': 2}
+
+class TestMeasureLoading:
+    
+    def test_mapped_weights_in_two_processes(self, tmp_path):
+        """Test that each process reports its load time and memory"""
+        measurements = measure_loading('yolov8n.pt', 'mmap', processes=2, cache_dir=tmp_path)
+        
+        assert len(measurements) == 2
+        for measurement in measurements:
+            assert measurement['load_seconds'] > 0
+            assert measurement['first_inference_seconds'] > 0
+    
+    def test_unknown_mode(self):
+        """Test that unsupported load modes are rejected"""
+        with pytest.raises(ValueError):
+            measure_loading(mode='safetensors')
+    
+    def test_defaults(self):
+        """Test the command line defaults"""
+        args = parse_args([])
+        assert args.processes == 4
+        assert args.modes == ['pickle', 'mmap']